@@ -20,14 +20,23 @@ import pathlib
 import sys
 from .help_formatter import MyParser, MyHelpFormatter
 from .version import __version__
-from .misc import bold, str_is_int, str_is_dna_sequence
-from . import settings
+from .misc import bold, str_is_int, str_is_dna_sequence, parse_read_range
+from . import mem_report, settings
 
 
 def main(output=sys.stderr):
     check_python_version()
     args = parse_args(sys.argv[1:])
+    if args.mem_report_allocations and not args.mem_report:
+        sys.exit('Error: --mem-report-allocations requires --mem-report')
+    mem_report.start(args.mem_report, args.subparser_name, args.mem_report_allocations)
+    try:
+        run_command(args, output)
+    finally:
+        mem_report.finish()
+
 
+def run_command(args, output):
     if args.subparser_name == 'simulate':
         check_simulate_args(args)
         from .simulate import simulate
@@ -46,6 +55,8 @@ def main(output=sys.stderr):
         plot_window_identity(args)
 
     elif args.subparser_name == 'generate_split_reads':
+        check_read_range_args(args)
+        check_template_args(args)
         from .generate_split_reads import generate_reads
         generate_reads(args)
 
@@ -58,10 +69,12 @@ def main(output=sys.stderr):
         benchmark_mappings(args)
 
     elif args.subparser_name == 'same_chr':
+        check_template_args(args)
         from .same_chr import generate_same_chr_reads
         generate_same_chr_reads(args)
 
     elif args.subparser_name == 'simple_sv':
+        check_template_args(args)
         from .simple_sv import generate_svs
         generate_svs(args)
 
@@ -69,6 +82,18 @@ def main(output=sys.stderr):
         from .benchmark_simple import benchmark_simple
         benchmark_simple(args)
 
+    elif args.subparser_name == 'benchmark_bam':
+        from .benchmark_bam import benchmark_bam
+        benchmark_bam(args)
+
+    elif args.subparser_name == 'benchmark_mappy':
+        from .benchmark_mappy import benchmark_mappy
+        benchmark_mappy(args)
+
+    elif args.subparser_name == 'compare_aligners':
+        from .compare_aligners import compare_aligners
+        compare_aligners(args)
+
 
 def parse_args(args):
     parser = MyParser(description=bold('SplitReadSimulator: a split-read simulator that can imitate many'
@@ -86,6 +111,9 @@ def parse_args(args):
     same_chr_subparser(subparsers)
     simple_sv_subparser(subparsers)
     benchmark_simple_subparser(subparsers)
+    benchmark_bam_subparser(subparsers)
+    benchmark_mappy_subparser(subparsers)
+    compare_aligners_subparser(subparsers)
 
 
     longest_choice_name = max(len(c) for c in subparsers.choices)
@@ -97,6 +125,14 @@ def parse_args(args):
         subparsers.help += d[0].lower() + d[1:]  # don't capitalise the first letter
         subparsers.help += '\n'
 
+    global_args = parser.add_argument_group('Global options (given before the command)')
+    global_args.add_argument('--mem-report', type=str,
+                             help='Write the peak memory (RSS) of each stage of the command to '
+                                  'this JSON file')
+    global_args.add_argument('--mem-report-allocations', action='store_true',
+                             help='Also trace Python allocations and report the largest ones for '
+                                  'each stage (several times slower, and inflates the RSS)')
+
     help_args = parser.add_argument_group('Help')
     help_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
                            help='Show this help message and exit')
@@ -139,6 +175,21 @@ def simulate_subparser(subparsers):
     sim_args.add_argument('--seed', type=int,
                           help='Random number generator seed for deterministic output (default: '
                                'different output each time)')
+    sim_args.add_argument('--read-range', type=str,
+                          help='Only make the reads with these indices (START:END, zero-based, '
+                               'END not included), exactly as a full run with the same seed and '
+                               'parameters would make them (requires --seed)')
+
+    output_args = group.add_argument_group('Output',
+                                           description='Where reads go and resuming long runs')
+    output_args.add_argument('--output', type=str,
+                             help='Write reads to this FASTQ file, gzipped if it ends in .gz '
+                                  '(default: stdout)')
+    output_args.add_argument('--checkpoint', type=str,
+                             help='Periodically save progress to this file (requires --output)')
+    output_args.add_argument('--resume', action='store_true',
+                             help='Carry on from the --checkpoint file, truncating --output to '
+                                  'the last checkpointed read')
 
     problem_args = group.add_argument_group('Adapters',
                                             description='Controls adapter sequences on the start '
@@ -259,6 +310,17 @@ def plot_subparser(subparsers):
     optional_args.add_argument('--no_plot', action='store_true',
                                help='Do not display plots (for testing purposes)')
 
+    batch_args = group.add_argument_group('Batch mode',
+                                          description='Process all alignments without showing '
+                                                      'any plots (e.g. on a server)')
+    batch_args.add_argument('--table', type=str,
+                            help='Write window identity statistics for each alignment to this '
+                                 'tab-separated file')
+    batch_args.add_argument('--images', type=str,
+                            help='Save each alignment\'s plot as a PNG in this directory')
+    batch_args.add_argument('--threads', type=int, default=4,
+                            help='Number of alignments to process in parallel (default: DEFAULT)')
+
     other_args = group.add_argument_group('Other')
     other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
                             help='Show this help message and exit')
@@ -287,6 +349,15 @@ def generate_split_reads_subparser(subparsers):
     sim_args.add_argument('--std-block-len', type=int, default='150',
                           help='Block length stdev (gamma distribution), '
                                'default: DEFAULT)')
+    sim_args.add_argument('--seed', type=int,
+                          help='Random number generator seed for deterministic output (default: '
+                               'different output each time)')
+    sim_args.add_argument('--read-range', type=str,
+                          help='Only make the reads with these indices (START:END, zero-based, '
+                               'END not included), exactly as a full run with the same seed and '
+                               'parameters would make them (requires --seed)')
+    template_sequencing_args(group)
+    template_truth_args(group)
 
     other_args = group.add_argument_group('Other')
     other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
@@ -314,6 +385,11 @@ def same_chr_subparser(subparsers):
     sim_args.add_argument('--std-block-len', type=int, default='150',
                           help='Block length stdev (gamma distribution), '
                                'default: DEFAULT)')
+    sim_args.add_argument('--seed', type=int,
+                          help='Random number generator seed for deterministic output (default: '
+                               'different output each time)')
+    template_sequencing_args(group)
+    template_truth_args(group)
 
     other_args = group.add_argument_group('Other')
     other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
@@ -329,7 +405,8 @@ def simple_sv_subparser(subparsers):
     required_args.add_argument('--reference', type=str, required=True,
                                help='Reference FASTA file')
     required_args.add_argument('--number', type=int, required=True,
-                               help='Number of different split-reads to generate')
+                               help='Number of split-reads to generate of each SV type or, with '
+                                    '--sv-mix, in total')
 
     sim_args = group.add_argument_group('Options',
                                         description='Length distribution parameters of the blocks')
@@ -340,21 +417,74 @@ def simple_sv_subparser(subparsers):
                           help='Block length stdev (gamma distribution), '
                                'default: DEFAULT)')
     sim_args.add_argument('--fix_overlap', type=float, default='0.4', help='Min overlap in duplications')
+    sim_args.add_argument('--sv-mix', type=str,
+                          help='Weighted mix of SV types, e.g. "deletion=0.4,inversion3=0.1" '
+                               '(types: duplication, deletion, randominsertion, ninsertion, '
+                               'insertion, inversion2, inversion3, translocation) (default: '
+                               '--number reads of every type)')
+    sim_args.add_argument('--seed', type=int,
+                          help='Random number generator seed for deterministic output (default: '
+                               'different output each time)')
+    template_sequencing_args(group)
+    template_truth_args(group)
 
     other_args = group.add_argument_group('Other')
     other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
                             help='Show this help message and exit')
 
 
+def template_sequencing_args(group):
+    """
+    Options for sequencing split-read templates in the same process, instead of writing them to a
+    FASTA file for simulate.
+    """
+    seq_args = group.add_argument_group('Sequencing',
+                                        description='Simulate reads from the templates directly')
+    seq_args.add_argument('--fastq', action='store_true',
+                          help='Output FASTQ reads with simulated errors and qscores instead of '
+                               'FASTA templates')
+    seq_args.add_argument('--identity', type=str, default='95,99,2.5',
+                          help='Sequencing identity distribution (mean, max and stdev, '
+                               'default: DEFAULT)')
+    seq_args.add_argument('--error_model', type=str, default='nanopore2023',
+                          help='Can be "nanopore2018", "nanopore2020", "nanopore2023", '
+                               '"pacbio2016", "random" or a model filename')
+    seq_args.add_argument('--qscore_model', type=str, default='nanopore2023',
+                          help='Can be "nanopore2018", "nanopore2020", "nanopore2023", '
+                               '"pacbio2016", "random", "ideal" or a model filename')
+
+
+def template_truth_args(group):
+    """
+    Options for writing the split-read templates' truth to a table instead of into their names.
+    """
+    truth_args = group.add_argument_group('Truth')
+    truth_args.add_argument('--truth', type=str,
+                            help='Write where each template\'s blocks came from to this TSV file '
+                                 '(gzipped if it ends in .gz) and give the templates short names '
+                                 '(default: block coordinates are in the template names)')
+
+
 def collect_mapping_info_subparser(subparsers):
     group = subparsers.add_parser('collect_mapping_info', description='Collect mapping information from BAM file',
                                   formatter_class=MyHelpFormatter, add_help=False)
 
     required_args = group.add_argument_group('Required arguments')
-    required_args.add_argument('--bam', type=str, required=True,
-                               help='Path to the BAM file to assess')
+    required_args.add_argument('--bam', type=str, nargs='+', required=True,
+                               help='Path to the BAM file(s) to assess')
     required_args.add_argument('--out', type=str, required=True,
-                               help='Output path')
+                               help='Output path (with several BAMs, each is written to '
+                                    'OUT.ALIGNER.bed)')
+
+    multi_args = group.add_argument_group('Several BAMs')
+    multi_args.add_argument('--aligner_name', type=str, nargs='+',
+                            help='A name for each BAM (default: the BAM file name up to the first '
+                                 'dot)')
+    multi_args.add_argument('--combined', action='store_true',
+                            help='Write one table (OUT.bed) with an aligner column, instead of one '
+                                 'per BAM')
+    multi_args.add_argument('--threads', type=int, default=4,
+                            help='Number of BAMs to read in parallel (default: DEFAULT)')
 
     other_args = group.add_argument_group('Other')
     other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
@@ -370,9 +500,15 @@ def benchmark_mappings_subparser(subparsers):
                                help='Query mappings table to assess from collect_mapping_info (BED file)')
     required_args.add_argument('--target', type=str, required=True,
                                help='Target mappings to assess from generate_split_reads (FASTQ file)')
+    required_args.add_argument('--truth', type=str,
+                               help='Truth table from the split-read generator\'s --truth (with '
+                                    'this, --target is only used to look up each read\'s template)')
     required_args.add_argument("--out", help="Output path")
     required_args.add_argument("--prefix", help="Prefix for output files", type=str)
     required_args.add_argument("--include_figures", action="store_true", help="Include figures in the output files")
+    required_args.add_argument('--aligner', type=str,
+                               help='Aligner to assess, when --query is a combined table from '
+                                    'collect_mapping_info --combined')
 
     other_args = group.add_argument_group('Other')
     other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
@@ -388,30 +524,109 @@ def benchmark_simple_subparser(subparsers):
                                help='Query mappings table to assess from collect_mapping_info (BED file)')
     required_args.add_argument('--target', type=str, required=True,
                                help='Target mappings to assess from generate_split_reads (FASTQ file)')
+    required_args.add_argument('--truth', type=str,
+                               help='Truth table from the split-read generator\'s --truth (with '
+                                    'this, --target is only used to look up each read\'s template)')
     required_args.add_argument("--out", help="Output path")
     required_args.add_argument("--prefix", help="Prefix for output files", type=str)
     required_args.add_argument("--include_figures", action="store_true", help="Include figures in the output files")
     required_args.add_argument("--type", type=str, help="Type of SVs to analyze", nargs='+')
+    required_args.add_argument('--aligner', type=str,
+                               help='Aligner to assess, when --query is a combined table from '
+                                    'collect_mapping_info --combined')
+
+    other_args = group.add_argument_group('Other')
+    other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
+                            help='Show this help message and exit')
+
+
+def benchmark_bam_subparser(subparsers):
+    group = subparsers.add_parser('benchmark_bam', description='Benchmark mappings straight from a '
+                                                               'BAM file, in one pass',
+                                  formatter_class=MyHelpFormatter, add_help=False)
+
+    required_args = group.add_argument_group('Required arguments')
+    required_args.add_argument('--bam', type=str, required=True,
+                               help='Mappings to assess, with each read\'s alignments together '
+                                    '(as written by the aligner, or sorted by read name)')
+    required_args.add_argument('--target', type=str, required=True,
+                               help='Target mappings to assess from generate_split_reads (FASTQ file)')
+    required_args.add_argument('--truth', type=str,
+                               help='Truth table from the split-read generator\'s --truth (with '
+                                    'this, --target is only used to look up each read\'s template)')
+    required_args.add_argument('--out', type=str, default='.', help='Output path')
+    required_args.add_argument('--prefix', type=str, required=True, help='Prefix for output files')
 
     other_args = group.add_argument_group('Other')
     other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
                             help='Show this help message and exit')
 
 
+def benchmark_mappy_subparser(subparsers):
+    group = subparsers.add_parser('benchmark_mappy', description='Align reads with mappy and '
+                                                                 'benchmark them, in-process',
+                                  formatter_class=MyHelpFormatter, add_help=False)
+
+    required_args = group.add_argument_group('Required arguments')
+    required_args.add_argument('--reference', type=str, required=True,
+                               help='Reference FASTA file (or a minimap2 index) to align to')
+    required_args.add_argument('--reads', type=str, required=True,
+                               help='Reads from a split-read generator with --fastq (FASTQ file, '
+                                    'or /dev/stdin to take them straight from the generator)')
+    required_args.add_argument('--truth', type=str,
+                               help='Truth table from the split-read generator\'s --truth')
+    required_args.add_argument('--out', type=str, default='.', help='Output path')
+    required_args.add_argument('--prefix', type=str, required=True, help='Prefix for output files')
+
+    aligner_args = group.add_argument_group('Aligner')
+    aligner_args.add_argument('--preset', type=str, nargs='+', default=['map-ont'],
+                              help='minimap2 preset(s) - with more than one, each is benchmarked '
+                                   'on the same reads and its results get the preset in their '
+                                   'prefix (default: map-ont)')
+    aligner_args.add_argument('--threads', type=int, default=4,
+                              help='Number of alignment threads (default: DEFAULT)')
+
+    other_args = group.add_argument_group('Other')
+    other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
+                            help='Show this help message and exit')
+
+
+def compare_aligners_subparser(subparsers):
+    group = subparsers.add_parser('compare_aligners', description='Compare the benchmark results of '
+                                                                  'several aligners',
+                                  formatter_class=MyHelpFormatter, add_help=False)
+
+    required_args = group.add_argument_group('Required arguments')
+    required_args.add_argument('--aligner_name', type=str, nargs='+', required=True,
+                               help='Aligner names (the --prefix used for benchmark_mappings)')
+    required_args.add_argument('--output_path', type=str, required=True,
+                               help='Output path for the figures')
+
+    input_args = group.add_argument_group('Inputs',
+                                          description='Folders of benchmark_mappings results '
+                                                      '(at least one is required)')
+    input_args.add_argument('--input_path_ont', type=str,
+                            help='Benchmark results for ONT reads')
+    input_args.add_argument('--input_path_pacbio', type=str,
+                            help='Benchmark results for PacBio reads')
+
+    other_args = group.add_argument_group('Other')
+    other_args.add_argument('--threads', type=int, default=4,
+                            help='Number of aligner results to summarise in parallel '
+                                 '(default: DEFAULT)')
+    other_args.add_argument('--cache_dir', type=str,
+                            help='Where to keep each aligner\'s summary, which is reused until '
+                                 'its results change (default: a summaries folder in '
+                                 '--output_path)')
+    other_args.add_argument('-h', '--help', action='help', default=argparse.SUPPRESS,
+                            help='Show this help message and exit')
+
+
 def check_simulate_args(args):
     if not pathlib.Path(args.reference).is_file():
         sys.exit(f'Error: {args.reference} is not a file')
 
-    model_names = ['random', 'nanopore2018', 'nanopore2020', 'nanopore2023', 'pacbio2016']
-    error_model = args.error_model.lower()
-    if error_model not in model_names and not pathlib.Path(args.error_model).is_file():
-        sys.exit(f'Error: {args.error_model} is not a file\n'
-                 f'  --error_model must be "random" or a filename')
-
-    qscore_model = args.qscore_model.lower()
-    if qscore_model not in model_names and not pathlib.Path(args.error_model).is_file():
-        sys.exit(f'Error: {args.error_model} is not a file\n'
-                 f'  --qscore_model must be "random", "ideal" or a filename')
+    check_model_args(args)
 
     if args.chimeras > 50:
         sys.exit('Error: --chimeras cannot be greater than 50')
@@ -433,6 +648,52 @@ def check_simulate_args(args):
     if args.frag_length_stdev < 0:
         sys.exit('Error: read length stdev cannot be negative')
 
+    check_identity_args(args)
+
+    try:
+        glitch_parameters = [float(x) for x in args.glitches.split(',')]
+        args.glitch_rate = glitch_parameters[0]
+        args.glitch_size = glitch_parameters[1]
+        args.glitch_skip = glitch_parameters[2]
+    except (ValueError, IndexError):
+        sys.exit('Error: could not parse --glitches values')
+    if args.glitch_rate < 0 or args.glitch_size < 0 or args.glitch_skip < 0:
+        sys.exit('Error: --glitches must contain non-negative values')
+
+    check_read_range_args(args)
+    if args.checkpoint is not None and args.output is None:
+        sys.exit('Error: --checkpoint requires --output')
+    if args.resume and args.checkpoint is None:
+        sys.exit('Error: --resume requires --checkpoint')
+    if args.checkpoint is not None and args.read_range is not None:
+        sys.exit('Error: --checkpoint cannot be used with --read-range')
+
+    if args.start_adapter_seq != '':
+        if not str_is_int(args.start_adapter_seq):
+            args.start_adapter_seq = args.start_adapter_seq.upper()
+            if not str_is_dna_sequence(args.start_adapter_seq):
+                sys.exit('Error: --start_adapter_seq must be a DNA sequence or a number')
+    if args.end_adapter_seq != '':
+        if not str_is_int(args.end_adapter_seq):
+            args.end_adapter_seq = args.end_adapter_seq.upper()
+            if not str_is_dna_sequence(args.end_adapter_seq):
+                sys.exit('Error: --end_adapter_seq must be a DNA sequence or a number')
+
+
+def check_model_args(args):
+    model_names = ['random', 'nanopore2018', 'nanopore2020', 'nanopore2023', 'pacbio2016']
+    error_model = args.error_model.lower()
+    if error_model not in model_names and not pathlib.Path(args.error_model).is_file():
+        sys.exit(f'Error: {args.error_model} is not a file\n'
+                 f'  --error_model must be "random" or a filename')
+
+    qscore_model = args.qscore_model.lower()
+    if qscore_model not in model_names + ['ideal'] and not pathlib.Path(args.qscore_model).is_file():
+        sys.exit(f'Error: {args.qscore_model} is not a file\n'
+                 f'  --qscore_model must be "random", "ideal" or a filename')
+
+
+def check_identity_args(args):
     try:
         identity_parameters = [float(x) for x in args.identity.split(',')]
         args.mean_identity = identity_parameters[0]
@@ -454,26 +715,21 @@ def check_simulate_args(args):
     if args.identity_stdev < 0.0:
         sys.exit('Error: read identity stdev cannot be negative')
 
-    try:
-        glitch_parameters = [float(x) for x in args.glitches.split(',')]
-        args.glitch_rate = glitch_parameters[0]
-        args.glitch_size = glitch_parameters[1]
-        args.glitch_skip = glitch_parameters[2]
-    except (ValueError, IndexError):
-        sys.exit('Error: could not parse --glitches values')
-    if args.glitch_rate < 0 or args.glitch_size < 0 or args.glitch_skip < 0:
-        sys.exit('Error: --glitches must contain non-negative values')
 
-    if args.start_adapter_seq != '':
-        if not str_is_int(args.start_adapter_seq):
-            args.start_adapter_seq = args.start_adapter_seq.upper()
-            if not str_is_dna_sequence(args.start_adapter_seq):
-                sys.exit('Error: --start_adapter_seq must be a DNA sequence or a number')
-    if args.end_adapter_seq != '':
-        if not str_is_int(args.end_adapter_seq):
-            args.end_adapter_seq = args.end_adapter_seq.upper()
-            if not str_is_dna_sequence(args.end_adapter_seq):
-                sys.exit('Error: --end_adapter_seq must be a DNA sequence or a number')
+def check_template_args(args):
+    if not args.fastq:
+        return
+    check_model_args(args)
+    check_identity_args(args)
+
+
+def check_read_range_args(args):
+    if args.read_range is None:
+        return
+    if args.seed is None:
+        sys.exit('Error: --read-range requires --seed (without a seed, the reads cannot be '
+                 'regenerated)')
+    args.read_range = parse_read_range(args.read_range)
 
 
 def check_python_version():
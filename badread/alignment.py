@@ -15,8 +15,10 @@ If not, see <http://www.gnu.org/licenses/>.
 """
 
 import collections
-import re
+import numpy as np
 import sys
+from .cigar import parse_cigar, max_indel, column_ops, gapped_sequence, CONSUMES_QUERY, \
+    CONSUMES_TARGET
 from .misc import get_open_func
 
 
@@ -52,18 +54,17 @@ class Alignment(object):
         if self.alignment_score is None:
             sys.exit('Error: no alignment score')
 
-        self.max_indel = 0
-        self.cigar_parts = re.findall(r'\d+\w', self.cigar)
-        for cigar_part in self.cigar_parts:
-            num = int(cigar_part[:-1])
-            letter = cigar_part[-1]
-            if (letter == 'I' or letter == 'D') and num > self.max_indel:
-                self.max_indel = num
+        try:
+            self.cigar_ops, self.cigar_lengths = parse_cigar(self.cigar)
+        except ValueError:
+            sys.exit(f'Error: could not parse CIGAR string: {self.cigar}')
+        self.max_indel = max_indel(self.cigar_ops, self.cigar_lengths)
 
         # I want the CIGAR in terms of the read, so I need to flip it if it aligned to the other
         # strand of the reference.
         if self.strand == '-':
-            self.cigar_parts = self.cigar_parts[::-1]
+            self.cigar_ops = self.cigar_ops[::-1]
+            self.cigar_lengths = self.cigar_lengths[::-1]
 
     def __repr__(self):
         return self.read_name + ':' + str(self.read_start) + '-' + str(self.read_end) + \
@@ -101,32 +102,43 @@ def load_alignments(filename, max_alignments=None, output=sys.stderr, dot_interv
 
 
 def align_sequences(read_seq, read_qual, ref_seq, alignment, gap_char='-'):
-    read, qual, ref = [], [], []
-    read_pos, ref_pos = 0, 0
-    errors_per_read_pos = [0] * len(read_seq)
-    for c in alignment.cigar_parts:
-        cigar_type = c[-1]
-        cigar_size = int(c[:-1])
-        if cigar_type == 'M':
-            read.append(read_seq[read_pos:read_pos+cigar_size])
-            qual.append(read_qual[read_pos:read_pos+cigar_size])
-            ref.append(ref_seq[ref_pos:ref_pos+cigar_size])
-            for i in range(cigar_size):
-                if read_seq[read_pos+i] != ref_seq[ref_pos+i]:
-                    errors_per_read_pos[read_pos+i] += 1
-            read_pos += cigar_size
-            ref_pos += cigar_size
-        if cigar_type == 'I':
-            read.append(read_seq[read_pos:read_pos+cigar_size])
-            qual.append(read_qual[read_pos:read_pos+cigar_size])
-            ref.append(gap_char * cigar_size)
-            for i in range(cigar_size):
-                errors_per_read_pos[read_pos+i] += 1
-            read_pos += cigar_size
-        if cigar_type == 'D':
-            read.append(gap_char * cigar_size)
-            qual.append(gap_char * cigar_size)
-            ref.append(ref_seq[ref_pos:ref_pos+cigar_size])
-            errors_per_read_pos[read_pos] += cigar_size
-            ref_pos += cigar_size
-    return ''.join(read), ''.join(qual), ''.join(ref), errors_per_read_pos
+    """
+    Returns the read, its qscores and the reference as gapped alignment strings, along with the
+    read's error profile (see read_error_profile). Callers which only need the error profile
+    should use read_error_profile, which doesn't build the strings.
+    """
+    columns = column_ops(alignment.cigar_ops, alignment.cigar_lengths)
+    read_columns = np.flatnonzero(CONSUMES_QUERY[columns])
+    ref_columns = np.flatnonzero(CONSUMES_TARGET[columns])
+    read = gapped_sequence(read_seq, read_columns, len(columns), gap_char)
+    qual = gapped_sequence(read_qual, read_columns, len(columns), gap_char)
+    ref = gapped_sequence(ref_seq, ref_columns, len(columns), gap_char)
+    errors_per_read_pos = get_error_profile(read_seq, ref_seq, columns).tolist()
+    return read, qual, ref, errors_per_read_pos
+
+
+def read_error_profile(read_seq, ref_seq, alignment):
+    """
+    Returns an array with the number of errors at each position of the read: mismatches and
+    inserted bases count on their own position, deletions count on the read base after them.
+    """
+    return get_error_profile(read_seq, ref_seq,
+                             column_ops(alignment.cigar_ops, alignment.cigar_lengths))
+
+
+def get_error_profile(read_seq, ref_seq, columns):
+    in_read, in_ref = CONSUMES_QUERY[columns], CONSUMES_TARGET[columns]
+
+    # For each column, the read position of its base (or of the next base, if it has none).
+    read_pos = np.cumsum(in_read) - in_read
+    ref_pos = np.cumsum(in_ref) - in_ref
+
+    aligned = np.flatnonzero(in_read & in_ref)
+    read = np.frombuffer(read_seq.encode(), dtype=np.uint8)
+    ref = np.frombuffer(ref_seq.encode(), dtype=np.uint8)
+    mismatches = aligned[read[read_pos[aligned]] != ref[ref_pos[aligned]]]
+    indels = np.flatnonzero((columns == ord('I')) | (columns == ord('D')))
+
+    # A deletion at the very end of the alignment has no read base after it, so it isn't counted.
+    error_pos = read_pos[np.concatenate((mismatches, indels))]
+    return np.bincount(error_pos, minlength=len(read_seq))[:len(read_seq)]
@@ -0,0 +1,156 @@
+import itertools
+import sys
+import pysam
+from badread import metrics
+from badread.benchmark_mappings import load_frag_info, load_truth_info
+
+"""
+inputs
+------
+a BAM of mappings from an aligner, with each read's alignments together (as aligners write them,
+or after samtools sort -n)
+the .fastq reads generated by SplitReadSimulator (and the --truth table, if one was made)
+output prefix
+
+outputs
+-------
+the same precision/recall/f-score line as benchmark_mappings (stats.txt), plus tp/fp/fn tables by
+alignment size, MapQ and expected number of alignments
+
+The BAM is read in one pass, a read at a time, so only one read's alignments are held at once.
+
+"""
+
+
+class StreamingBenchmark(object):
+    """
+    Matches each read's alignments to its true blocks (as benchmark_mappings does) and keeps only
+    the counts.
+    """
+    def __init__(self, ins_events):
+        self.ins_events = ins_events
+        self.unseen = set(ins_events)
+        self.by_size = metrics.BinCounter()
+        self.by_mapq = metrics.BinCounter()
+        self.by_n_target = metrics.BinCounter()
+        self.tp, self.fp, self.fn = 0, 0, 0
+        self.reads, self.unlabelled_reads = 0, 0
+
+    def add_read(self, qname, alignments):
+        """
+        Takes a read's alignments, each as (chrom, start, end, mapq, aln_size), and counts them.
+        """
+        self.reads += 1
+        name = qname.split('.')[0]
+        event = self.ins_events.get(name)
+        if event is None:
+            self.unlabelled_reads += 1
+            return
+        if not alignments:  # only unmapped or secondary records, so it stays unseen
+            return
+        self.unseen.discard(name)
+        targets = event.get_ins_blocks()
+        if not targets:
+            return
+
+        read_tp, read_fp, read_fn = 0, 0, 0
+        size_bins = metrics.size_bins([a[4] for a in alignments])
+        for alignment, size_bin in zip(alignments, size_bins):
+            tp = any(metrics.blocks_match(target, alignment) for target in targets)
+            self.by_size.add(size_bin, n=1, tp=int(tp), fp=int(not tp))
+            self.by_mapq.add(alignment[3], n=1, tp=int(tp), fp=int(not tp))
+            read_tp += tp
+            read_fp += not tp
+
+        missed = [target for target in targets
+                  if not any(metrics.blocks_match(target, a) for a in alignments)]
+        for target, size_bin in zip(missed, metrics.size_bins([t[2] - t[1] for t in missed])):
+            self.by_size.add(size_bin, n=1, fn=1)
+        read_fn = len(missed)
+
+        self.by_n_target.add(len(targets), n=1, tp=read_tp, fp=read_fp, fn=read_fn)
+        self.tp += read_tp
+        self.fp += read_fp
+        self.fn += read_fn
+
+
+def get_alignment(a, bam):
+    # Reference start is 1-based, as in collect_mapping_info's table.
+    return (bam.get_reference_name(a.reference_id), a.reference_start + 1, a.reference_end,
+            a.mapping_quality, a.query_alignment_length)
+
+
+def iterate_reads(bam):
+    """
+    Yields (read name, alignments) for each read in a name-grouped BAM, leaving out unmapped and
+    secondary alignments. Repeated records are only counted once, as benchmark_mappings drops
+    duplicate rows.
+    """
+    records = bam.fetch(until_eof=True)
+    for qname, group in itertools.groupby(records, key=lambda a: a.query_name):
+        alignments, seen = [], set()
+        for a in group:
+            if a.is_unmapped or a.is_secondary:
+                continue
+            key = (a.flag, a.reference_id, a.reference_start, a.cigarstring, a.mapping_quality)
+            if key not in seen:
+                seen.add(key)
+                alignments.append(get_alignment(a, bam))
+        yield qname, alignments
+
+
+def check_grouped(bam, filename):
+    sort_order = bam.header.to_dict().get('HD', {}).get('SO')
+    if sort_order == 'coordinate':
+        sys.exit(f'Error: {filename} is sorted by coordinate - benchmark_bam needs each read\'s '
+                 f'alignments together (use the aligner\'s output or samtools sort -n)')
+
+
+def get_prefix(out, prefix):
+    if prefix[-1] != '.':
+        prefix += '.'
+    return "/".join([out, prefix])
+
+
+def write_results(benchmark, n, prefix):
+    """
+    Writes the stats line and the size/MapQ/expected alignments tables, and reports the totals on
+    stderr.
+    """
+    tp, fp, fn = benchmark.tp, benchmark.fp, benchmark.fn
+    prec = round(tp / (tp + fp), 4) if tp + fp else float('nan')
+    recall = round(tp / (tp + fn), 4) if tp + fn else float('nan')
+    f = round(2 * prec * recall / (prec + recall), 4) if prec + recall else float('nan')
+    with open(prefix + 'stats.txt', 'w') as st:
+        st.write('type\tprecision\trecall\tf-score\tquery_n\ttarget_n\n')
+        st.write(f'all\t{prec}\t{recall}\t{f}\t{tp + fp}\t{n}\n')
+
+    benchmark.by_size.table('bins').to_csv(prefix + 'size_metrics.csv', sep='\t')
+    benchmark.by_mapq.table('mapq').to_csv(prefix + 'mapq_metrics.csv', sep='\t')
+    benchmark.by_n_target.table('n_target').to_csv(prefix + 'expected_alns_metrics.csv',
+                                                   sep='\t')
+
+    print(f'{benchmark.reads} reads: precision {prec}, recall {recall}, f-score {f}',
+          file=sys.stderr)
+    if benchmark.unlabelled_reads:
+        print(f'{benchmark.unlabelled_reads} read(s) had no truth (e.g. junk or random reads)',
+              file=sys.stderr)
+    if benchmark.unseen:
+        print(f'{len(benchmark.unseen)} read(s) with truth had no mappings', file=sys.stderr)
+
+
+def benchmark_bam(args):
+    if args.truth:
+        ins_events, n = load_truth_info(args.truth, args.target)
+    else:
+        ins_events, n = load_frag_info(args.target)
+    print('Expected number of fragments: ', n, file=sys.stderr)
+
+    benchmark = StreamingBenchmark(ins_events)
+    with pysam.AlignmentFile(args.bam, 'r') as bam:
+        check_grouped(bam, args.bam)
+        for qname, alignments in iterate_reads(bam):
+            benchmark.add_read(qname, alignments)
+
+    write_results(benchmark, n, get_prefix(args.out, args.prefix))
+    print('Done', file=sys.stderr)
@@ -1,9 +1,11 @@
+import sys
 from sys import stderr
 import pandas as pd
 import numpy as np
 import pysam
 import matplotlib.pyplot as plt
 import seaborn as sns
+from badread import mem_report, metrics, truth
 
 """
 inputs
@@ -44,6 +46,16 @@ class InsEvent:
             self.blocks.append((chrom, int(start), int(end)))
         self.identity = float(parts[-1].split('=')[1][:-1])
 
+    @classmethod
+    def from_truth(cls, qname, type, blocks):
+        event = cls.__new__(cls)
+        event.qname = qname
+        event.type = type
+        event.ins_blocks = None
+        event.blocks = blocks
+        event.identity = None
+        return event
+
     def __len__(self):
         return len(self.blocks)
 
@@ -61,18 +73,33 @@ def load_frag_info(pth):
     for r in fq:
         name = r.__str__().split('\n')[0]
         # print(f"Read name: {name}")
-        t = name.replace('__', ' ').split(' ')[1]
-        tt = t.replace('_', ' ').split(' ')[0]
-        print(f"Type: {tt}")
-        options = ['alignments', 'alignment', 'insertion', 'deletion', 'translocation', 'ninsertion', 'randominsertion',
-                   'inversion2', 'inversion3', 'duplication']
-        if tt in options:
-            ie = InsEvent(name)
+        ie = get_frag_event(name)
+        if ie is not None:
             ins_events[ie.qname] = ie
             n += len(ie.get_ins_blocks())
     return ins_events, n
 
 
+def get_frag_event(header):
+    # The read's type and blocks are in its header ('@name type__blocks i=xx%').
+    t = header.replace('__', ' ').split(' ')[1]
+    tt = t.replace('_', ' ').split(' ')[0]
+    options = ['alignments', 'alignment', 'insertion', 'deletion', 'translocation', 'ninsertion', 'randominsertion',
+               'inversion2', 'inversion3', 'duplication']
+    if tt in options:
+        return InsEvent(header)
+    return None
+
+
+def load_truth_info(truth_path, reads_path):
+    ins_events = {}
+    n = 0
+    for qname, (type, blocks) in truth.load_read_truth(truth_path, reads_path).items():
+        ins_events[qname] = InsEvent.from_truth(qname, type, blocks)
+        n += len(blocks)
+    return ins_events, n
+
+
 def analyse_ins_numbers(df, ins_events, prefix, n, figures):
     res = []
     for k, grp in df.groupby('qname'):
@@ -110,10 +137,6 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures):
         plt.savefig(prefix + 'mappings_vs_expected_scatter.png', dpi=600)
         plt.close()
 
-    def match_func(block_A, block_B):
-        if abs(block_A[1] - block_B[1]) < 50 and abs(block_A[2] - block_B[2]) < 50:
-            return True
-        return False
     # test with reset index
     df = df.reset_index()
     fp = np.zeros(len(df))
@@ -138,7 +161,7 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures):
 
                 for blockA in target_ins_alns:
                     for blockB in alns:
-                        if match_func(blockA, tuple(blockB)):
+                        if metrics.blocks_match(blockA, tuple(blockB)):
                             break
                     else:
                         r['fn'] += 1
@@ -146,7 +169,7 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures):
 
                 for blockB in alns:
                     for blockA in target_ins_alns:
-                        if match_func(blockA, tuple(blockB)):
+                        if metrics.blocks_match(blockA, tuple(blockB)):
                             r['tp'] += 1
                             assert tp[blockB[3]] == 0
                             tp[blockB[3]] = 1
@@ -200,221 +223,122 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures):
     d.to_csv(prefix + 'mappings_labelled.csv', sep='\t', index=False)
 
     if figures:
-        # assess mapping accuracy by alignment length
-        plt.figure()
-        plt.hist(d['aln_size'], bins=np.arange(0, 800, 25))
-        plt.ylabel('count')
-        plt.xlabel('alignment size')
-        plt.tight_layout()
-        plt.savefig(prefix + 'aln_sizes.png', dpi=600)
-        # plt.show()
-        plt.close()
-
-        # size bins
-        bins = []
-        base = 25
-        for i in d['aln_size']:
-            bins.append(base * round(i/base))  # round to nearest 50
-        d = d.assign(bins=bins)
-
-
-        bin_precison = []
-        bin_id = []
-        s = []
-        for bid, b in d.groupby('bins'):
-            if len(b) < 5:
-                continue
-            s.append(len(b) * scale)
-            bin_precison.append(b['tp'].sum() / (b['tp'].sum() + b['fp'].sum()))
-            bin_id.append(bid)
-
-        plt.plot(bin_id, bin_precison, alpha=0.8)
-        plt.scatter(bin_id, bin_precison, s=s, alpha=0.25, linewidths=0)
-        plt.xscale("log")
-        plt.xlabel('Alignment size')
-        plt.ylabel('Precision')
-        plt.ylim(0, 1.1)
-        plt.tight_layout()
-        plt.savefig(prefix + 'size_vs_precision.png', dpi=600)
-        # plt.show()
-        plt.close()
-
-        #mapq bins
-        bin_precison2 = []
-        bin_id2 = []
-        s2 = []
-        for bid, b in d.groupby('mapq'):
-            if len(b) < 5:
-                continue
-            s2.append(len(b) * scale)
-            bin_precison2.append(b['tp'].sum() / (b['tp'].sum() + b['fp'].sum()))
-            bin_id2.append(bid)
-
-        plt.plot(bin_id2, bin_precison2, alpha=0.8)
-        plt.scatter(bin_id2, bin_precison2, s=s2, alpha=0.5, linewidths=0)
-        # plt.xlim(0, 2000)
-        plt.xlabel('MapQ')
-        plt.ylabel('Precision')
-        plt.ylim(0, 1.1)
-        plt.tight_layout()
-        plt.savefig(prefix + 'mapq_vs_precision.png', dpi=600)
-        plt.close()
-
-
-        # cummulative graph - aln size
-        bin_fp = []
-        bin = []
-        fp = 0
-        s_fp=[]
-        for bid, b in d.groupby('bins'):
-            bin_fp.append(fp / n * 100)
-            bin.append(bid)
-            fp += b['fp'].sum()
-            s_fp.append(len(b)*scale)
-
-        plt.plot(bin, bin_fp)
-        plt.scatter(bin, bin_fp, s=s_fp, alpha=0.25, linewidths=0)
-        plt.xlabel('Alignment size')
-        plt.ylabel('False positive %')
-        plt.tight_layout()
-        plt.savefig(prefix + 'aln_size_vs_wrong.png', dpi=600)
-        plt.close()
+        plot_mapping_figures(d, df_fn, n, prefix)
 
+    return df_fn
 
-        # cummulative graph - mapq
-        bin_wrong = []
-        bin_w = []
-        wrong = 0
-        s=[]
-        for bid, b in d.groupby('mapq'):
-            bin_wrong.append(wrong / n)
-            bin_w.append(bid)
-            wrong += b['fp'].sum()
-            s.append(len(b)*scale)
-
-        plt.plot(bin_w, bin_wrong)
-        plt.scatter(bin_w, bin_wrong, s=s, alpha=0.5, linewidths=0)
-        plt.xlabel('MapQ')
-        plt.ylabel('False positive %')
-        plt.tight_layout()
-        plt.savefig(prefix + 'mapq_vs_fp.png', dpi=600)
-        plt.close()
+def plot_mapping_figures(d, df_fn, n, prefix):
+    """
+    Draws the per-aligner figures from the labelled mappings (d) and the mappings plus false
+    negatives (df_fn). n is the expected number of alignments. Every curve comes from one grouped
+    table made by the metrics module.
+    """
+    scale = 0.01
+
+    # assess mapping accuracy by alignment length
+    plt.figure()
+    plt.hist(d['aln_size'], bins=np.arange(0, 800, 25))
+    plt.ylabel('count')
+    plt.xlabel('alignment size')
+    plt.tight_layout()
+    plt.savefig(prefix + 'aln_sizes.png', dpi=600)
+    plt.close()
 
+    d = d.assign(bins=metrics.size_bins(d['aln_size']))
+    by_size = metrics.group_metrics(d, 'bins')
+    by_mapq = metrics.group_metrics(d, 'mapq')
+
+    # size bins
+    b = by_size[by_size['n'] >= 5]
+    plt.plot(b.index, b['precision'], alpha=0.8)
+    plt.scatter(b.index, b['precision'], s=b['n'] * scale, alpha=0.25, linewidths=0)
+    plt.xscale("log")
+    plt.xlabel('Alignment size')
+    plt.ylabel('Precision')
+    plt.ylim(0, 1.1)
+    plt.tight_layout()
+    plt.savefig(prefix + 'size_vs_precision.png', dpi=600)
+    plt.close()
 
-        bins=[]
-        for i in df_fn['aln_size']:
-            bins.append(base * round(i/base))  # round to nearest 50
-        df_fn = df_fn.assign(bins=bins)
-
-        bin_wrong = []
-        bin_w = []
-        wrong = 0
-        s=[]
-        for bid, b in df_fn.groupby('bins'):
-            bin_wrong.append(wrong / n)
-            bin_w.append(bid)
-            wrong += b['fn'].sum()
-            s.append(len(b)*scale)
-
-        plt.plot(bin_w, bin_wrong)
-        plt.scatter(bin_w, bin_wrong, s=s, alpha=0.25, linewidths=0)
-        plt.xlabel('MapQ')
-        plt.ylabel('False negative %')
-        plt.tight_layout()
-        plt.savefig(prefix + 'fn_bins.png', dpi=600)
-        plt.close()
+    # mapq bins
+    b = by_mapq[by_mapq['n'] >= 5]
+    plt.plot(b.index, b['precision'], alpha=0.8)
+    plt.scatter(b.index, b['precision'], s=b['n'] * scale, alpha=0.5, linewidths=0)
+    plt.xlabel('MapQ')
+    plt.ylabel('Precision')
+    plt.ylim(0, 1.1)
+    plt.tight_layout()
+    plt.savefig(prefix + 'mapq_vs_precision.png', dpi=600)
+    plt.close()
 
+    # cumulative graph - aln size (false positives in the bins before each one)
+    fp_before = by_size['fp'].cumsum() - by_size['fp']
+    plt.plot(by_size.index, fp_before / n * 100)
+    plt.scatter(by_size.index, fp_before / n * 100, s=by_size['n'] * scale, alpha=0.25,
+                linewidths=0)
+    plt.xlabel('Alignment size')
+    plt.ylabel('False positive %')
+    plt.tight_layout()
+    plt.savefig(prefix + 'aln_size_vs_wrong.png', dpi=600)
+    plt.close()
 
-        # precision - recall curve (aln size)
-        recall = []
-        precision = []
-        tp = 0
-        fp = 0
-        fn = 0
-        s=[]
-        for i, b in df_fn.groupby('bins'):
-            tp += b['tp'].sum()
-            fp += b['fp'].sum()
-            fn += b['fn'].sum()
-            if tp+fp == 0 or tp+fn == 0:
-                continue
-            precision.append(tp/(tp+fp))
-            recall.append(tp/(tp+fn))
-            s.append(len(b)*scale)
-        plt.plot(recall, precision, alpha=0.8)
-        plt.scatter(recall, precision, s=s, alpha=0.25, linewidths=0)
-        # plt.gca().invert_xaxis()
-        plt.xlabel('Recall')
-        plt.ylabel('Precision')
-        plt.savefig(prefix + 'Precision-Recall.png', dpi=600)
-        plt.close()
+    # cumulative graph - mapq
+    fp_before = by_mapq['fp'].cumsum() - by_mapq['fp']
+    plt.plot(by_mapq.index, fp_before / n)
+    plt.scatter(by_mapq.index, fp_before / n, s=by_mapq['n'] * scale, alpha=0.5, linewidths=0)
+    plt.xlabel('MapQ')
+    plt.ylabel('False positive %')
+    plt.tight_layout()
+    plt.savefig(prefix + 'mapq_vs_fp.png', dpi=600)
+    plt.close()
 
+    df_fn = df_fn.assign(bins=metrics.size_bins(df_fn['aln_size']))
+    fn_by_size = metrics.group_metrics(df_fn, 'bins')
 
-        # BWA-MEM plot
-        x = []
-        y = []
-        s=[]
-        tp = df_fn['tp'].sum()
-        fp = df_fn['fp'].sum()
-        for i, b in df_fn.groupby('mapq'):
-            if tp+fp == 0:
-                continue
-            y.append((fp+tp)/n)
-            x.append(fp/(tp+fp))
-            s.append(len(b)*scale)
-            tp -= b['tp'].sum()
-            fp -= b['fp'].sum()
-        plt.plot(x, y, alpha=0.8)
-        plt.scatter(x, y, s=s, alpha=0.25, linewidths=0)
-        plt.ylabel('tp+fp/total')
-        plt.xlabel('fp/tp+fp')
-        plt.savefig(prefix + 'bwamempaper_mapq.png', dpi=600)
-        plt.close()
+    fn_before = fn_by_size['fn'].cumsum() - fn_by_size['fn']
+    plt.plot(fn_by_size.index, fn_before / n)
+    plt.scatter(fn_by_size.index, fn_before / n, s=fn_by_size['n'] * scale, alpha=0.25,
+                linewidths=0)
+    plt.xlabel('MapQ')
+    plt.ylabel('False negative %')
+    plt.tight_layout()
+    plt.savefig(prefix + 'fn_bins.png', dpi=600)
+    plt.close()
 
+    # precision - recall curve (aln size)
+    b = metrics.cumulative_metrics(fn_by_size).assign(size=fn_by_size['n'])
+    b = b.dropna(subset=['precision', 'recall'])
+    plt.plot(b['recall'], b['precision'], alpha=0.8)
+    plt.scatter(b['recall'], b['precision'], s=b['size'] * scale, alpha=0.25, linewidths=0)
+    plt.xlabel('Recall')
+    plt.ylabel('Precision')
+    plt.savefig(prefix + 'Precision-Recall.png', dpi=600)
+    plt.close()
 
-        # bwamem - number of alignments
-        x = []
-        y = []
-        s=[]
-        tp = df_fn['tp'].sum()
-        fp = df_fn['fp'].sum()
-        for i, b in df_fn.groupby('n_target'):
-            if tp+fp == 0:
-                continue
-            y.append((fp+tp)/n)
-            x.append(fp/(tp+fp))
-            s.append(len(b)*scale)
-            tp -= b['tp'].sum()
-            fp -= b['fp'].sum()
+    # BWA-MEM plot, from the highest MapQ (or number of alignments) down
+    for by, filename in [('mapq', 'bwamempaper_mapq.png'),
+                         ('n_target', 'expected_alns_bwamem.png')]:
+        grouped = metrics.group_metrics(df_fn, by)
+        b = metrics.cumulative_metrics(grouped, reverse=True).assign(size=grouped['n'])
+        b = b[(b['tp'] + b['fp']) != 0]
+        x = b['fp'] / (b['tp'] + b['fp'])
+        y = (b['tp'] + b['fp']) / n
         plt.plot(x, y, alpha=0.8)
-        plt.scatter(x, y, s=s, alpha=0.25, linewidths=0)
+        plt.scatter(x, y, s=b['size'] * scale, alpha=0.25, linewidths=0)
         plt.ylabel('tp+fp/total')
         plt.xlabel('fp/tp+fp')
-        plt.savefig(prefix + 'expected_alns_bwamem.png', dpi=600)
+        plt.savefig(prefix + filename, dpi=600)
         plt.close()
 
+    # precision - number of alignments
+    b = metrics.group_metrics(df_fn, 'n_target').dropna(subset=['precision'])
+    plt.plot(b.index, b['precision'], alpha=0.8)
+    plt.scatter(b.index, b['precision'], s=b['n'] * scale, alpha=0.25, linewidths=0)
+    plt.ylabel('Precision')
+    plt.xlabel('Expected alignments')
+    plt.savefig(prefix + 'expected_alns_precision.png', dpi=600)
+    plt.close()
 
-        # precision - number of alignments
-        x = []
-        y = []
-        s=[]
-        for i, b in df_fn.groupby('n_target'):
-            tp = b['tp'].sum()
-            fp = b['fp'].sum()
-            if tp+fp == 0:
-                continue
-            y.append(tp/(tp+fp))
-            x.append(i)
-            s.append(len(b)*scale)
-
-        plt.plot(x, y, alpha=0.8)
-        plt.scatter(x, y, s=s, alpha=0.25, linewidths=0)
-        plt.ylabel('Precision')
-        plt.xlabel('Expected alignments')
-        plt.savefig(prefix + 'expected_alns_precision.png', dpi=600)
-        plt.close()
-
-    return df_fn
 
 def expected_mappings_per_read(prefix, ins_events):
     expect = []
@@ -471,18 +395,41 @@ def find_duplications(ins_events, df_fn, prefix):
     df_fn.to_csv(prefix + 'benchmark_res_fn.csv', sep='\t', index=False)
 
 
+def select_aligner(table, aligner):
+    # A combined table from collect_mapping_info --combined holds several aligners' mappings.
+    if 'aligner' not in table:
+        if aligner is not None:
+            sys.exit('Error: --aligner was given but the query table has no aligner column')
+        return table
+    aligners = table['aligner'].unique()
+    if aligner is None:
+        if len(aligners) > 1:
+            sys.exit(f'Error: the query table holds several aligners ({", ".join(aligners)}), '
+                     f'choose one with --aligner')
+        aligner = aligners[0]
+    if aligner not in aligners:
+        sys.exit(f'Error: aligner {aligner} is not in the query table')
+    return table.loc[table['aligner'] == aligner].drop(columns='aligner')
+
+
 def benchmark_mappings(args):
-    table = pd.read_csv(args.query, sep='\t')
-    table = table.loc[table['is_secondary'] != 1]
-    table = table.drop_duplicates()
-    table.reset_index(drop=True, inplace=True)
+    with mem_report.stage('load mappings'):
+        table = pd.read_csv(args.query, sep='\t')
+        table = select_aligner(table, args.aligner)
+        table = table.loc[table['is_secondary'] != 1]
+        table = table.drop_duplicates()
+        table.reset_index(drop=True, inplace=True)
 
     prefix = args.prefix
     if prefix[-1] != '.':
         prefix += '.'
     prefix = "/".join([args.out, prefix])
 
-    ins_events, n = load_frag_info(args.target)
+    with mem_report.stage('load truth'):
+        if args.truth:
+            ins_events, n = load_truth_info(args.truth, args.target)
+        else:
+            ins_events, n = load_frag_info(args.target)
     print('Expected number of fragments: ', n)
 
     if args.include_figures:
@@ -490,6 +437,7 @@ def benchmark_mappings(args):
         figures = True
     else:
         figures = False
-    df_fn = analyse_ins_numbers(table, ins_events, prefix, n, figures)
+    with mem_report.stage('match mappings'):
+        df_fn = analyse_ins_numbers(table, ins_events, prefix, n, figures)
     df_fn.to_csv(prefix + 'benchmark_res_fn.csv', sep='\t', index=False)
     # find_duplications(ins_events, df_fn, prefix)
\ No newline at end of file
@@ -0,0 +1,125 @@
+import concurrent.futures
+import itertools
+import sys
+import threading
+import pysam
+from badread import truth
+from badread.benchmark_bam import StreamingBenchmark, get_prefix, write_results
+from badread.benchmark_mappings import InsEvent, get_frag_event
+
+"""
+inputs
+------
+a reference genome
+the .fastq reads generated by SplitReadSimulator (and the --truth table, if one was made), which
+can be piped straight from the generator
+one or more minimap2 presets
+output prefix
+
+outputs
+-------
+for each preset, the same stats and tables as benchmark_bam
+
+The reads are aligned in-process with mappy (minimap2's Python binding, an optional dependency)
+and each read's hits go straight to the matcher, so there is no SAM/BAM or BED in between.
+
+"""
+
+# Reads are aligned in batches of this many, so the thread pool never holds all of them.
+BATCH_SIZE = 1000
+
+
+def get_mappy():
+    try:
+        import mappy
+    except ImportError:
+        sys.exit('Error: benchmark_mappy needs the mappy package (pip3 install mappy)')
+    return mappy
+
+
+def load_reads(filename, truth_filename=None):
+    """
+    Returns (read name, sequence, event) for each read, where event is its InsEvent (None for
+    reads without truth, e.g. junk or random reads). The truth table is loaded after the reads,
+    so it is complete when the reads are piped from the generator that writes it.
+    """
+    with pysam.FastxFile(filename) as fastx:
+        entries = [(r.name, r.comment if r.comment else '', r.sequence) for r in fastx]
+    if truth_filename is None:
+        return [(name, seq, get_frag_event(f'@{name} {comment}') if comment else None)
+                for name, comment, seq in entries]
+    templates = truth.load_truth(truth_filename)
+    reads = []
+    for name, comment, seq in entries:
+        template = templates.get(comment.split(' ')[0])
+        event = None if template is None else InsEvent.from_truth(name, *template)
+        reads.append((name, seq, event))
+    return reads
+
+
+def get_alignment(hit):
+    # Reference start is 1-based, as in collect_mapping_info's table.
+    return hit.ctg, hit.r_st + 1, hit.r_en, hit.mapq, hit.q_en - hit.q_st
+
+
+class MappyAligner(object):
+    """
+    Aligns reads with a mappy.Aligner from several threads (mappy releases the GIL while mapping),
+    each thread with its own buffer.
+    """
+    def __init__(self, reference, preset, threads):
+        self.mappy = get_mappy()
+        self.aligner = self.mappy.Aligner(reference, preset=preset, n_threads=threads)
+        if not self.aligner:
+            sys.exit(f'Error: could not load or index {reference}')
+        self.threads = threads
+        self.local = threading.local()
+
+    def align(self, seq):
+        """
+        Returns a read's primary and supplementary alignments, each as (chrom, start, end, mapq,
+        aln_size).
+        """
+        if not hasattr(self.local, 'buffer'):
+            self.local.buffer = self.mappy.ThreadBuffer()
+        return [get_alignment(h) for h in self.aligner.map(seq, buf=self.local.buffer)
+                if h.is_primary]
+
+    def align_all(self, seqs):
+        """
+        Yields the alignments for each sequence, in order.
+        """
+        seqs = iter(seqs)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.threads) as executor:
+            while True:
+                batch = list(itertools.islice(seqs, BATCH_SIZE))
+                if not batch:
+                    break
+                yield from executor.map(self.align, batch)
+
+
+def benchmark_reads(reads, aligner):
+    """
+    Aligns (read name, sequence, event) reads and returns their StreamingBenchmark and the
+    expected number of alignments.
+    """
+    ins_events = {name: event for name, _, event in reads if event is not None}
+    n = sum(len(event.get_ins_blocks()) for event in ins_events.values())
+    benchmark = StreamingBenchmark(ins_events)
+    for (name, _, _), alignments in zip(reads, aligner.align_all(seq for _, seq, _ in reads)):
+        benchmark.add_read(name, alignments)
+    return benchmark, n
+
+
+def benchmark_mappy(args):
+    reads = load_reads(args.reads, args.truth)
+    print(f'Loaded {len(reads)} reads', file=sys.stderr)
+    for preset in args.preset:
+        print(f'\nAligning with the {preset} preset', file=sys.stderr)
+        aligner = MappyAligner(args.reference, preset, args.threads)
+        benchmark, n = benchmark_reads(reads, aligner)
+        prefix = get_prefix(args.out, args.prefix)
+        if len(args.preset) > 1:
+            prefix += preset + '.'
+        write_results(benchmark, n, prefix)
+    print('Done', file=sys.stderr)
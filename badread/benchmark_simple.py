@@ -4,6 +4,8 @@ import numpy as np
 import pysam
 import matplotlib.pyplot as plt
 import seaborn as sns
+from badread import metrics, truth
+from badread.benchmark_mappings import plot_mapping_figures, select_aligner
 
 """
 inputs
@@ -44,6 +46,15 @@ class InsEvent:
             self.blocks.append((chrom, int(start), int(end)))
         self.identity = float(parts[-1].split('=')[1][:-1])
 
+    @classmethod
+    def from_truth(cls, qname, blocks):
+        event = cls.__new__(cls)
+        event.qname = qname
+        event.ins_blocks = None
+        event.blocks = blocks
+        event.identity = None
+        return event
+
     def __len__(self):
         return len(self.blocks)
 
@@ -65,6 +76,16 @@ def load_frag_info(pth, type):
     return ins_events, n
 
 
+def load_truth_info(read_truth, type):
+    ins_events = {}
+    n = 0
+    for qname, (t, blocks) in read_truth.items():
+        if type == t:
+            ins_events[qname] = InsEvent.from_truth(qname, blocks)
+            n += len(blocks)
+    return ins_events, n
+
+
 def analyse_ins_numbers(df, ins_events, prefix, n, figures, type):
     res = []
     for k, grp in df.groupby('qname'):
@@ -106,10 +127,6 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures, type):
         plt.savefig(prefix + type + '_mappings_vs_expected_scatter.png', dpi=600)
         plt.close()
 
-    def match_func(block_A, block_B):
-        if abs(block_A[1] - block_B[1]) < 50 and abs(block_A[2] - block_B[2]) < 50:
-            return True
-        return False
     # test with reset index
     df = df.reset_index()
     fp = np.zeros(len(df))
@@ -132,7 +149,7 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures, type):
 
                 for blockA in target_ins_alns:
                     for blockB in alns:
-                        if match_func(blockA, tuple(blockB)):
+                        if metrics.blocks_match(blockA, tuple(blockB)):
                             break
                     else:
                         r['fn'] += 1
@@ -140,7 +157,7 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures, type):
 
                 for blockB in alns:
                     for blockA in target_ins_alns:
-                        if match_func(blockA, tuple(blockB)):
+                        if metrics.blocks_match(blockA, tuple(blockB)):
                             r['tp'] += 1
                             assert tp[blockB[3]] == 0
                             tp[blockB[3]] = 1
@@ -199,219 +216,7 @@ def analyse_ins_numbers(df, ins_events, prefix, n, figures, type):
     d.to_csv(prefix + type + '_mappings_labelled.csv', sep='\t', index=False)
 
     if figures:
-        # assess mapping accuracy by alignment length
-        plt.figure()
-        plt.hist(d['aln_size'], bins=np.arange(0, 800, 25))
-        plt.ylabel('count')
-        plt.xlabel('alignment size')
-        plt.tight_layout()
-        plt.savefig(prefix + type + '_aln_sizes.png', dpi=600)
-        # plt.show()
-        plt.close()
-
-        # size bins
-        bins = []
-        base = 25
-        for i in d['aln_size']:
-            bins.append(base * round(i/base))  # round to nearest 50
-        d = d.assign(bins=bins)
-
-
-        bin_precison = []
-        bin_id = []
-        s = []
-        for bid, b in d.groupby('bins'):
-            if len(b) < 5:
-                continue
-            s.append(len(b) * scale)
-            bin_precison.append(b['tp'].sum() / (b['tp'].sum() + b['fp'].sum()))
-            bin_id.append(bid)
-
-        plt.plot(bin_id, bin_precison, alpha=0.8)
-        plt.scatter(bin_id, bin_precison, s=s, alpha=0.25, linewidths=0)
-        plt.xscale("log")
-        plt.xlabel('Alignment size')
-        plt.ylabel('Precision')
-        plt.ylim(0, 1.1)
-        plt.tight_layout()
-        plt.savefig(prefix + type + '_size_vs_precision.png', dpi=600)
-        # plt.show()
-        plt.close()
-
-        #mapq bins
-        bin_precison2 = []
-        bin_id2 = []
-        s2 = []
-        for bid, b in d.groupby('mapq'):
-            if len(b) < 5:
-                continue
-            s2.append(len(b) * scale)
-            bin_precison2.append(b['tp'].sum() / (b['tp'].sum() + b['fp'].sum()))
-            bin_id2.append(bid)
-
-        plt.plot(bin_id2, bin_precison2, alpha=0.8)
-        plt.scatter(bin_id2, bin_precison2, s=s2, alpha=0.5, linewidths=0)
-        # plt.xlim(0, 2000)
-        plt.xlabel('MapQ')
-        plt.ylabel('Precision')
-        plt.ylim(0, 1.1)
-        plt.tight_layout()
-        plt.savefig(prefix + type + '_mapq_vs_precision.png', dpi=600)
-        plt.close()
-
-
-        # cummulative graph - aln size
-        bin_fp = []
-        bin = []
-        fp = 0
-        s_fp=[]
-        for bid, b in d.groupby('bins'):
-            bin_fp.append(fp / n * 100)
-            bin.append(bid)
-            fp += b['fp'].sum()
-            s_fp.append(len(b)*scale)
-
-        plt.plot(bin, bin_fp)
-        plt.scatter(bin, bin_fp, s=s_fp, alpha=0.25, linewidths=0)
-        plt.xlabel('Alignment size')
-        plt.ylabel('False positive %')
-        plt.tight_layout()
-        plt.savefig(prefix + type + '_aln_size_vs_wrong.png', dpi=600)
-        plt.close()
-
-
-        # cummulative graph - mapq
-        bin_wrong = []
-        bin_w = []
-        wrong = 0
-        s=[]
-        for bid, b in d.groupby('mapq'):
-            bin_wrong.append(wrong / n)
-            bin_w.append(bid)
-            wrong += b['fp'].sum()
-            s.append(len(b)*scale)
-
-        plt.plot(bin_w, bin_wrong)
-        plt.scatter(bin_w, bin_wrong, s=s, alpha=0.5, linewidths=0)
-        plt.xlabel('MapQ')
-        plt.ylabel('False positive %')
-        plt.tight_layout()
-        plt.savefig(prefix + type + '_mapq_vs_fp.png', dpi=600)
-        plt.close()
-
-
-        bins=[]
-        for i in df_fn['aln_size']:
-            bins.append(base * round(i/base))  # round to nearest 50
-        df_fn = df_fn.assign(bins=bins)
-
-        bin_wrong = []
-        bin_w = []
-        wrong = 0
-        s=[]
-        for bid, b in df_fn.groupby('bins'):
-            bin_wrong.append(wrong / n)
-            bin_w.append(bid)
-            wrong += b['fn'].sum()
-            s.append(len(b)*scale)
-
-        plt.plot(bin_w, bin_wrong)
-        plt.scatter(bin_w, bin_wrong, s=s, alpha=0.25, linewidths=0)
-        plt.xlabel('MapQ')
-        plt.ylabel('False negative %')
-        plt.tight_layout()
-        plt.savefig(prefix + type + '_fn_bins.png', dpi=600)
-        plt.close()
-
-
-        # precision - recall curve (aln size)
-        recall = []
-        precision = []
-        tp = 0
-        fp = 0
-        fn = 0
-        s=[]
-        for i, b in df_fn.groupby('bins'):
-            tp += b['tp'].sum()
-            fp += b['fp'].sum()
-            fn += b['fn'].sum()
-            if tp+fp == 0 or tp+fn == 0:
-                continue
-            precision.append(tp/(tp+fp))
-            recall.append(tp/(tp+fn))
-            s.append(len(b)*scale)
-        plt.plot(recall, precision, alpha=0.8)
-        plt.scatter(recall, precision, s=s, alpha=0.25, linewidths=0)
-        # plt.gca().invert_xaxis()
-        plt.xlabel('Recall')
-        plt.ylabel('Precision')
-        plt.savefig(prefix + type + '_Precision-Recall.png', dpi=600)
-        plt.close()
-
-
-        # BWA-MEM plot
-        x = []
-        y = []
-        s=[]
-        tp = df_fn['tp'].sum()
-        fp = df_fn['fp'].sum()
-        for i, b in df_fn.groupby('mapq'):
-            if tp+fp == 0:
-                continue
-            y.append((fp+tp)/n)
-            x.append(fp/(tp+fp))
-            s.append(len(b)*scale)
-            tp -= b['tp'].sum()
-            fp -= b['fp'].sum()
-        plt.plot(x, y, alpha=0.8)
-        plt.scatter(x, y, s=s, alpha=0.25, linewidths=0)
-        plt.ylabel('tp+fp/total')
-        plt.xlabel('fp/tp+fp')
-        plt.savefig(prefix + type + '_bwamempaper_mapq.png', dpi=600)
-        plt.close()
-
-
-        # bwamem - number of alignments
-        x = []
-        y = []
-        s=[]
-        tp = df_fn['tp'].sum()
-        fp = df_fn['fp'].sum()
-        for i, b in df_fn.groupby('n_target'):
-            if tp+fp == 0:
-                continue
-            y.append((fp+tp)/n)
-            x.append(fp/(tp+fp))
-            s.append(len(b)*scale)
-            tp -= b['tp'].sum()
-            fp -= b['fp'].sum()
-        plt.plot(x, y, alpha=0.8)
-        plt.scatter(x, y, s=s, alpha=0.25, linewidths=0)
-        plt.ylabel('tp+fp/total')
-        plt.xlabel('fp/tp+fp')
-        plt.savefig(prefix + type + '_expected_alns_bwamem.png', dpi=600)
-        plt.close()
-
-
-        # precision - number of alignments
-        x = []
-        y = []
-        s=[]
-        for i, b in df_fn.groupby('n_target'):
-            tp = b['tp'].sum()
-            fp = b['fp'].sum()
-            if tp+fp == 0:
-                continue
-            y.append(tp/(tp+fp))
-            x.append(i)
-            s.append(len(b)*scale)
-
-        plt.plot(x, y, alpha=0.8)
-        plt.scatter(x, y, s=s, alpha=0.25, linewidths=0)
-        plt.ylabel('Precision')
-        plt.xlabel('Expected alignments')
-        plt.savefig(prefix + type + '_expected_alns_precision.png', dpi=600)
-        plt.close()
+        plot_mapping_figures(d, df_fn, n, prefix + type + '_')
 
 
 def expected_mappings_per_read(prefix, ins_events, type):
@@ -435,6 +240,7 @@ def expected_mappings_per_read(prefix, ins_events, type):
 
 def benchmark_simple(args):
     table = pd.read_csv(args.query, sep='\t')
+    table = select_aligner(table, args.aligner)
     table = table.loc[table['is_secondary'] != 1]
     table = table.drop_duplicates()
     table.reset_index(drop=True, inplace=True)
@@ -444,8 +250,12 @@ def benchmark_simple(args):
         prefix += '.'
     prefix = "/".join([args.out, prefix])
 
+    read_truth = truth.load_read_truth(args.truth, args.target) if args.truth else None
     for t in args.type:
-        ins_events, n = load_frag_info(args.target, t)
+        if read_truth is None:
+            ins_events, n = load_frag_info(args.target, t)
+        else:
+            ins_events, n = load_truth_info(read_truth, t)
 
         if args.include_figures:
             expected_mappings_per_read(prefix, ins_events, args.type)
@@ -0,0 +1,124 @@
+"""
+This module contains functions for CIGAR strings (from PAF files and Edlib), which are parsed once
+into a pair of NumPy arrays: the operations (as ASCII codes, e.g. ord('M')) and their lengths. The
+query (read) is the first sequence in the alignment and the target (reference) is the second, so
+'I' is sequence in the query only and 'D' is sequence in the target only.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import re
+
+import numpy as np
+
+
+CIGAR_RE = re.compile(r'(?:\d+[MIDNSHP=X])*')
+OP_RE = re.compile(r'(\d+)([MIDNSHP=X])')
+LENGTH_RE = re.compile(r'\d+')
+REMOVE_DIGITS = str.maketrans('', '', '0123456789')
+
+
+def op_table(ops):
+    table = np.zeros(256, dtype=bool)
+    table[list(ops.encode())] = True
+    return table
+
+
+# Which operations use up query and target bases. Every operation that uses up either makes
+# columns in the gapped alignment.
+CONSUMES_QUERY = op_table('MIS=X')
+CONSUMES_TARGET = op_table('MDN=X')
+MAKES_COLUMNS = CONSUMES_QUERY | CONSUMES_TARGET
+
+
+def parse_cigar(cigar):
+    """
+    Returns the CIGAR's operations (uint8 ASCII codes) and lengths (int64).
+        parse_cigar('5=1X2I') -> ([61, 88, 73], [5, 1, 2])
+    """
+    if CIGAR_RE.fullmatch(cigar) is None:
+        raise ValueError(f'invalid CIGAR string: {cigar}')
+    ops = np.frombuffer(cigar.translate(REMOVE_DIGITS).encode(), dtype=np.uint8)
+    lengths = np.array(LENGTH_RE.findall(cigar), dtype=np.int64)
+    return ops, lengths
+
+
+def cigar_tuples(cigar):
+    """
+    Returns the CIGAR as a list of (operation, length) tuples. For very short CIGARs (e.g. k-mer
+    alignments) this is quicker than parse_cigar, as NumPy has a cost per call.
+        cigar_tuples('5=1X2I') -> [('=', 5), ('X', 1), ('I', 2)]
+    """
+    return [(op, int(length)) for length, op in OP_RE.findall(cigar)]
+
+
+def cigar_identity(ops, lengths):
+    """
+    The fraction of the alignment's columns which are matches. This needs an Edlib-style CIGAR
+    ('=' and 'X'), as 'M' could be either.
+    """
+    alignment_length = lengths.sum()
+    if alignment_length == 0:
+        return 0.0
+    return int(lengths[ops == ord('=')].sum()) / int(alignment_length)
+
+
+def max_indel(ops, lengths):
+    indels = lengths[(ops == ord('I')) | (ops == ord('D'))]
+    return int(indels.max()) if len(indels) else 0
+
+
+def column_ops(ops, lengths):
+    """
+    The operation for each column of the gapped alignment.
+    """
+    columns = MAKES_COLUMNS[ops]
+    return np.repeat(ops[columns], lengths[columns])
+
+
+def column_count(ops, lengths):
+    return int(lengths[MAKES_COLUMNS[ops]].sum())
+
+
+def expand_cigar(ops, lengths):
+    """
+    The CIGAR with one character per alignment column.
+        expand_cigar(*parse_cigar('3=1I2=')) -> '===I=='
+    """
+    return column_ops(ops, lengths).tobytes().decode()
+
+
+def query_columns(ops, lengths):
+    """
+    The alignment column of each query base.
+    """
+    return np.flatnonzero(CONSUMES_QUERY[column_ops(ops, lengths)])
+
+
+def target_columns(ops, lengths):
+    """
+    The alignment column of each target base.
+    """
+    return np.flatnonzero(CONSUMES_TARGET[column_ops(ops, lengths)])
+
+
+def gapped_sequence(seq, columns, alignment_length, gap_char='-'):
+    """
+    Spreads the sequence over the alignment's columns (from query_columns or target_columns),
+    filling the others with the gap character. Any sequence past the alignment is left out, as it
+    would be by slicing.
+    """
+    aligned = np.full(alignment_length, ord(gap_char), dtype=np.uint8)
+    seq = np.frombuffer(seq.encode(), dtype=np.uint8)
+    count = min(len(seq), len(columns))
+    aligned[columns[:count]] = seq[:count]
+    return aligned.tobytes().decode()
@@ -1,7 +1,11 @@
+import concurrent.futures
+import os
+import sys
 import pysam
 import pandas as pd
 from collections import defaultdict
 import click
+from badread import mem_report
 
 def get_query_pos_from_cigartuples(r):
     # Infer the position on the query sequence of the alignment using cigar string
@@ -15,14 +19,30 @@ def get_query_pos_from_cigartuples(r):
     return start, end, query_length
 
 
-def mapping_info(f, outf):
+def get_label(f, name):
+    # Memory report stages are labelled with the aligner (or BAM) name, as several can be read.
+    return os.path.basename(f) if name is None else name
 
+
+def mapping_table(f, name=None):
+    label = get_label(f, name)
+    with mem_report.stage(f'read BAM ({label})'):
+        af, d = read_alignments(f)
+    with mem_report.stage(f'build table ({label})'):
+        return build_table(af, d)
+
+
+def read_alignments(f):
+    # Each read's mapped alignments, grouped by read name.
     af = pysam.AlignmentFile(f, 'r')
     d = defaultdict(list)
     for a in af.fetch(until_eof=True):
         if not a.flag & 4:
             d[a.qname].append(a)
+    return af, d
+
 
+def build_table(af, d):
     res = []
     no = 0
     yes = 0
@@ -120,10 +140,58 @@ def mapping_info(f, outf):
              'alignment_score', 'short_anchor<50bp', 'seq', 'is_secondary',
             'is_supplementary']
 
-    df = df[cols]
-    df.to_csv(f"{outf}.bed", index=False, sep="\t")
+    return df[cols]
+
+
+def mapping_info(f, outf, name=None):
+    table = mapping_table(f, name)
+    with mem_report.stage(f'write table ({get_label(f, name)})'):
+        table.to_csv(f"{outf}.bed", index=False, sep="\t")
+    return f"{outf}.bed"
+
+
+def get_aligner_names(bams, names):
+    # Without --aligner_name, each BAM is named by its file name (e.g. minimap2.bam -> minimap2).
+    if names is None:
+        names = [os.path.basename(b).split('.')[0] for b in bams]
+    if len(names) != len(bams):
+        sys.exit(f'Error: {len(names)} aligner name(s) were given for {len(bams)} BAM file(s)')
+    if len(set(names)) != len(names):
+        sys.exit('Error: each BAM file needs a different aligner name (use --aligner_name)')
+    return names
+
+
+def run_jobs(function, jobs, threads):
+    """
+    Runs function on each job's arguments, in a process pool if there are several jobs and
+    threads, and returns the results in the same order. The workers' memory report stages are
+    passed back to this process's report.
+    """
+    if threads > 1 and len(jobs) > 1:
+        workers = min(threads, len(jobs))
+        function = mem_report.in_worker(function)
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(function, *job) for job in jobs]
+            return [mem_report.collect(future.result()) for future in futures]
+    return [function(*job) for job in jobs]
+
+
+def combined_mapping_info(bams, names, outf, threads):
+    tables = run_jobs(mapping_table, list(zip(bams, names)), threads)
+    with mem_report.stage('write combined table'):
+        for name, table in zip(names, tables):
+            table.insert(0, 'aligner', name)
+        pd.concat(tables, ignore_index=True).to_csv(f"{outf}.bed", index=False, sep="\t")
 
 
 def collect_mapping_info(args):
-    mapping_info(args.bam, args.out)
+    if len(args.bam) == 1 and args.aligner_name is None and not args.combined:
+        mapping_info(args.bam[0], args.out)
+    else:
+        names = get_aligner_names(args.bam, args.aligner_name)
+        if args.combined:
+            combined_mapping_info(args.bam, names, args.out, args.threads)
+        else:
+            run_jobs(mapping_info, [(b, f'{args.out}.{n}', n) for b, n in zip(args.bam, names)],
+                     args.threads)
     print('Done')
@@ -0,0 +1,412 @@
+import concurrent.futures
+import os
+import pickle
+import sys
+import numpy as np
+import pandas as pd
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+from badread import metrics
+
+"""
+inputs
+------
+the benchmark_mappings outputs (mappings_labelled.csv, benchmark_res_fn.csv and stats.txt) of each
+aligner, for ONT and/or PacBio reads
+
+outputs
+-------
+a cached summary per aligner and platform, holding everything the figures need
+figures comparing the aligners:
+ precision and recall vs alignment size
+ precision vs MapQ
+ mapped fragments and fragment length distribution
+ BWA-MEM paper style MapQ curve
+ precision, recall and F-score vs the difference between mapped and expected alignments
+
+"""
+
+# Bump this when the summaries change, so cached summaries from older versions are remade.
+SUMMARY_VERSION = 2
+
+colors = {'bwa_ont': '#B53333',
+          'minimap2_ont': '#6A4CDB',
+          'lastalsplit_ont': '#FF7F27',
+          'ngmlr_ont': '#3CB371',
+          'vacmap_s_ont': '#0077B6',
+          'bwa_pacbio': '#F28B82',
+          'minimap2_pacbio': '#d0bdf4',
+          'lastalsplit_pacbio': '#F7DC6F',
+          'ngmlr_pacbio': '#b5e2b4',
+          'vacmap_s_pacbio': '#a9d6e5'
+          }
+
+markers = {'bwa_ont': 'o',
+           'minimap2_ont': 'x',
+           'lastalsplit_ont': '+',
+           'ngmlr_ont': 'p',
+           'vacmap_s_ont': 's',
+           'bwa_pacbio': 'o',
+           'minimap2_pacbio': 'x',
+           'lastalsplit_pacbio': '+',
+           'ngmlr_pacbio': 'p',
+           'vacmap_s_pacbio': 's'
+           }
+
+scale = 0.01
+
+MAPPING_COLUMNS = ['aln_size', 'mapq', 'tp', 'fp']
+BENCHMARK_COLUMNS = ['qname', 'aln_size', 'mapq', 'tp', 'fp', 'fn', 'n_alignments', 'n_target']
+
+
+def get_input_files(path, aligner):
+    return [os.path.join(path, aligner + '.mappings_labelled.csv'),
+            os.path.join(path, aligner + '.benchmark_res_fn.csv'),
+            os.path.join(path, aligner + '.stats.txt')]
+
+
+def get_cache_key(files):
+    # A summary is reused as long as its input files haven't changed.
+    key = [SUMMARY_VERSION]
+    for f in files:
+        stat = os.stat(f)
+        key.append((os.path.abspath(f), stat.st_size, stat.st_mtime_ns))
+    return key
+
+
+def kde_curve(values, gridsize=200, cut=3):
+    """
+    The Gaussian KDE of the values (Scott's bandwidth, as seaborn's kdeplot draws it), evaluated
+    once per distinct value instead of once per alignment.
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    if len(values) < 2 or values.std() == 0.0:
+        return pd.DataFrame({'x': [], 'density': []})
+    bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+    distinct, counts = np.unique(values, return_counts=True)
+    x = np.linspace(distinct[0] - cut * bandwidth, distinct[-1] + cut * bandwidth, gridsize)
+    density = np.zeros(gridsize)
+    for i in range(0, len(distinct), 1000):
+        z = (x[:, None] - distinct[None, i:i+1000]) / bandwidth
+        density += (np.exp(-0.5 * z * z) * counts[i:i+1000]).sum(axis=1)
+    density /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+    return pd.DataFrame({'x': x, 'density': density})
+
+
+def summarise(mappings, benchmark_res, stats):
+    """
+    Computes everything the figures need from one aligner's benchmark tables. The summary only
+    holds small per-bin tables, so it is quick to cache and to plot.
+    """
+    summary = {'total': int(stats['target_n'].iloc[0]),
+               'mapped': len(mappings)}
+
+    mappings = mappings.assign(bins=metrics.size_bins(mappings['aln_size']))
+    summary['size'] = metrics.group_metrics(mappings, 'bins', sums=['mapq'])
+    summary['mapq'] = metrics.group_metrics(mappings, 'mapq')
+    summary['aln_size_density'] = kde_curve(mappings['aln_size'])
+
+    benchmark_res = benchmark_res.assign(bins=metrics.size_bins(benchmark_res['aln_size']))
+    summary['recall_size'] = metrics.group_metrics(benchmark_res, 'bins')
+    summary['bwa_mapq'] = metrics.group_metrics(benchmark_res, 'mapq')
+
+    per_read = benchmark_res.groupby('qname').agg(
+        tp=('tp', 'sum'), fp=('fp', 'sum'), fn=('fn', 'sum'),
+        n_alignments=('n_alignments', 'max'), n_target=('n_target', 'max'))
+    per_read['aln_diff'] = per_read['n_alignments'] - per_read['n_target']
+    summary['aln_diff'] = metrics.group_metrics(per_read, 'aln_diff')
+    return summary
+
+
+def make_summary(files, cache_filename):
+    """
+    Loads one aligner's tables, summarises them and saves the summary to the cache. This runs in
+    a worker process.
+    """
+    mappings_file, benchmark_file, stats_file = files
+    key = get_cache_key(files)
+    mappings = pd.read_csv(mappings_file, sep='\t', usecols=MAPPING_COLUMNS)
+    benchmark_res = pd.read_csv(benchmark_file, sep='\t', usecols=BENCHMARK_COLUMNS)
+    stats = pd.read_csv(stats_file, sep='\t')
+    summary = summarise(mappings, benchmark_res, stats)
+    if cache_filename is not None:
+        temp_filename = cache_filename + '.tmp'
+        with open(temp_filename, 'wb') as f:
+            pickle.dump({'key': key, 'summary': summary}, f)
+        os.replace(temp_filename, cache_filename)
+    return summary
+
+
+def load_cached_summary(files, cache_filename):
+    try:
+        with open(cache_filename, 'rb') as f:
+            cached = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return None
+    if cached.get('key') != get_cache_key(files):
+        return None
+    return cached['summary']
+
+
+def load_summaries(datasets, cache_dir, threads):
+    """
+    Returns a summary for each dataset (name: input files), in the same order. Cached summaries
+    are used when their inputs are unchanged, and the rest are made in parallel.
+    """
+    summaries = {}
+    to_make = {}
+    for name, files in datasets.items():
+        cache_filename = None if cache_dir is None else \
+            os.path.join(cache_dir, name + '.summary.pkl')
+        summary = None if cache_filename is None else load_cached_summary(files, cache_filename)
+        if summary is None:
+            to_make[name] = (files, cache_filename)
+        summaries[name] = summary
+
+    if to_make:
+        print(f'Summarising {len(to_make)} of {len(datasets)} aligner result(s)', file=sys.stderr)
+    if threads > 1 and len(to_make) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=threads) as executor:
+            futures = {name: executor.submit(make_summary, *job) for name, job in to_make.items()}
+            for name, future in futures.items():
+                summaries[name] = future.result()
+    else:
+        for name, job in to_make.items():
+            summaries[name] = make_summary(*job)
+    return summaries
+
+
+def get_styles(names):
+    # Aligners without a set colour/marker get one from the tab20 palette.
+    palette = plt.get_cmap('tab20').colors
+    dataset_colors, dataset_markers = {}, {}
+    extra = 0
+    for name in names:
+        if name in colors:
+            dataset_colors[name] = colors[name]
+        else:
+            dataset_colors[name] = mpl.colors.to_hex(palette[extra % len(palette)])
+            extra += 1
+        dataset_markers[name] = markers.get(name, 'o')
+    return dataset_colors, dataset_markers
+
+
+def save_legend(summaries, styles, output_path):
+    handles = [mpl.patches.Patch(color=styles[0][name], label=name) for name in summaries]
+    plt.figure()
+    plt.legend(handles=handles)
+    plt.gca().set_axis_off()
+    plt.savefig(output_path + '/legend.png', dpi=600)
+    plt.close()
+
+
+def precision_aln_size_log(summaries, styles, output_path):
+    plt.figure(figsize=(5, 4))
+    for name, summary in summaries.items():
+        b = summary['size'].dropna(subset=['precision'])
+        c = styles[0][name]
+        plt.plot(b.index, b['precision'], label=name, c=c, alpha=0.8)
+        plt.scatter(b.index, b['precision'], s=b['n'] * scale, alpha=0.4, c=c, linewidths=0)
+        plt.xticks(fontsize=12)
+        plt.yticks(fontsize=12)
+
+    plt.xscale("log")
+    plt.grid()
+    plt.xticks([25, 50, 100, 150, 300, 500, 1000], [25, 50, 100, 150, 300, 500, 1000])
+    plt.xlabel('Alignment size', fontsize=13, weight='bold')
+    plt.ylabel('Precision', fontsize=13, weight='bold')
+    plt.ylim(0, 1.1)
+    plt.xlim(0, 1000)
+    plt.tight_layout()
+    plt.savefig(output_path + '/size_vs_precision_log.png', dpi=600)
+    plt.close()
+
+
+def precision_mapq(summaries, styles, output_path):
+    plt.figure(figsize=(5, 4))
+    for name, summary in summaries.items():
+        b = summary['mapq']
+        b = b[b['n'] >= 5]
+        c = styles[0][name]
+        plt.plot(b.index, b['precision'], label=name, c=c, alpha=0.8)
+        plt.scatter(b.index, b['precision'], s=b['n'] * scale, alpha=0.4, c=c, linewidths=0)
+        plt.xticks(fontsize=12)
+        plt.yticks(fontsize=12)
+        plt.locator_params(axis='x', nbins=10)
+
+    plt.xlabel('MapQ', fontsize=13, weight='bold')
+    plt.ylabel('Precision', fontsize=13, weight='bold')
+    plt.grid()
+    plt.ylim(0, 1.1)
+    plt.tight_layout()
+    plt.savefig(output_path + '/mapq_vs_precision.png', dpi=600)
+    plt.close()
+
+
+def addlabels(x, y):
+    for i in range(len(x)):
+        plt.text(i, y[i], y[i], ha='center')
+
+
+def mapped_alignments(summaries, styles, output_path):
+    names = list(summaries)
+    counts = [summaries[name]['mapped'] for name in names]
+    fig, ax = plt.subplots(figsize=(4, 4))
+    ax.bar(names, counts, label=names, color=[styles[0][name] for name in names])
+    addlabels(names, counts)
+    ax.set_ylabel('Mapped fragments')
+    plt.setp(ax.get_xticklabels(), rotation=45, horizontalalignment='right')
+    plt.subplots_adjust(bottom=0.2)
+    plt.tight_layout()
+    plt.savefig(output_path + '/n_fragments.png', dpi=600)
+    plt.close()
+
+
+def fragment_length_dist(summaries, styles, output_path):
+    plt.figure()
+    for name, summary in summaries.items():
+        density = summary['aln_size_density']
+        plt.plot(density['x'], density['density'], alpha=0.7, label=name, color=styles[0][name])
+    plt.xlabel('fragment length', fontsize=13, weight='bold')
+    plt.ylabel('density function', fontsize=13, weight='bold')
+    plt.xticks(fontsize=12)
+    plt.yticks(fontsize=12)
+    plt.savefig(output_path + '/fragment_len_dist.png', dpi=600)
+    plt.close()
+
+
+def BWA_curve(summaries, styles, output_path):
+    plt.figure(figsize=(5, 4))
+    for name, summary in summaries.items():
+        # Cumulative counts from the highest MapQ down.
+        b = metrics.cumulative_metrics(summary['bwa_mapq'], reverse=True)
+        b = b[(b['tp'] + b['fp']) != 0].sort_index(ascending=False)
+        x = b['fp'] / (b['tp'] + b['fp'])
+        y = (b['fp'] + b['tp']) / summary['total']
+        c, m = styles[0][name], styles[1][name]
+        plt.plot(x, y, alpha=1, c=c, label=name, linewidth=0.9, markeredgecolor=c,
+                 marker=m, markerfacecolor="None", markersize=5, markeredgewidth=0.5)
+        plt.xticks(fontsize=12)
+        plt.yticks(fontsize=12)
+
+    plt.ylabel('mapped/total', fontsize=13, weight='bold')
+    plt.xlabel('wrong/mapped', fontsize=13, weight='bold')
+    plt.grid(True, linewidth=0.5)
+    plt.locator_params(axis='x', nbins=8)
+    plt.tight_layout()
+    plt.ylim(top=1.1)
+    left, right = plt.xlim()
+    plt.xlim(left, 0.5)
+    plt.savefig(output_path + '/bwamempaper_mapq.png', dpi=600)
+    plt.close()
+
+
+def recall_aln_size_log(summaries, styles, output_path):
+    plt.figure(figsize=(5, 4))
+    for name, summary in summaries.items():
+        b = summary['recall_size'].dropna(subset=['recall'])
+        c = styles[0][name]
+        plt.plot(b.index, b['recall'], label=name, c=c, alpha=1)
+        plt.scatter(b.index, b['recall'], s=b['n'] * scale, alpha=0.4, c=c, linewidths=0)
+        plt.xticks(fontsize=12)
+        plt.yticks(fontsize=12)
+
+    plt.xscale("log")
+    plt.xticks([25, 50, 100, 150, 300, 500, 1000], [25, 50, 100, 150, 300, 500, 1000])
+    plt.xlabel('Alignment size', fontsize=13, weight='bold')
+    plt.ylabel('Recall', fontsize=13, weight='bold')
+    plt.grid()
+    plt.ylim(0, 1.1)
+    plt.xlim(0, 1000)
+    plt.tight_layout()
+    plt.savefig(output_path + '/size_vs_recall_log.png', dpi=600)
+    plt.close()
+
+
+def alignments_metric(summaries, styles, output_path, metric):
+    # Precision, recall or F-score against (mapped - expected alignments) per read.
+    plt.figure(figsize=(5, 4))
+    for name, summary in summaries.items():
+        b = summary['aln_diff']
+        b = b[b['n'] >= 5]
+        # Reads with no true alignments are left out of the recall and F-score curves.
+        b = b.dropna(subset=['precision' if metric == 'precision' else 'recall'])
+        y = b[metric]
+        c = styles[0][name]
+        plt.plot(b.index, y, alpha=0.8, label=name, c=c)
+        plt.scatter(b.index, y, s=b['n'] * 0.1, alpha=0.25, linewidths=0, c=c)
+        plt.xticks(fontsize=12)
+        plt.yticks(fontsize=12)
+
+    if metric == 'precision':
+        plt.ylabel('Precision', fontsize=13, weight='bold')
+        plt.xlabel('Mapped alignments - Expected alignments', fontsize=13, weight='bold')
+    elif metric == 'recall':
+        plt.ylabel('Recall', fontsize=16, weight='bold')
+        plt.xlabel('Mapped alignments - Expected alignments', fontsize=16, weight='bold')
+    else:
+        plt.ylabel('F-score', fontsize=16, weight='bold')
+        plt.xlabel('Mapped alignments - Expected', fontsize=16, weight='bold')
+    plt.grid()
+    plt.tight_layout()
+    plt.savefig(output_path + f'/expected_alns_{metric}.png', dpi=600)
+    plt.close()
+
+
+def mapq_aln_size_log(summaries, styles, output_path):
+    plt.figure(figsize=(5, 4))
+    for name, summary in summaries.items():
+        b = summary['size']
+        b = b[b['mapq'] != 0]
+        c = styles[0][name]
+        mean_mapq = b['mapq'] / b['n']
+        plt.plot(b.index, mean_mapq, label=name, c=c, alpha=0.8)
+        plt.scatter(b.index, mean_mapq, s=b['n'] * scale, alpha=0.4, c=c, linewidths=0)
+        plt.xticks(fontsize=12)
+        plt.yticks(fontsize=12)
+
+    plt.xscale("log")
+    plt.xticks([25, 50, 100, 150, 300, 500, 1000], [25, 50, 100, 150, 300, 500, 1000])
+    plt.xlabel('Alignment size', fontsize=13, weight='bold')
+    plt.ylabel('Mapping quality', fontsize=13, weight='bold')
+    plt.xlim(0, 1000)
+    plt.grid()
+    plt.tight_layout()
+    plt.savefig(output_path + '/size_vs_mapq_log.png', dpi=600)
+    plt.close()
+
+
+def compare_aligners(args):
+    datasets = {}
+    for aligner in args.aligner_name:
+        for platform, path in [('ont', args.input_path_ont), ('pacbio', args.input_path_pacbio)]:
+            if path:
+                datasets[f'{aligner}_{platform}'] = get_input_files(path, aligner)
+    if not datasets:
+        sys.exit('Error: at least one of --input_path_ont and --input_path_pacbio is required')
+    for files in datasets.values():
+        for f in files:
+            if not os.path.isfile(f):
+                sys.exit(f'Error: {f} is not a file')
+
+    os.makedirs(args.output_path, exist_ok=True)
+    cache_dir = args.cache_dir
+    if cache_dir is None:
+        cache_dir = os.path.join(args.output_path, 'summaries')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    summaries = load_summaries(datasets, cache_dir, args.threads)
+    styles = get_styles(summaries)
+
+    precision_aln_size_log(summaries, styles, args.output_path)
+    precision_mapq(summaries, styles, args.output_path)
+    mapped_alignments(summaries, styles, args.output_path)
+    fragment_length_dist(summaries, styles, args.output_path)
+    BWA_curve(summaries, styles, args.output_path)
+    recall_aln_size_log(summaries, styles, args.output_path)
+    for metric in ['precision', 'recall', 'f_score']:
+        alignments_metric(summaries, styles, args.output_path, metric)
+    mapq_aln_size_log(summaries, styles, args.output_path)
+    save_legend(summaries, styles, args.output_path)
+    print('Done', file=sys.stderr)
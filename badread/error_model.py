@@ -20,52 +20,58 @@ import edlib
 import itertools
 import os
 import pathlib
-import random
-import re
 import sys
 from .alignment import load_alignments, align_sequences
+from .cigar import cigar_tuples
 from .misc import load_fasta, load_fastq, reverse_complement, random_chance, get_random_base, \
-    get_random_different_base, get_open_func, check_alignment_matches_read_and_refs
+    get_random_different_base, get_open_func, check_alignment_matches_read_and_refs, DEFAULT_RNG
+from . import mem_report
 
 
 def make_error_model(args, output=sys.stderr, dot_interval=1000):
-    refs, _, _ = load_fasta(args.reference)
-    reads = load_fastq(args.reads, output=output)
-    alignments = load_alignments(args.alignment, args.max_alignments, output=output)
+    with mem_report.stage('load reference'):
+        refs, _, _ = load_fasta(args.reference)
+    with mem_report.stage('load reads'):
+        reads = load_fastq(args.reads, output=output)
+    with mem_report.stage('load alignments'):
+        alignments = load_alignments(args.alignment, args.max_alignments, output=output)
 
     kmer_list = [''.join(x) for x in itertools.product('ACGT', repeat=args.k_size)]
     kmer_alternatives = {x: collections.defaultdict(int) for x in kmer_list}
 
-    i = 0
-    print('Processing alignments', end='', file=output, flush=True)
-    for a in alignments:
-        check_alignment_matches_read_and_refs(a, reads, refs)
-        read_seq, read_qual = (x[a.read_start:a.read_end] for x in reads[a.read_name])
-        ref_seq = refs[a.ref_name][a.ref_start:a.ref_end]
-
-        if a.strand == '-':
-            ref_seq = reverse_complement(ref_seq)
-        aligned_read_seq, _, aligned_ref_seq, _ = align_sequences(read_seq, read_qual, ref_seq, a)
-        start, end = 0, 0
-        while True:
-            if end > len(aligned_ref_seq):
-                break
-            ref_kmer = aligned_ref_seq[start:end].replace('-', '')
-            if len(ref_kmer) < args.k_size:
-                end += 1
-                continue
-            assert len(ref_kmer) == args.k_size
-            read_kmer = aligned_read_seq[start:end].replace('-', '')
-            if len(read_kmer) > 1 and ref_kmer[0] == read_kmer[0] and ref_kmer[-1] == read_kmer[-1]:
-                kmer_alternatives[ref_kmer][read_kmer] += 1
-            start += 1
-            while aligned_ref_seq[start] == '-':
+    with mem_report.stage('process alignments'):
+        i = 0
+        print('Processing alignments', end='', file=output, flush=True)
+        for a in alignments:
+            check_alignment_matches_read_and_refs(a, reads, refs)
+            read_seq, read_qual = (x[a.read_start:a.read_end] for x in reads[a.read_name])
+            ref_seq = refs[a.ref_name][a.ref_start:a.ref_end]
+
+            if a.strand == '-':
+                ref_seq = reverse_complement(ref_seq)
+            aligned_read_seq, _, aligned_ref_seq, _ = \
+                align_sequences(read_seq, read_qual, ref_seq, a)
+            start, end = 0, 0
+            while True:
+                if end > len(aligned_ref_seq):
+                    break
+                ref_kmer = aligned_ref_seq[start:end].replace('-', '')
+                if len(ref_kmer) < args.k_size:
+                    end += 1
+                    continue
+                assert len(ref_kmer) == args.k_size
+                read_kmer = aligned_read_seq[start:end].replace('-', '')
+                if len(read_kmer) > 1 and ref_kmer[0] == read_kmer[0] and \
+                        ref_kmer[-1] == read_kmer[-1]:
+                    kmer_alternatives[ref_kmer][read_kmer] += 1
                 start += 1
-            end += 1
-        i += 1
-        if i % dot_interval == 0:
-            print('.', end='', file=output, flush=True)
-    print('', file=output, flush=True)
+                while aligned_ref_seq[start] == '-':
+                    start += 1
+                end += 1
+            i += 1
+            if i % dot_interval == 0:
+                print('.', end='', file=output, flush=True)
+        print('', file=output, flush=True)
 
     for kmer in kmer_list:
         alternatives = kmer_alternatives[kmer]
@@ -127,16 +133,16 @@ class ErrorModel(object):
         print(f'\r  done: loaded error distributions for {count} {self.kmer_size}-mers',
               file=output)
 
-    def add_errors_to_kmer(self, kmer):
+    def add_errors_to_kmer(self, kmer, rng=DEFAULT_RNG):
         """
         Takes a k-mer and returns a (possibly) mutated version of the k-mer, along with the edit
         distance.
         """
         if self.type == 'random':
-            return add_one_random_change(kmer)
+            return add_one_random_change(kmer, rng)
 
         if kmer not in self.alternatives:
-            return add_one_random_change(kmer)
+            return add_one_random_change(kmer, rng)
 
         alts = self.alternatives[kmer]
         probs = self.probabilities[kmer]
@@ -148,24 +154,24 @@ class ErrorModel(object):
             alts.append(None)
             probs.append(random_change_prob)
 
-        alt = random.choices(alts, weights=probs)[0]
+        alt = rng.py.choices(alts, weights=probs)[0]
         if alt is None:
-            return add_one_random_change(kmer)
+            return add_one_random_change(kmer, rng)
         else:
             return alt
 
 
-def add_one_random_change(kmer):
+def add_one_random_change(kmer, rng=DEFAULT_RNG):
     result = [x for x in kmer]  # Change 'ACGT' to ['A', 'C', 'G', 'T']
-    error_type = random.choice(['s', 'i', 'd'])
-    error_pos = random.randint(0, len(kmer) - 1)
+    error_type = rng.py.choice(['s', 'i', 'd'])
+    error_pos = rng.py.randint(0, len(kmer) - 1)
     if error_type == 's':  # substitution
-        result[error_pos] = get_random_different_base(result[error_pos])
+        result[error_pos] = get_random_different_base(result[error_pos], rng)
     elif error_type == 'i':  # insertion
-        if random_chance(0.5):
-            result[error_pos] = result[error_pos] + get_random_base()
+        if random_chance(0.5, rng):
+            result[error_pos] = result[error_pos] + get_random_base(rng)
         else:
-            result[error_pos] = get_random_base() + result[error_pos]
+            result[error_pos] = get_random_base(rng) + result[error_pos]
     else:  # deletion
         result[error_pos] = ''
     return result
@@ -196,11 +202,8 @@ def align_kmers(kmer, alt):
     else:
         cigar = edlib.align(alt, kmer, task='path')['cigar']
 
-    cigar_parts = re.findall(r'\d+[IDX=]', cigar)
     kmer_pos, alt_pos = 0, 0
-    for c in cigar_parts:
-        cigar_type = c[-1]
-        cigar_size = int(c[:-1])
+    for cigar_type, cigar_size in cigar_tuples(cigar):
         if cigar_type == '=' or cigar_type == 'X':
             for i in range(cigar_size):
                 result[kmer_pos+1] = alt[alt_pos]
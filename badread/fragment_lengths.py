@@ -19,14 +19,15 @@ import scipy.special
 import scipy.stats
 import sys
 from .quickhist import quickhist_gamma
-from .misc import float_to_str, print_in_two_columns
+from .misc import float_to_str, print_in_two_columns, DEFAULT_RNG
 
 
 class FragmentLengths(object):
 
-    def __init__(self, mean, stdev, output=sys.stderr):
+    def __init__(self, mean, stdev, output=sys.stderr, rng=DEFAULT_RNG):
         self.mean = mean
         self.stdev = stdev
+        self.rng = rng
         print('', file=output)
         if self.stdev == 0:
             self.gamma_k, self.gamma_t = None, None
@@ -44,12 +45,27 @@ class FragmentLengths(object):
                                  output=output)
             quickhist_gamma(gamma_a, gamma_b, n50, 8, output=output)
 
-    def get_fragment_length(self):
+    def get_fragment_length(self, rng=None):
+        """
+        Returns one fragment length, drawn from the given RandomContext (e.g. one for a single
+        read) or else from this object's own.
+        """
         if self.stdev == 0:
             return int(round(self.mean))
         else:  # gamma distribution
-            fragment_length = int(round(np.random.gamma(self.gamma_k, self.gamma_t)))
-            return max(fragment_length, 1)
+            if rng is None:
+                rng = self.rng
+            return max(int(round(rng.np.gamma(self.gamma_k, self.gamma_t))), 1)
+
+    def get_many(self, count):
+        """
+        Returns a NumPy array of count fragment lengths, drawn in a single call.
+        """
+        if self.stdev == 0:
+            return np.full(count, int(round(self.mean)), dtype=np.int64)
+        else:  # gamma distribution
+            fragment_lengths = np.rint(self.rng.np.gamma(self.gamma_k, self.gamma_t, size=count))
+            return np.maximum(fragment_lengths.astype(np.int64), 1)
 
 
 def gamma_parameters(gamma_mean, gamma_stdev):
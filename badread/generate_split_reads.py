@@ -1,8 +1,6 @@
 import sys
-import random
-from badread import misc, fragment_lengths
+from badread import misc, fragment_lengths, simulate, truth
 import pysam
-from scipy.stats import poisson
 
 
 def read_fasta(args):
@@ -15,62 +13,74 @@ def read_fasta(args):
     return fasta
 
 
-def generate_split_reads(args, ref, n_seqs, mean, frag_lengths):
+def generate_split_reads(args, ref, read_indices, mean, frag_lengths, entropy):
     # names of the reference sequences
     chroms = list(ref.references)
     strand = ['forward', 'reverse']
     #generate split-read sequences and corresponding names
-    for n in range(n_seqs):
+    for n in read_indices:
         if mean == 0:
             raise ValueError("mean must be > 0")
+        # each read has its own random streams, so it only depends on the seed and its index
+        rng = misc.get_read_rng(entropy, n)
         blocks = 0
         # choose the number of fragments that a read is split into
         # make sure it is split into more than 0 fragments
         while not blocks:
-            blocks = poisson.rvs(mu=mean, size=1)[0]
+            blocks = rng.np.poisson(mean)
             if not blocks:
                 continue
         ins_seqs = []
         # initialize the name of the read with the number of blocks
-        names = [f">alignments_{blocks}_"]
+        names = [f"alignments_{blocks}_"]
         blk = 0
         # generate fragments until the number of fragments reaches the value stored in blocks
         while blk < blocks:
             # get the length of the block
             # check if the length is longer than 15 bases
-            flen = frag_lengths.get_fragment_length()
+            flen = frag_lengths.get_fragment_length(rng)
             if flen < 15:
                 continue
             # randomly choose a chromosome
-            c = random.choice(chroms)
+            c = rng.py.choice(chroms)
             # randomly choose a strand
-            s = random.choice(strand)
+            s = rng.py.choice(strand)
             #randomly choose the start coordinate of the fragment
             # make sure the start position is not at the end of the chromosome
-            pos = random.randint(1, ref.get_reference_length(c) - flen)
+            pos = rng.py.randint(1, ref.get_reference_length(c) - flen)
             if pos + flen > ref.get_reference_length(c):
                 continue  # happens rarely
             blk += 1
-            # fetch the sequence based on the chosen chromosome, start and end coordinates
-            seq = ref.fetch(c, pos, pos + flen).upper()
+            # plan the fetch of the sequence based on the chosen chromosome, start and end
+            # coordinates (the sequence is fetched later along with the rest of the batch)
+            seq = misc.FetchBlock(c, pos, pos + flen)
             # reverse complement the sequence if 'reverse' strand was chosen
             if s == 'reverse':
-                seq = misc.reverse_complement(seq)
+                seq = seq.reverse_complement()
             ins_seqs.append(seq)
             # add the fragment info the the name
             names.append(f"{c}:{pos}-{pos+flen}")
-        final_seq = "".join(ins_seqs)
         final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
+        yield n, final_name, ins_seqs
 
 
 def generate_reads(args):
     ref = pysam.FastaFile(args.reference)
 
-    print(f"Generating {args.number} split-reads", file=sys.stderr)
+    if args.read_range is None:
+        read_indices = range(args.number)
+        print(f"Generating {args.number} split-reads", file=sys.stderr)
+    else:
+        read_indices = args.read_range
+        print(f"Regenerating split-reads {read_indices.start} to {read_indices.stop - 1}",
+              file=sys.stderr)
 
-    frag_lengths = fragment_lengths.FragmentLengths(args.mean_block_len, args.std_block_len)
-    generate_split_reads(args, ref, args.number, args.mean, frag_lengths)
+    entropy = misc.get_seed_entropy(args.seed)
+    frag_lengths = fragment_lengths.FragmentLengths(args.mean_block_len, args.std_block_len,
+                                                    rng=misc.get_setup_rng(entropy))
+    plans = generate_split_reads(args, ref, read_indices, args.mean, frag_lengths, entropy)
+    with truth.TruthTable(args.truth) as truth_table:
+        templates = misc.fetch_templates(ref, truth_table.record(plans))
+        simulate.write_templates(templates, args, entropy)
 
     print(f"Done", file=sys.stderr)
\ No newline at end of file
@@ -17,16 +17,17 @@ If not, see <http://www.gnu.org/licenses/>.
 import numpy as np
 import sys
 from .quickhist import quickhist_beta
-from .misc import float_to_str, print_in_two_columns
+from .misc import float_to_str, print_in_two_columns, DEFAULT_RNG
 
 
 class Identities(object):
 
-    def __init__(self, mean, stdev, max_identity, output=sys.stderr):
+    def __init__(self, mean, stdev, max_identity, output=sys.stderr, rng=DEFAULT_RNG):
         # Divide by 100 to convert from percentage to fraction
         self.mean = mean / 100.0
         self.stdev = stdev / 100.0
         self.max_identity = max_identity / 100.0
+        self.rng = rng
         print('', file=output)
 
         if self.mean == self.max_identity:
@@ -47,11 +48,26 @@ class Identities(object):
                                  output=output)
             quickhist_beta(self.beta_a, self.beta_b, self.max_identity, 8, output=output)
 
-    def get_identity(self):
+    def get_identity(self, rng=None):
+        """
+        Returns one identity, drawn from the given RandomContext (e.g. one for a single read) or
+        else from this object's own.
+        """
         if self.mean == self.max_identity:
             return self.mean
         else:  # beta distribution
-            return self.max_identity * np.random.beta(self.beta_a, self.beta_b)
+            if rng is None:
+                rng = self.rng
+            return self.max_identity * rng.np.beta(self.beta_a, self.beta_b)
+
+    def get_many(self, count):
+        """
+        Returns a NumPy array of count identities, drawn in a single call.
+        """
+        if self.mean == self.max_identity:
+            return np.full(count, self.mean)
+        else:  # beta distribution
+            return self.max_identity * self.rng.np.beta(self.beta_a, self.beta_b, size=count)
 
 
 def beta_parameters(beta_mean, beta_stdev, beta_max):
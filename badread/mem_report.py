@@ -0,0 +1,240 @@
+"""
+This module contains the memory report made with --mem-report: the peak RSS for each stage of a
+command and, with --mem-report-allocations, the peak traced Python allocation and the largest live
+allocations (by source line).
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+from . import settings
+
+try:
+    import resource
+except ImportError:  # not on Windows
+    resource = None
+
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The report being made, if --mem-report was used.
+REPORT = None
+
+# A function's result and stages, from a worker process.
+WorkerResult = collections.namedtuple('WorkerResult', ['result', 'stages'])
+
+
+def get_rss():
+    """
+    Returns the current and peak resident set size in bytes (None when it can't be read). On Linux
+    the peak can be reset (see reset_peak_rss), otherwise it's the peak for the whole process.
+    """
+    current, peak = None, None
+    try:
+        with open('/proc/self/status', 'rt') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    current = int(line.split()[1]) * 1024
+                elif line.startswith('VmHWM:'):
+                    peak = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if peak is None and resource is not None:
+        peak = get_process_peak_rss()
+    return current, peak
+
+
+def get_process_peak_rss():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != 'darwin':  # kilobytes everywhere but macOS
+        peak *= 1024
+    return peak
+
+
+def get_children_peak_rss():
+    """
+    The largest peak RSS of any finished child process (e.g. a process pool's workers), or None
+    when it can't be read.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    if sys.platform != 'darwin':
+        peak *= 1024
+    return peak or None
+
+
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'wt') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+
+
+def to_mb(size):
+    return None if size is None else round(size / 1e6, 3)
+
+
+def get_location(frame):
+    filename = frame.filename
+    if filename.startswith(PACKAGE_DIR):
+        filename = os.path.relpath(filename, PACKAGE_DIR)
+    return f'{filename}:{frame.lineno}'
+
+
+class MemReport(object):
+    """
+    Records each stage's time and memory, and writes them as JSON. Stages shouldn't be nested, as
+    each one resets the peaks.
+
+    Tracing allocations (with tracemalloc) makes the command several times slower and adds its own
+    memory to the RSS, so it's only done when asked for.
+    """
+    def __init__(self, filename, command, trace_allocations=False):
+        self.filename = filename
+        self.command = command
+        self.trace_allocations = trace_allocations
+        self.stages = []
+        self.start_time = time.time()
+        if trace_allocations:
+            tracemalloc.start(settings.MEM_REPORT_TRACE_FRAMES)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        reset_peak_rss()
+        if self.trace_allocations and hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+        start_rss, _ = get_rss()
+        start_time = time.time()
+        try:
+            yield
+        finally:
+            seconds = time.time() - start_time
+            end_rss, peak_rss = get_rss()
+            stage = {'stage': name, 'seconds': round(seconds, 3),
+                     'rss_start_mb': to_mb(start_rss), 'rss_end_mb': to_mb(end_rss),
+                     'rss_peak_mb': to_mb(peak_rss)}
+            if self.trace_allocations:
+                end_traced, peak_traced = tracemalloc.get_traced_memory()
+                stage.update({'traced_end_mb': to_mb(end_traced),
+                              'traced_peak_mb': to_mb(peak_traced),
+                              'top_allocations': self.top_allocations()})
+            self.stages.append(stage)
+
+    def top_allocations(self):
+        """
+        The source lines holding the most live traced memory. Taking the snapshot costs time and
+        memory, so the peak RSS is reset afterwards.
+        """
+        statistics = tracemalloc.take_snapshot().statistics('lineno')
+        top = [{'location': get_location(stat.traceback[0]), 'size_mb': to_mb(stat.size),
+                'count': stat.count}
+               for stat in statistics[:settings.MEM_REPORT_TOP_ALLOCATIONS]]
+        del statistics
+        reset_peak_rss()
+        return top
+
+    def write(self):
+        # On Linux each stage's peak RSS is reset, so the command's peak is the largest of them
+        # and the peak since the last stage. Elsewhere, it's the peak for the whole process.
+        # Stages run in worker processes (marked with their worker_pid) are left out, as their
+        # memory is reported separately, as children_rss_peak_mb.
+        own_stages = [s for s in self.stages if 'worker_pid' not in s]
+        _, peak_rss = get_rss()
+        peaks = [peak_rss] + [s['rss_peak_mb'] * 1e6 for s in own_stages
+                              if s['rss_peak_mb'] is not None]
+        report = {'command': self.command, 'seconds': round(time.time() - self.start_time, 3),
+                  'rss_peak_mb': to_mb(max((p for p in peaks if p is not None), default=None))}
+        if len(own_stages) < len(self.stages):
+            report['children_rss_peak_mb'] = to_mb(get_children_peak_rss())
+        if self.trace_allocations:
+            # Likewise for the traced peak, which is reset for each stage.
+            report['traced_peak_mb'] = max([s['traced_peak_mb'] for s in own_stages] +
+                                           [to_mb(tracemalloc.get_traced_memory()[1])])
+        report['stages'] = self.stages
+        if self.trace_allocations:
+            report['top_allocations_at_end'] = self.top_allocations()
+            tracemalloc.stop()
+        with open(self.filename, 'wt') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+
+
+def start(filename, command, trace_allocations=False):
+    global REPORT
+    REPORT = None if filename is None else MemReport(filename, command, trace_allocations)
+
+
+def stage(name):
+    """
+    Records a stage in the memory report, if one is being made (otherwise does nothing).
+    """
+    if REPORT is None:
+        return no_stage()
+    return REPORT.stage(name)
+
+
+@contextlib.contextmanager
+def no_stage():
+    yield
+
+
+def in_worker(function):
+    """
+    Wraps a function to run in a worker process (e.g. in a process pool). When a report is being
+    made, the worker records its own stages and returns them with the function's result, and
+    collect passes them to the report. Without a report, the function is returned unchanged.
+    """
+    if REPORT is None:
+        return function
+    return functools.partial(run_in_worker, function, REPORT.trace_allocations)
+
+
+def run_in_worker(function, trace_allocations, *args):
+    global REPORT
+    REPORT = MemReport(None, None, trace_allocations)
+    try:
+        result = function(*args)
+        pid = os.getpid()
+        return WorkerResult(result, [dict(s, worker_pid=pid) for s in REPORT.stages])
+    finally:
+        if trace_allocations:
+            tracemalloc.stop()
+        REPORT = None
+
+
+def collect(result):
+    """
+    Takes a result from a function wrapped by in_worker, adds its worker's stages to the report
+    and returns the function's own result.
+    """
+    if not isinstance(result, WorkerResult):
+        return result
+    if REPORT is not None:
+        REPORT.stages.extend(result.stages)
+    return result.result
+
+
+def finish():
+    global REPORT
+    if REPORT is not None:
+        REPORT.write()
+        REPORT = None
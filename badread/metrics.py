@@ -0,0 +1,113 @@
+"""
+Binning and tp/fp/fn aggregation shared by the benchmark and comparison code. Each table is made
+with one grouped aggregation, instead of a Python loop over the groups.
+"""
+
+import collections
+import numpy as np
+import pandas as pd
+
+
+# Alignment sizes are binned to the nearest multiple of this.
+SIZE_BIN = 25
+
+COUNT_COLUMNS = ['tp', 'fp', 'fn']
+
+# An alignment matches a true block when both of its ends are within this many bases of the
+# block's ends.
+MATCH_TOLERANCE = 50
+
+
+def get_size_bin_edges(max_size, base=SIZE_BIN):
+    """
+    The edges between size bins: halfway between consecutive multiples of base, up to max_size.
+    """
+    return base * (np.arange(int(np.ceil(max_size / base)) + 1) + 0.5)
+
+
+def size_bins(sizes, base=SIZE_BIN):
+    """
+    Labels each size with its bin: the nearest multiple of base. Missing sizes stay missing.
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    missing = np.isnan(sizes)
+    if missing.all():
+        return sizes.copy()
+    edges = get_size_bin_edges(np.nanmax(sizes), base)
+    bins = base * np.digitize(sizes, edges).astype(float)
+    bins[missing] = np.nan
+    return bins
+
+
+def add_rates(table):
+    """
+    Adds precision, recall and F-score columns to a table of tp/fp/fn counts. A rate is missing
+    (NaN) where its denominator is zero.
+    """
+    tp = table['tp']
+    fp = table['fp'] if 'fp' in table else 0
+    fn = table['fn'] if 'fn' in table else 0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if 'fp' in table:
+            table['precision'] = (tp / (tp + fp)).where(tp + fp != 0)
+        if 'fn' in table:
+            table['recall'] = (tp / (tp + fn)).where(tp + fn != 0)
+        table['f_score'] = (2 * tp / (2 * tp + fp + fn)).where(2 * tp + fp + fn != 0)
+    return table
+
+
+def group_metrics(df, by, sums=()):
+    """
+    Groups rows by a column (sorted, rows where it's missing are left out) and returns, per group:
+    the number of rows (n), the sums of whichever of tp, fp and fn are present (missing values
+    count as zero), the sums of any other columns in sums, and the rates from add_rates.
+    """
+    aggregations = {'n': (by, 'size')}
+    for column in COUNT_COLUMNS + list(sums):
+        if column in df:
+            aggregations[column] = (column, 'sum')
+    table = df.groupby(by).agg(**aggregations)
+    return add_rates(table)
+
+
+def cumulative_metrics(table, reverse=False):
+    """
+    Running totals of n, tp, fp and fn through a grouped table (from the last group back to the
+    first if reverse), with the rates of the running totals.
+    """
+    columns = [c for c in ['n'] + COUNT_COLUMNS if c in table]
+    counts = table[columns]
+    if reverse:
+        cumulative = counts[::-1].cumsum()[::-1]
+    else:
+        cumulative = counts.cumsum()
+    return add_rates(cumulative.copy())
+
+
+def blocks_match(block_a, block_b, tolerance=MATCH_TOLERANCE):
+    """
+    Whether two (chrom, start, end, ...) blocks match. Only the coordinates are compared.
+    """
+    return abs(block_a[1] - block_b[1]) < tolerance and abs(block_a[2] - block_b[2]) < tolerance
+
+
+class BinCounter(object):
+    """
+    Running n/tp/fp/fn counts per key (e.g. size bin or MapQ), for building the same tables as
+    group_metrics without keeping the rows.
+    """
+    def __init__(self):
+        self.counts = collections.defaultdict(lambda: [0, 0, 0, 0])
+
+    def add(self, key, n=0, tp=0, fp=0, fn=0):
+        counts = self.counts[key]
+        counts[0] += n
+        counts[1] += tp
+        counts[2] += fp
+        counts[3] += fn
+
+    def table(self, name):
+        keys = sorted(self.counts)
+        table = pd.DataFrame([self.counts[k] for k in keys], columns=['n'] + COUNT_COLUMNS,
+                             index=pd.Index(keys, name=name))
+        return add_rates(table)
@@ -17,10 +17,14 @@ import collections
 import contextlib
 import gzip
 import io
+import itertools
+import numpy as np
 import os
 import random
 import re
 import sys
+from . import settings
+from .cigar import parse_cigar, cigar_identity
 
 
 def get_compression_type(filename):
@@ -68,8 +72,85 @@ def complement_base(base):
         return 'N'
 
 
+class ComplementTable(dict):
+    """
+    A str.translate table built from REV_COMP_DICT. Characters not in the table complement to 'N',
+    same as complement_base.
+    """
+    def __missing__(self, key):
+        return 'N'
+
+
+REV_COMP_TABLE = ComplementTable(str.maketrans(REV_COMP_DICT))
+
+
 def reverse_complement(seq):
-    return ''.join([complement_base(x) for x in seq][::-1])
+    return seq.translate(REV_COMP_TABLE)[::-1]
+
+
+class FetchBlock(collections.namedtuple('FetchBlock', ['contig', 'start', 'end', 'reverse'])):
+    """
+    A piece of reference sequence (0-based, end not included) which a read template needs, but
+    which hasn't been fetched yet. See fetch_templates.
+    """
+    __slots__ = ()
+
+    def __new__(cls, contig, start, end, reverse=False):
+        return super().__new__(cls, contig, start, end, reverse)
+
+    def reverse_complement(self):
+        return self._replace(reverse=not self.reverse)
+
+
+def fetch_templates(ref, plans, batch_size=None):
+    """
+    Takes planned read templates, (read index, name, parts) where each part is a FetchBlock or a
+    literal sequence, and yields (read index, name, sequence) in the same order. The blocks for a
+    batch of reads are fetched together, sorted by contig and position, instead of one at a time
+    in random order.
+    """
+    if batch_size is None:
+        batch_size = settings.FETCH_BATCH_SIZE
+    plans = iter(plans)
+    while True:
+        batch = list(itertools.islice(plans, batch_size))
+        if not batch:
+            return
+        blocks = [part for _, _, parts in batch for part in parts
+                  if isinstance(part, FetchBlock)]
+        fetched = fetch_blocks(ref, blocks)
+        for read_index, name, parts in batch:
+            seq = []
+            for part in parts:
+                if isinstance(part, FetchBlock):
+                    part_seq = fetched[(part.contig, part.start, part.end)]
+                    seq.append(reverse_complement(part_seq) if part.reverse else part_seq)
+                else:
+                    seq.append(part)
+            yield read_index, name, ''.join(seq)
+
+
+def fetch_blocks(ref, blocks):
+    """
+    Fetches the blocks' sequences (upper case) in sorted order, and returns them in a dictionary
+    keyed by (contig, start, end). Blocks which overlap or are close together are fetched as one
+    span and sliced.
+    """
+    intervals = sorted(set((b.contig, b.start, b.end) for b in blocks))
+    fetched = {}
+    i = 0
+    while i < len(intervals):
+        contig, span_start, span_end = intervals[i]
+        j = i + 1
+        while j < len(intervals) and intervals[j][0] == contig and \
+                intervals[j][1] <= span_end + settings.FETCH_MERGE_GAP:
+            span_end = max(span_end, intervals[j][2])
+            j += 1
+        span = ref.fetch(contig, span_start, span_end).upper()
+        for _, start, end in intervals[i:j]:
+            fetched[(contig, start, end)] = span[start - span_start:end - span_start]
+        i = j
+    return fetched
 
 
 def get_sequence_file_type(filename):
@@ -152,33 +233,174 @@ def load_fasta(filename):
     return fasta_seqs, depths, circular
 
 
-RANDOM_SEQ_DICT = {0: 'A', 1: 'C', 2: 'G', 3: 'T'}
+RANDOM_SEQ_BYTES = np.frombuffer(b'ACGT', dtype=np.uint8)
+
+
+def random_sequence_from_numpy(length, generator):
+    """
+    Builds a random sequence in one go, by drawing base indices with a NumPy Generator and looking
+    them up in a byte table.
+    """
+    indices = generator.integers(0, 4, size=length)
+    return RANDOM_SEQ_BYTES[indices].tobytes().decode()
+
+
+class RandomSequencePool(object):
+    """
+    A block of pre-generated random sequence which is handed out in consecutive slices, so short
+    requests (single bases, k-mer padding, glitches) don't each pay for a NumPy call.
+    """
+    def __init__(self, size, generator):
+        self.size = size
+        self.generator = generator
+        self.pool = ''
+        self.pos = 0
+
+    def get(self, length):
+        if self.pos + length > len(self.pool):
+            self.pool = random_sequence_from_numpy(max(self.size, length), self.generator)
+            self.pos = 0
+        seq = self.pool[self.pos:self.pos+length]
+        self.pos += length
+        return seq
+
+
+class RandomContext(object):
+    """
+    All of the random number generators used to make something (e.g. one simulated read): a Python
+    random.Random (py), a NumPy Generator (np) and a pool of random sequence drawn from the NumPy
+    Generator. Everything is seeded from a single NumPy SeedSequence, so the result is a pure
+    function of that seed sequence.
+    """
+    def __init__(self, seed_sequence=None):
+        self.py, self.np, self.seq_pool = None, None, None
+        self.set_seed_sequence(seed_sequence)
+
+    def set_seed_sequence(self, seed_sequence):
+        if seed_sequence is None:
+            seed_sequence = np.random.SeedSequence()
+        py_seed_sequence, np_seed_sequence = seed_sequence.spawn(2)
+        self.py = random.Random(int(py_seed_sequence.generate_state(1, dtype=np.uint64)[0]))
+        self.np = np.random.Generator(np.random.PCG64(np_seed_sequence))
+        self.seq_pool = RandomSequencePool(settings.RANDOM_SEQ_POOL_SIZE, self.np)
+
+    def seed(self, seed):
+        self.set_seed_sequence(np.random.SeedSequence(seed))
+
 
+# Used whenever a function isn't given a RandomContext of its own.
+DEFAULT_RNG = RandomContext()
 
-def get_random_base():
+
+def get_seed_entropy(seed):
+    """
+    Returns the entropy that the setup and per-read RandomContexts are derived from: the seed
+    itself or, when there isn't one, fresh entropy from the OS.
+    """
+    return np.random.SeedSequence(seed).entropy
+
+
+def get_setup_rng(entropy):
+    """
+    Returns the RandomContext used for everything which happens once before any reads are made
+    (sampling lengths to adjust depths, random adapters, etc.).
+    """
+    return RandomContext(np.random.SeedSequence(entropy, spawn_key=(0,)))
+
+
+def get_read_rng(entropy, read_index):
+    """
+    Returns the RandomContext for one read. Each read's context depends only on the entropy and
+    the read's index, so reads don't depend on what was made before them.
+    """
+    return RandomContext(np.random.SeedSequence(entropy, spawn_key=(1, read_index)))
+
+
+def get_sequencing_rng(entropy, read_index):
+    """
+    Returns the RandomContext used to add errors and qscores to a read whose template was made with
+    get_read_rng (e.g. split reads sequenced in the same process). It is a separate stream, so the
+    templates are the same whether or not they are sequenced.
+    """
+    return RandomContext(np.random.SeedSequence(entropy, spawn_key=(2, read_index)))
+
+
+def get_assignment_rng(entropy):
+    """
+    Returns the numpy Generator used to give every read a category up front, in one vectorised
+    pass (e.g. the SV type in simple_sv). Reads take its draws in index order, so a read's category
+    doesn't depend on how many reads are made.
+    """
+    return np.random.default_rng(np.random.SeedSequence(entropy, spawn_key=(3,)))
+
+
+def get_random_base(rng=DEFAULT_RNG):
     """
     Returns a random base with 25% probability of each.
     """
-    return RANDOM_SEQ_DICT[random.randint(0, 3)]
+    return rng.seq_pool.get(1)
 
 
-def get_random_different_base(b):
-    random_base = get_random_base()
+def get_random_different_base(b, rng=DEFAULT_RNG):
+    random_base = get_random_base(rng)
     while b == random_base:
-        random_base = get_random_base()
+        random_base = get_random_base(rng)
     return random_base
 
 
-def get_random_sequence(length):
+def get_random_sequence(length, rng=DEFAULT_RNG):
     """
-    Returns a random sequence of the given length.
+    Returns a random sequence of the given length. Short sequences are sliced from the context's
+    pool and long ones are generated directly.
     """
-    return ''.join([get_random_base() for _ in range(length)])
+    if length <= 0:
+        return ''
+    if length <= settings.RANDOM_SEQ_POOL_MAX_REQUEST:
+        return rng.seq_pool.get(length)
+    return random_sequence_from_numpy(length, rng.np)
 
 
-def random_chance(chance):
+class ContigSampler(object):
+    """
+    Chooses contigs in proportion to their weights. The weights are turned into a cumulative array
+    once, and contigs are chosen with a binary search, so each draw costs the same no matter how
+    many contigs there are.
+    """
+    def __init__(self, contigs, weights, rng=DEFAULT_RNG):
+        assert len(contigs) == len(weights) and len(contigs) > 0
+        self.contigs = list(contigs)
+        self.cumulative_weights = np.cumsum(np.asarray(weights, dtype=float))
+        assert self.cumulative_weights[-1] > 0.0
+        self.rng = rng
+
+    def __len__(self):
+        return len(self.contigs)
+
+    def get_many(self, count, rng=None):
+        """
+        Returns a list of count randomly chosen contigs.
+        """
+        if rng is None:
+            rng = self.rng
+        total = self.cumulative_weights[-1]
+        indices = np.searchsorted(self.cumulative_weights, rng.np.random(count) * total,
+                                  side='right')
+        indices = np.minimum(indices, len(self.contigs) - 1)
+        return [self.contigs[i] for i in indices]
+
+    def get(self, rng=None):
+        """
+        Returns one randomly chosen contig, drawn from the given RandomContext (e.g. one for a
+        single read) or else from the sampler's own.
+        """
+        if len(self.contigs) == 1:
+            return self.contigs[0]
+        return self.get_many(1, rng)[0]
+
+
+def random_chance(chance, rng=DEFAULT_RNG):
     assert 0.0 <= chance <= 1.0
-    return random.random() < chance
+    return rng.py.random() < chance
 
 
 END_FORMATTING = '\033[0m'
@@ -220,23 +442,28 @@ def str_is_int(s):
         return False
 
 
+def parse_read_range(range_str):
+    """
+    Parses a read range given as START:END (zero-based read indices, END not included) and returns
+    it as a range.
+    """
+    try:
+        start, end = [int(x) for x in range_str.split(':')]
+    except ValueError:
+        sys.exit(f'Error: could not parse read range "{range_str}"\n'
+                 f'  --read-range must be two integers separated by a colon (e.g. 1000:1010)')
+    if start < 0 or end <= start:
+        sys.exit(f'Error: invalid read range "{range_str}"\n'
+                 f'  START must be non-negative and END must be larger than START')
+    return range(start, end)
+
+
 def str_is_dna_sequence(s):
     return set(s) <= {'A', 'C', 'G', 'T'}
 
 
 def identity_from_edlib_cigar(cigar):
-    matches, alignment_length = 0, 0
-    cigar_parts = re.findall(r'\d+[IDX=]', cigar)
-    for c in cigar_parts:
-        cigar_type = c[-1]
-        cigar_size = int(c[:-1])
-        alignment_length += cigar_size
-        if cigar_type == '=':
-            matches += cigar_size
-    try:
-        return matches / alignment_length
-    except ZeroDivisionError:
-        return 0.0
+    return cigar_identity(*parse_cigar(cigar))
 
 
 @contextlib.contextmanager
@@ -15,13 +15,22 @@ details. You should have received a copy of the GNU General Public License along
 If not, see <http://www.gnu.org/licenses/>.
 """
 
+import concurrent.futures
 import matplotlib
+import matplotlib.figure
 import matplotlib.pyplot as plt
+import numpy as np
+import os
 import sys
 
-from .alignment import load_alignments, align_sequences
+from .alignment import load_alignments, read_error_profile
 from .misc import load_fasta, load_fastq, reverse_complement
-from .qscore_model import qscore_char_to_val
+
+
+WINDOW_TABLE_COLUMNS = ['read_name', 'read_length', 'read_start', 'read_end', 'strand',
+                        'ref_name', 'ref_start', 'ref_end', 'alignment_identity', 'windows',
+                        'mean_window_identity', 'min_window_identity', 'median_window_identity',
+                        'max_window_identity', 'mean_window_qscore', 'min_window_qscore']
 
 
 def plot_window_identity(args, output=sys.stdout):
@@ -29,47 +38,124 @@ def plot_window_identity(args, output=sys.stdout):
     refs, _, _ = load_fasta(args.reference)
     alignments = load_alignments(args.alignment, output=output)
 
+    if args.table is not None or args.images is not None:
+        write_window_statistics(alignments, reads, refs, args, output)
+        return
+
     for a in alignments:
         print(a)
-        read_seq, read_qual = (x[a.read_start:a.read_end] for x in reads[a.read_name])
-        ref_seq = refs[a.ref_name][a.ref_start:a.ref_end]
-        if a.strand == '-':
-            ref_seq = reverse_complement(ref_seq)
-        _, _, _, errors_per_read_pos = align_sequences(read_seq, read_qual, ref_seq, a)
-        positions, identities = get_window_means(errors_per_read_pos, args.window, a.read_start,
-                                                 convert_to_identity=True)
-
-        if args.qual:
-            read_qual = [qscore_char_to_val(q) for q in read_qual]
-            _, qualities = get_window_means(read_qual, args.window, a.read_start,
-                                            convert_to_identity=False)
-        else:
-            qualities = None
-
+        read_seq, read_qual, ref_seq = get_aligned_sequences(a, reads, refs)
+        positions, identities, qualities = get_alignment_windows(read_seq, read_qual, ref_seq, a,
+                                                                 args.window, args.qual)
         if not args.no_plot:
             plot_one_alignment(positions, identities, qualities, args.window, a,
                                len(reads[a.read_name][0]))
 
 
+def get_aligned_sequences(a, reads, refs):
+    read_seq, read_qual = (x[a.read_start:a.read_end] for x in reads[a.read_name])
+    ref_seq = refs[a.ref_name][a.ref_start:a.ref_end]
+    if a.strand == '-':
+        ref_seq = reverse_complement(ref_seq)
+    return read_seq, read_qual, ref_seq
+
+
+def get_alignment_windows(read_seq, read_qual, ref_seq, a, window_size, qual):
+    """
+    Returns the window centre positions, window identities and (if qual) window mean qscores for
+    one alignment.
+    """
+    errors_per_read_pos = read_error_profile(read_seq, ref_seq, a)
+    positions, identities = get_window_means(errors_per_read_pos, window_size, a.read_start,
+                                             convert_to_identity=True)
+    if qual:
+        read_qual = np.frombuffer(read_qual.encode(), dtype=np.uint8).astype(np.int64) - 33
+        _, qualities = get_window_means(read_qual, window_size, a.read_start,
+                                        convert_to_identity=False)
+    else:
+        qualities = None
+    return positions, identities, qualities
+
+
 def get_window_means(errors_per_read_pos, window_size, read_start, convert_to_identity=True):
-    positions, means = [], []
-    window_sum = sum(errors_per_read_pos[:window_size])
-    for i in range(len(errors_per_read_pos) - window_size):
-        window_start = i
-        window_end = i + window_size
-        window_centre = i + (window_size // 2)
-
-        if convert_to_identity:
-            means.append(100.0 * (1.0 - window_sum / window_size))
-        else:
-            means.append(window_sum / window_size)
-        positions.append(read_start + window_centre)
-
-        window_sum -= errors_per_read_pos[window_start]
-        window_sum += errors_per_read_pos[window_end]
+    """
+    Returns the centre positions and means of each full window (the last window before the end of
+    the sequence is left out), from the differences of a cumulative sum.
+    """
+    values = np.asarray(errors_per_read_pos)
+    window_count = max(len(values) - window_size, 0)
+    cumulative = np.concatenate(([0], np.cumsum(values)))
+    window_sums = cumulative[window_size:window_size + window_count] - cumulative[:window_count]
+    positions = read_start + np.arange(window_count) + (window_size // 2)
+    if convert_to_identity:
+        means = 100.0 * (1.0 - window_sums / window_size)
+    else:
+        means = window_sums / window_size
     return positions, means
 
 
+def write_window_statistics(alignments, reads, refs, args, output):
+    """
+    The headless mode: summarises every alignment's windows into a table (and optionally saves
+    each alignment's plot as an image), processing the alignments in parallel.
+    """
+    if args.images is not None:
+        os.makedirs(args.images, exist_ok=True)
+    jobs = []
+    for a in alignments:
+        read_seq, read_qual, ref_seq = get_aligned_sequences(a, reads, refs)
+        jobs.append((read_seq, read_qual, ref_seq, a, len(reads[a.read_name][0]), args.window,
+                     args.qual, args.images))
+
+    if args.threads > 1 and len(jobs) > 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=args.threads) as executor:
+            rows = list(executor.map(alignment_window_statistics, jobs,
+                                     chunksize=max(1, len(jobs) // (args.threads * 4))))
+    else:
+        rows = [alignment_window_statistics(job) for job in jobs]
+
+    if args.table is not None:
+        with open(args.table, 'wt') as table:
+            table.write('\t'.join(WINDOW_TABLE_COLUMNS) + '\n')
+            for row in rows:
+                table.write('\t'.join(format_value(row[c]) for c in WINDOW_TABLE_COLUMNS) + '\n')
+    print(f'Summarised {len(rows):,} alignments', file=output)
+
+
+def alignment_window_statistics(job):
+    read_seq, read_qual, ref_seq, a, read_length, window_size, qual, image_dir = job
+    positions, identities, qualities = get_alignment_windows(read_seq, read_qual, ref_seq, a,
+                                                             window_size, qual)
+    if image_dir is not None:
+        save_one_alignment(os.path.join(image_dir, get_image_name(a)), positions, identities,
+                           qualities, window_size, a, read_length)
+    has_windows = len(identities) > 0
+    return {'read_name': a.read_name, 'read_length': read_length,
+            'read_start': a.read_start, 'read_end': a.read_end, 'strand': a.strand,
+            'ref_name': a.ref_name, 'ref_start': a.ref_start, 'ref_end': a.ref_end,
+            'alignment_identity': a.percent_identity, 'windows': len(identities),
+            'mean_window_identity': np.mean(identities) if has_windows else None,
+            'min_window_identity': np.min(identities) if has_windows else None,
+            'median_window_identity': np.median(identities) if has_windows else None,
+            'max_window_identity': np.max(identities) if has_windows else None,
+            'mean_window_qscore': np.mean(qualities) if qual and has_windows else None,
+            'min_window_qscore': np.min(qualities) if qual and has_windows else None}
+
+
+def get_image_name(a):
+    # A read can have several alignments, so the name includes the alignment's coordinates.
+    name = f'{a.read_name}_{a.read_start}-{a.read_end}_{a.ref_name}_{a.ref_start}.png'
+    return name.replace('/', '_')
+
+
+def format_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (float, np.floating)):
+        return f'{value:.3f}'
+    return str(value)
+
+
 class MyAxes(matplotlib.axes.Axes):
     name = 'MyAxes'
 
@@ -82,18 +168,32 @@ matplotlib.projections.register_projection(MyAxes)
 
 def plot_one_alignment(positions, identities, qualities, window_size, alignment, read_length):
     fig, ax1 = plt.subplots(1, 1, figsize=(12, 3), subplot_kw={'projection': 'MyAxes'})
-    ax1.plot(positions, identities, '-', color='#8F0505')
-
-    plt.ylabel(f'% identity ({window_size} bp windows)')
-    plt.title(f'{alignment.read_name} ({read_length} bp, '
-              f'{alignment.percent_identity:.1f}% identity)')
+    draw_one_alignment(ax1, positions, identities, qualities, window_size, alignment, read_length)
     ax1.set_xlim([0, 10000])
+    fig.canvas.manager.toolbar.pan()
+    plt.show()
+
+
+def save_one_alignment(filename, positions, identities, qualities, window_size, alignment,
+                       read_length):
+    # A Figure without pyplot, so no GUI backend or global figure state is involved.
+    fig = matplotlib.figure.Figure(figsize=(12, 3))
+    ax1 = fig.add_subplot(1, 1, 1)
+    draw_one_alignment(ax1, positions, identities, qualities, window_size, alignment, read_length)
+    ax1.set_xlim([0, read_length])
+    fig.tight_layout()
+    fig.savefig(filename, dpi=100)
+
+
+def draw_one_alignment(ax1, positions, identities, qualities, window_size, alignment,
+                       read_length):
+    ax1.plot(positions, identities, '-', color='#8F0505')
+    ax1.set_ylabel(f'% identity ({window_size} bp windows)')
+    ax1.set_title(f'{alignment.read_name} ({read_length} bp, '
+                  f'{alignment.percent_identity:.1f}% identity)')
     ax1.set_ylim([50, 100])
 
     if qualities is not None:
         ax2 = ax1.twinx()
         ax2.plot(positions, qualities, '-', color='#05058F')
         ax2.set_ylim([5, 25])
-
-    fig.canvas.manager.toolbar.pan()
-    plt.show()
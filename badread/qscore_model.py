@@ -17,55 +17,49 @@ If not, see <http://www.gnu.org/licenses/>.
 
 import collections
 import edlib
+import itertools
+import numpy as np
 import os
 import pathlib
-import random
 import re
 import statistics
 import sys
 from .alignment import load_alignments, align_sequences
+from .cigar import parse_cigar, cigar_identity, column_count, expand_cigar, query_columns, \
+    target_columns, gapped_sequence
 from .misc import load_fasta, load_fastq, reverse_complement, float_to_str, get_open_func, \
-    identity_from_edlib_cigar, check_alignment_matches_read_and_refs
-from . import settings
+    check_alignment_matches_read_and_refs, DEFAULT_RNG
+from . import mem_report, settings
 
 
-def get_qscores(seq, frag, qscore_model):
+def get_qscores(seq, frag, qscore_model, rng=DEFAULT_RNG):
     assert len(seq) > 0
 
     # TODO: I fear this full sequence alignment will be slow for long and inaccurate sequences.
     #       Can I break it into chunks for better performance?
-    cigar = edlib.align(seq, frag, task='path')['cigar']
-    actual_identity = identity_from_edlib_cigar(cigar)
+    ops, lengths = parse_cigar(edlib.align(seq, frag, task='path')['cigar'])
+    actual_identity = cigar_identity(ops, lengths)
+    full_cigar = expand_cigar(ops, lengths)
 
-    aligned_seq, aligned_frag, full_cigar = align_sequences_from_edlib_cigar(seq, frag, cigar)
+    # Each base's k-mer is pulled back to a smaller one near the seq ends, and the k-mer's ends
+    # are found in the alignment.
     unaligned_len = len(seq)
-    margins = (qscore_model.kmer_size - 1) // 2
+    positions = np.arange(unaligned_len)
+    margins = np.minimum((qscore_model.kmer_size - 1) // 2,
+                         np.minimum(positions, unaligned_len - 1 - positions))
+    seq_pos_to_alignment_pos = query_columns(ops, lengths)
+    starts = seq_pos_to_alignment_pos[positions - margins].tolist()
+    ends = seq_pos_to_alignment_pos[positions + margins].tolist()
 
     qscores, error_probs = [], []
-
-    seq_pos_to_alignment_pos = {}
-    i, j = 0, 0
-    for c in full_cigar:
-        if c != 'D':
-            seq_pos_to_alignment_pos[i] = j
-            i += 1
-        j += 1
-
-    for i in range(unaligned_len):
-        start = i - margins
-        end = i + margins
-        while start < 0 or end >= unaligned_len:  # pull back to a smaller k-mer near the seq ends
-            start += 1
-            end -= 1
-        start = seq_pos_to_alignment_pos[start]
-        end = seq_pos_to_alignment_pos[end]
+    for start, end in zip(starts, ends):
         partial_cigar = full_cigar[start:end + 1]
         assert not partial_cigar.startswith('D')
         assert not partial_cigar.endswith('D')
         k_size = len(partial_cigar.replace('D', ''))
         assert k_size <= qscore_model.kmer_size
         assert k_size % 2 == 1  # should be an odd length k-mer
-        q = qscore_model.get_qscore(partial_cigar)
+        q = qscore_model.get_qscore(partial_cigar, rng)
 
         qscores.append(q)
         error_probs.append(qscore_char_to_error_prob(q))
@@ -76,9 +70,12 @@ def get_qscores(seq, frag, qscore_model):
 
 
 def make_qscore_model(args, output=sys.stderr, dot_interval=1000):
-    refs, _, _ = load_fasta(args.reference)
-    reads = load_fastq(args.reads, output=output)
-    alignments = load_alignments(args.alignment, args.max_alignments, output=output)
+    with mem_report.stage('load reference'):
+        refs, _, _ = load_fasta(args.reference)
+    with mem_report.stage('load reads'):
+        reads = load_fastq(args.reads, output=output)
+    with mem_report.stage('load alignments'):
+        alignments = load_alignments(args.alignment, args.max_alignments, output=output)
 
     # The k-mer size has to be odd, so there is a middle base from which we can get the qscore.
     assert args.k_size % 2 == 1
@@ -89,64 +86,65 @@ def make_qscore_model(args, output=sys.stderr, dot_interval=1000):
     p = re.compile('D{' + str(args.max_del) + ',}')
     max_del = 'D' * args.max_del
 
-    i = 0
-    print('Processing alignments', end='', file=output, flush=True)
-    for a in alignments:
-        check_alignment_matches_read_and_refs(a, reads, refs)
-        read_seq, read_qual = (x[a.read_start:a.read_end] for x in reads[a.read_name])
-        ref_seq = refs[a.ref_name][a.ref_start:a.ref_end]
-
-        if a.strand == '-':
-            ref_seq = reverse_complement(ref_seq)
-        aligned_read_seq, aligned_read_qual, aligned_ref_seq, _ = \
-            align_sequences(read_seq, read_qual, ref_seq, a, gap_char=' ')
-
-        for k_size in range(1, args.k_size+2, 2):  # Do all odd k-mer sizes up to the setting
-            start, end = 0, 0
-            while True:
-                if end > len(aligned_read_seq):
-                    break
-                read_kmer = aligned_read_seq[start:end]
-                if len(read_kmer.replace(' ', '')) < k_size:
-                    end += 1
-                    continue
-                read_kmer_qual = aligned_read_qual[start:end].replace(' ', '')
-                assert len(read_kmer.replace(' ', '')) == len(read_kmer_qual) == k_size
-                ref_kmer = aligned_ref_seq[start:end]
-
-                cigar = []
-                for j, read_base in enumerate(read_kmer):
-                    ref_base = ref_kmer[j]
-                    assert read_base != ' ' or ref_base != ' '
-                    if read_base == ref_base:
-                        cigar.append('=')
-                    elif read_base == ' ':
-                        cigar.append('D')
-                    elif ref_base == ' ':
-                        cigar.append('I')
-                    else:
-                        cigar.append('X')
-                cigar = ''.join(cigar)
-                assert len(cigar.replace('D', '')) == k_size
-                cigar = p.sub(max_del, cigar)
-
-                qscore = read_kmer_qual[(k_size - 1) // 2]
-                qscore = qscore_char_to_val(qscore)
-
-                if k_size == 1:
-                    overall_qscores[qscore] += 1
-                per_cigar_qscores[cigar][qscore] += 1
-
-                start += 1
-                if start >= len(aligned_read_seq):
-                    break
-                while aligned_read_seq[start] == ' ':
+    with mem_report.stage('process alignments'):
+        i = 0
+        print('Processing alignments', end='', file=output, flush=True)
+        for a in alignments:
+            check_alignment_matches_read_and_refs(a, reads, refs)
+            read_seq, read_qual = (x[a.read_start:a.read_end] for x in reads[a.read_name])
+            ref_seq = refs[a.ref_name][a.ref_start:a.ref_end]
+
+            if a.strand == '-':
+                ref_seq = reverse_complement(ref_seq)
+            aligned_read_seq, aligned_read_qual, aligned_ref_seq, _ = \
+                align_sequences(read_seq, read_qual, ref_seq, a, gap_char=' ')
+
+            for k_size in range(1, args.k_size+2, 2):  # Do all odd k-mer sizes up to the setting
+                start, end = 0, 0
+                while True:
+                    if end > len(aligned_read_seq):
+                        break
+                    read_kmer = aligned_read_seq[start:end]
+                    if len(read_kmer.replace(' ', '')) < k_size:
+                        end += 1
+                        continue
+                    read_kmer_qual = aligned_read_qual[start:end].replace(' ', '')
+                    assert len(read_kmer.replace(' ', '')) == len(read_kmer_qual) == k_size
+                    ref_kmer = aligned_ref_seq[start:end]
+
+                    cigar = []
+                    for j, read_base in enumerate(read_kmer):
+                        ref_base = ref_kmer[j]
+                        assert read_base != ' ' or ref_base != ' '
+                        if read_base == ref_base:
+                            cigar.append('=')
+                        elif read_base == ' ':
+                            cigar.append('D')
+                        elif ref_base == ' ':
+                            cigar.append('I')
+                        else:
+                            cigar.append('X')
+                    cigar = ''.join(cigar)
+                    assert len(cigar.replace('D', '')) == k_size
+                    cigar = p.sub(max_del, cigar)
+
+                    qscore = read_kmer_qual[(k_size - 1) // 2]
+                    qscore = qscore_char_to_val(qscore)
+
+                    if k_size == 1:
+                        overall_qscores[qscore] += 1
+                    per_cigar_qscores[cigar][qscore] += 1
+
                     start += 1
-                end += 1
-        i += 1
-        if i % dot_interval == 0:
-            print('.', end='', file=output, flush=True)
-    print('', file=output, flush=True)
+                    if start >= len(aligned_read_seq):
+                        break
+                    while aligned_read_seq[start] == ' ':
+                        start += 1
+                    end += 1
+            i += 1
+            if i % dot_interval == 0:
+                print('.', end='', file=output, flush=True)
+        print('', file=output, flush=True)
 
     print_qscore_fractions('overall', overall_qscores, 0)
 
@@ -177,6 +175,7 @@ class QScoreModel(object):
 
     def __init__(self, model_type_or_filename, output=sys.stderr):
         self.scores, self.probabilities = {}, {}
+        self.resolved = {}
         self.kmer_size = 1
         self.type = None
         this_script_dir = pathlib.Path(os.path.dirname(os.path.realpath(__file__)))
@@ -202,6 +201,8 @@ class QScoreModel(object):
         assert 'X' in self.scores
         assert 'I' in self.scores
 
+        self.resolve_contexts()
+
     def set_up_random_model(self, output):
         print('\nUsing a random qscore model', file=output)
         self.type = 'random'
@@ -266,45 +267,57 @@ class QScoreModel(object):
             print(f'\r  done: loaded qscore distributions for {count} alignments',
                   file=output)
 
-    def get_qscore(self, cigar):
+    def resolve_contexts(self):
         """
-        If the cigar is in the model, then we use it to choose a qscore. If not, then we trim the
-        cigar down by 2 (1 off each end) and try again with the simpler cigar.
+        Builds the table used by get_qscore: every deletion-free cigar up to the model's k-mer size
+        is mapped directly to the distribution it falls back to, so the trimming in resolve_cigar
+        happens here once instead of for every base. Cigars containing deletions are resolved the
+        first time they are seen and then remembered (up to a limit, to bound memory).
         """
+        self.resolved = {}
+        for k_size in range(1, self.kmer_size + 1, 2):
+            for cigar in itertools.product('=XI', repeat=k_size):
+                self.resolve_cigar(''.join(cigar))
+        for cigar in self.scores:
+            self.resolve_cigar(cigar)
+
+    def resolve_cigar(self, cigar):
+        """
+        If the cigar is in the model, then we use its distribution. If not, then we trim the cigar
+        down by 2 (1 off each end) and try again with the simpler cigar. The result is stored as
+        qscore characters and cumulative weights, ready for random.choices.
+        """
+        original_cigar = cigar
         while True:
             assert len(cigar.replace('D', '')) % 2 == 1
             if cigar in self.scores:
-                scores = self.scores[cigar]
-                probs = self.probabilities[cigar]
-                qscore = random.choices(scores, weights=probs)[0]
                 break
-            else:
-                cigar = cigar[1:-1].strip('D')
-        return qscore_val_to_char(qscore)
+            cigar = cigar[1:-1].strip('D')
+        if cigar in self.resolved:
+            distribution = self.resolved[cigar]
+        else:
+            qscores = [qscore_val_to_char(q) for q in self.scores[cigar]]
+            cum_weights = list(itertools.accumulate(self.probabilities[cigar]))
+            distribution = (qscores, cum_weights)
+            self.resolved[cigar] = distribution
+        if len(self.resolved) < settings.QSCORE_CONTEXT_CACHE_SIZE:
+            self.resolved[original_cigar] = distribution
+        return distribution
+
+    def get_qscore(self, cigar, rng=DEFAULT_RNG):
+        try:
+            qscores, cum_weights = self.resolved[cigar]
+        except KeyError:
+            qscores, cum_weights = self.resolve_cigar(cigar)
+        return rng.py.choices(qscores, cum_weights=cum_weights)[0]
 
 
 def align_sequences_from_edlib_cigar(seq, frag, cigar, gap_char='-'):
-    aligned_seq, aligned_frag, full_cigar = [], [], []
-    seq_pos, frag_pos = 0, 0
-    cigar_parts = re.findall(r'\d+[IDX=]', cigar)
-    for c in cigar_parts:
-        cigar_type = c[-1]
-        cigar_size = int(c[:-1])
-        if cigar_type == '=' or cigar_type == 'X':
-            aligned_seq.append(seq[seq_pos:seq_pos+cigar_size])
-            aligned_frag.append(frag[frag_pos:frag_pos+cigar_size])
-            seq_pos += cigar_size
-            frag_pos += cigar_size
-        elif cigar_type == 'I':
-            aligned_seq.append(seq[seq_pos:seq_pos+cigar_size])
-            aligned_frag.append(gap_char * cigar_size)
-            seq_pos += cigar_size
-        elif cigar_type == 'D':
-            aligned_seq.append(gap_char * cigar_size)
-            aligned_frag.append(frag[frag_pos:frag_pos+cigar_size])
-            frag_pos += cigar_size
-        full_cigar.append(cigar_type * cigar_size)
-    return ''.join(aligned_seq), ''.join(aligned_frag), ''.join(full_cigar)
+    ops, lengths = parse_cigar(cigar)
+    count = column_count(ops, lengths)
+    aligned_seq = gapped_sequence(seq, query_columns(ops, lengths), count, gap_char)
+    aligned_frag = gapped_sequence(frag, target_columns(ops, lengths), count, gap_char)
+    return aligned_seq, aligned_frag, expand_cigar(ops, lengths)
 
 
 def uniform_dist_scores_and_probs(bottom_q, top_q):
@@ -1,8 +1,6 @@
 import sys
-import random
-from badread import misc, fragment_lengths
+from badread import misc, fragment_lengths, simulate, truth
 import pysam
-from scipy.stats import poisson
 
 
 def read_fasta(args):
@@ -15,39 +13,38 @@ def read_fasta(args):
     return fasta
 
 
-def generate_same_chr(args, ref, n_seqs, mean, frag_lengths):
+def generate_same_chr(args, ref, read_indices, mean, frag_lengths, entropy):
     chroms = list(ref.references)
     strand = ['forward', 'reverse']
-    for n in range(n_seqs):
+    for n in read_indices:
         if mean == 0:
             raise ValueError("mean must be > 0")
+        rng = misc.get_read_rng(entropy, n)
         blocks = 0
-        c = random.choice(chroms)
+        c = rng.py.choice(chroms)
         while not blocks:
-            blocks = poisson.rvs(mu=mean, size=1)[0]
+            blocks = rng.np.poisson(mean)
             if not blocks:
                 continue
         ins_seqs = []
-        names = [f">alignments_{blocks}_"]
+        names = [f"alignments_{blocks}_"]
         blk = 0
         while blk < blocks:
-            flen = frag_lengths.get_fragment_length()
+            flen = frag_lengths.get_fragment_length(rng)
             if flen < 15:
                 continue
-            s = random.choice(strand)
-            pos = random.randint(1, ref.get_reference_length(c) - flen)
+            s = rng.py.choice(strand)
+            pos = rng.py.randint(1, ref.get_reference_length(c) - flen)
             if pos + flen > ref.get_reference_length(c):
                 continue  # happens rarely
             blk += 1
-            seq = ref.fetch(c, pos, pos + flen).upper()
+            seq = misc.FetchBlock(c, pos, pos + flen)
             if s == 'reverse':
-                seq = misc.reverse_complement(seq)
+                seq = seq.reverse_complement()
             ins_seqs.append(seq)
             names.append(f"{c}:{pos}-{pos+flen}")
-        final_seq = "".join(ins_seqs)
         final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
+        yield n, final_name, ins_seqs
 
 
 def generate_same_chr_reads(args):
@@ -55,7 +52,12 @@ def generate_same_chr_reads(args):
 
     print(f"Generating {args.number} split-reads", file=sys.stderr)
 
-    frag_lengths = fragment_lengths.FragmentLengths(args.mean_block_len, args.std_block_len)
-    generate_same_chr(args, ref, args.number, args.mean, frag_lengths)
+    entropy = misc.get_seed_entropy(args.seed)
+    frag_lengths = fragment_lengths.FragmentLengths(args.mean_block_len, args.std_block_len,
+                                                    rng=misc.get_setup_rng(entropy))
+    plans = generate_same_chr(args, ref, range(args.number), args.mean, frag_lengths, entropy)
+    with truth.TruthTable(args.truth) as truth_table:
+        templates = misc.fetch_templates(ref, truth_table.record(plans))
+        simulate.write_templates(templates, args, entropy)
 
     print(f"Done", file=sys.stderr)
\ No newline at end of file
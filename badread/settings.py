@@ -45,6 +45,37 @@ IDEAL_QSCORE_RANK_5_MIN, IDEAL_QSCORE_RANK_5_MAX = 31, 40
 IDEAL_QSCORE_RANK_6_MIN, IDEAL_QSCORE_RANK_6_MAX = 41, 50
 
 
+# Qscore models resolve each alignment context (cigar) to a distribution once and then remember it.
+# Contexts without deletions are all resolved when the model loads, but those with deletions are
+# remembered as they are seen, up to this many in total.
+QSCORE_CONTEXT_CACHE_SIZE = 1000000
+
+
 # Chimeric reads may or may not get adapters in the middle.
 CHIMERA_START_ADAPTER_CHANCE = 0.25
 CHIMERA_END_ADAPTER_CHANCE = 0.25
+
+
+# Random sequence (padding, glitches, random reads, etc.) is generated with NumPy. Requests up to
+# RANDOM_SEQ_POOL_MAX_REQUEST bases are sliced from a pre-generated pool of RANDOM_SEQ_POOL_SIZE
+# bases, which is refilled when used up. Each read gets its own pool, so this is kept small.
+RANDOM_SEQ_POOL_SIZE = 4096
+RANDOM_SEQ_POOL_MAX_REQUEST = 1000
+
+
+# With --checkpoint, simulate saves its progress (and makes its output safe to truncate) at most
+# this often, in seconds.
+CHECKPOINT_INTERVAL = 60.0
+
+
+# The split-read generators plan the reference blocks for this many reads at a time, then fetch
+# them sorted by position. Blocks on the same contig which are at most FETCH_MERGE_GAP bases apart
+# are fetched with a single call.
+FETCH_BATCH_SIZE = 10000
+FETCH_MERGE_GAP = 1000
+
+
+# With --mem-report, tracemalloc keeps this many frames for each allocation, and each stage of the
+# report lists the source lines holding the most memory, up to MEM_REPORT_TOP_ALLOCATIONS of them.
+MEM_REPORT_TRACE_FRAMES = 1
+MEM_REPORT_TOP_ALLOCATIONS = 10
@@ -1,8 +1,7 @@
+import numpy as np
 import sys
-import random
-from badread import misc, fragment_lengths
+from badread import misc, fragment_lengths, settings, simulate, truth
 import pysam
-from scipy.stats import poisson
 
 
 def read_fasta(args):
@@ -15,351 +14,275 @@ def read_fasta(args):
     return fasta
 
 
-def generate_duplication(args, ref, n_seqs, frag_lengths, valid_chroms, fix_overlap):
-    chroms = valid_chroms
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        seqs = []
-        names = [f">duplication_"]
-        c = random.choice(chroms)
-        s = random.choice(strand)
-
-        flen = []
-        blk = 0
-        while blk < 2:
-            f = frag_lengths.get_fragment_length()
-            if f < 15:
-                continue
-            if ref.get_reference_length(c) - 3 * f < 0:
-                c = random.choice(chroms)
-                continue
-            if blk == 0:
-                pos = random.randint(f, ref.get_reference_length(c) - 3*f)
-            blk += 1
-            flen.append(f)
-
-        seq1 = ref.fetch(c, pos, pos + flen[0]).upper()
-        names.append(f"{c}:{pos}-{pos + flen[0]}")
-        overlap = random.uniform(fix_overlap, 1)
-
-        if flen[0] > flen[1]:
-            seq2 = ref.fetch(c, pos + flen[0] - int(overlap * flen[1]), pos + flen[0] - int(overlap * flen[1]) + flen[1]).upper()
-            names.append(f"{c}:{pos + flen[0] - int(overlap * flen[1])}-{pos + flen[0] - int(overlap * flen[1]) + flen[1]}")
-        if flen[0] <= flen[1]:
-            seq2 = ref.fetch(c, pos + flen[0] - int(overlap * flen[0]), pos + flen[0] - int(overlap * flen[0]) + flen[1]).upper()
-            names.append(f"{c}:{pos + flen[0] - int(overlap * flen[0])}-{pos + flen[0] - int(overlap * flen[0]) + flen[1]}")
-
-        if s == 'reverse':
-            seq1 = misc.reverse_complement(seq1)
-            seq2 = misc.reverse_complement(seq2)
-
-        seqs.append(seq1)
-        seqs.append(seq2)
-
-        final_seq = "".join(seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
-def generate_translocation(args, ref, n_seqs, frag_lengths):
-    chroms = list(ref.references)
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        blocks = 2
-        ins_seqs = []
-        names = [f">translocation_"]
-        blk = 0
-        while blk < blocks:
-            c = random.choice(chroms)
-            s = random.choice(strand)
-            flen = frag_lengths.get_fragment_length()
-            if flen < 15:
-                continue
-            pos = random.randint(1, ref.get_reference_length(c) - flen)
-            if pos + flen > ref.get_reference_length(c):
-                continue  # happens rarely
-            blk += 1
-            seq = ref.fetch(c, pos, pos + flen).upper()
-            if s == 'reverse':
-                seq = misc.reverse_complement(seq)
-            ins_seqs.append(seq)
-            names.append(f"{c}:{pos}-{pos+flen}")
-        final_seq = "".join(ins_seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
-
-def generate_inversion3(args, ref, n_seqs, frag_lengths, valid_chroms):
-    chroms = valid_chroms
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        c = random.choice(chroms)
-        s = random.choice(strand)
-        flen = []
-        blk = 0
-        while blk < 3:
-            f = frag_lengths.get_fragment_length()
-            if f < 15:
-                continue
-            if blk == 0:
-                if ref.get_reference_length(c) - 3*f < 0:
-                    c = random.choice(chroms)
-                    continue
-                pos = random.randint(1, ref.get_reference_length(c) - 3*f)
-            blk += 1
-            flen.append(f)
-
-        seq3 = ref.fetch(c, pos + flen[0] + flen[1], pos + flen[0] + flen[1] +flen[2]).upper()
-        seq2 = ref.fetch(c, pos + flen[0], pos + flen[0] + flen[1]).upper()
-        seq1 = ref.fetch(c, pos, pos + flen[0]).upper()
-
-        if s == 'reverse':
-            seq1 = misc.reverse_complement(seq1)
-            seq3 = misc.reverse_complement(seq3)
-        else:
-            seq2 = misc.reverse_complement(seq2)
-
-        ins_seqs = [seq1, seq2, seq3]
-        names = [f">inversion3_", f"{c}:{pos}-{pos+flen[0]}",
-                 f"{c}:{pos + flen[0]}-{pos + flen[0] + flen[1]}",
-                 f"{c}:{pos + flen[0] + flen[1]}-{pos + flen[0] + flen[1] +flen[2]}"]
-        final_seq = "".join(ins_seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
-
-def generate_inversion2(args, ref, n_seqs, frag_lengths, valid_chroms):
-    chroms = valid_chroms
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        c = random.choice(chroms)
-        s = random.choice(strand)
-        flen = []
-        blk = 0
-        while blk < 2:
-            f = frag_lengths.get_fragment_length()
-            if f < 15:
-                continue
-            if blk == 0:
-                if ref.get_reference_length(c) - 3*f < 0:
-                    c = random.choice(chroms)
-                    continue
-                pos = random.randint(1, ref.get_reference_length(c) - 3*f)
-            blk += 1
-            flen.append(f)
-
-        seq2 = ref.fetch(c, pos + flen[0], pos + flen[0] + flen[1]).upper()
-        seq1 = ref.fetch(c, pos, pos + flen[0]).upper()
-
-        if s == 'reverse':
-            seq1 = misc.reverse_complement(seq1)
-        else:
-            seq2 = misc.reverse_complement(seq2)
-
-        ins_seqs = [seq1, seq2]
-        names = [f">inversion2_", f"{c}:{pos}-{pos+flen[0]}",
-                 f"{c}:{pos + flen[0]}-{pos + flen[0] + flen[1]}"]
-        final_seq = "".join(ins_seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
-
-def generate_deletion(args, ref, n_seqs, frag_lengths, valid_chroms):
-    chroms = valid_chroms
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        c = random.choice(chroms)
-        s = random.choice(strand)
-        flen = []
-        blk = 0
-        while blk < 3:
-            f = frag_lengths.get_fragment_length()
-            if f < 15:
-                continue
-            if blk == 0:
-                if ref.get_reference_length(c) - 3*f < 0:
-                    c = random.choice(chroms)
-                    continue
-                pos = random.randint(1, ref.get_reference_length(c) - 3*f)
-            blk += 1
-            flen.append(f)
-
-        seq1 = ref.fetch(c, pos, pos + flen[0]).upper()
-        seq3 = ref.fetch(c, pos + flen[0] + flen[1],  pos + flen[0] + flen[1] + flen[2]).upper()
-
-        if s == 'reverse':
-            seq1 = misc.reverse_complement(seq1)
-            seq3 = misc.reverse_complement(seq3)
-
-        seqs = [seq1, seq3]
-        names = [f">deletion_", f"{c}:{pos}-{pos + flen[0]}",
-                 f"{c}:{pos + flen[0] + flen[1]}-{pos + flen[0] + flen[1] + flen[2]}"]
-        final_seq = "".join(seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
-
-def generate_insertion(args, ref, n_seqs, frag_lengths, valid_chroms):
-    chroms = valid_chroms
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        # randomly choose a chromosome/contig
-        c = random.choice(chroms)
-        # randomly choose a strand
-        s = random.choice(strand)
-        flen = []
-        pos = []
-        blk = 0
-        while blk < 3:
-            # choose a fragment length
-            f = frag_lengths.get_fragment_length()
-            # if it's too short choose again
-            if f < 15:
-                continue
-            # use the same chromosome/contig for each fragment in the read
-            # choose the position of the first fragment in the read
-            # make sure the first fragment is not at the end of the chromosome/contig
-            if blk == 0:
-                if ref.get_reference_length(c) - 3*f < 0:
-                    c = random.choice(chroms)
-                    continue
-                p = random.randint(1, ref.get_reference_length(c) - 3*f)
-            if blk ==1:
-                p = random.randint(1, ref.get_reference_length(c) - 3 * f)
-            blk += 1
-            flen.append(f)
-            pos.append(p)
-        # fetch the sequences from the reference based on the chosen chromosome/contig and position
-        seq1 = ref.fetch(c, pos[0], pos[0] + flen[0]).upper()
-        seq2 = ref.fetch(c, pos[1], pos[1] + flen[0]).upper()
-        seq3 = ref.fetch(c, pos[0] + flen[0], pos[0] + flen[0] + flen[2]).upper()
-
-        if s == 'reverse':
-            seq1 = misc.reverse_complement(seq1)
-            seq2 = misc.reverse_complement(seq2)
-            seq3 = misc.reverse_complement(seq3)
-
-
-        seqs = [seq1, seq2, seq3]
-        names = [f">insertion_", f"{c}:{pos[0]}-{pos[0]+flen[0]}",
-                 f"{c}:{pos[1]}-{pos[1] + flen[1]}",
-                 f"{c}:{pos[0] + flen[0] + 1}-{pos[0] + flen[0] + flen[2]}"]
-        final_seq = "".join(seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
-
-def DNA(length):
-    DNA=''
-    for l in range(length):
-        DNA += random.choice('CGTA')
-    return DNA
-
-
-def generate_random_insertion(args, ref, n_seqs, frag_lengths, valid_chroms):
-    chroms = valid_chroms
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        c = random.choice(chroms)
-        s = random.choice(strand)
-        flen = []
-        blk = 0
-        while blk < 3:
-            f = frag_lengths.get_fragment_length()
-            if f < 15:
-                continue
-            if blk == 0:
-                if ref.get_reference_length(c) - 3*f < 0:
-                    c = random.choice(chroms)
-                    continue
-                pos = random.randint(1, ref.get_reference_length(c) - 3*f)
-            blk += 1
-            flen.append(f)
-
-        seq1 = ref.fetch(c, pos, pos + flen[0]).upper()
-        seq2 = DNA(flen[1])
-        seq3 = ref.fetch(c, pos + flen[0] + 1, pos + flen[0] + flen[2]).upper()
-
-        if s == 'reverse':
-            seq1 = misc.reverse_complement(seq1)
-            seq3 = misc.reverse_complement(seq3)
-
-        seqs = [seq1, seq2, seq3]
-        names = [f">randominsertion_", f"{c}:{pos}-{pos+flen[0]}",
-                 f"randomchr:0-0",
-                 f"{c}:{pos + flen[0] + 1}-{pos + flen[0] + flen[2]}"]
-        final_seq = "".join(seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
-
-def generate_N_insertion(args, ref, n_seqs, frag_lengths, valid_chroms):
-    chroms = valid_chroms
-    strand = ['forward', 'reverse']
-    for n in range(n_seqs):
-        c = random.choice(chroms)
-        s = random.choice(strand)
-        flen = []
-        blk = 0
-        while blk < 3:
-            f = frag_lengths.get_fragment_length()
-            if f < 15:
-                continue
-            if blk == 0:
-                if ref.get_reference_length(c) - 3*f < 0:
-                    c = random.choice(chroms)
-                    continue
-                pos = random.randint(1, ref.get_reference_length(c) - 3*f)
-            blk += 1
-            flen.append(f)
-
-        seq1 = ref.fetch(c, pos, pos + flen[0]).upper()
-        seq2 = flen[1] * 'N'
-        seq3 = ref.fetch(c, pos + flen[0] + 1, pos + flen[0] + flen[2]).upper()
-
-        if s == 'reverse':
-            seq1 = misc.reverse_complement(seq1)
-            seq3 = misc.reverse_complement(seq3)
-
-        seqs = [seq1, seq2, seq3]
-        names = [f">ninsertion_", f"{c}:{pos}-{pos+flen[0]}",
-                 f"N:0-0",
-                 f"{c}:{pos + flen[0] + 1}-{pos + flen[0] + flen[2]}"]
-        final_seq = "".join(seqs)
-        final_name = "_".join(names)
-        print(final_name)
-        print(final_seq)
-
+class ContigTable(object):
+    """
+    The reference contigs' lengths, looked up once. Contigs are kept sorted from longest to
+    shortest, so the contigs which are long enough for a block are always a prefix of the table
+    and one can be chosen directly, instead of choosing any contig and retrying if it's too short.
+    """
+    def __init__(self, names, lengths, weights=None):
+        order = sorted(range(len(names)), key=lambda i: lengths[i], reverse=True)
+        self.names = [names[i] for i in order]
+        self.lengths = {name: length for name, length in zip(names, lengths)}
+        self.sorted_lengths = np.array([lengths[i] for i in order], dtype=np.int64)
+
+        # Contigs are chosen uniformly unless weights are given.
+        if weights is None:
+            weights = [1.0] * len(names)
+        self.cumulative_weights = np.cumsum([float(weights[i]) for i in order])
+
+        # The longest block for which three blocks fit on the longest contig, with room for a
+        # start position of at least 1.
+        self.max_block_length = int((self.sorted_lengths[0] - 1) // 3) if len(names) else 0
+
+    def __len__(self):
+        return len(self.names)
+
+    def sample(self, min_length, rng=misc.DEFAULT_RNG):
+        """
+        Returns a random contig of at least min_length bases, or None if there isn't one.
+        """
+        count = int(np.searchsorted(-self.sorted_lengths, -min_length, side='right'))
+        if count == 0:
+            return None
+        total = self.cumulative_weights[count - 1]
+        i = int(np.searchsorted(self.cumulative_weights, rng.py.random() * total, side='right'))
+        return self.names[min(i, count - 1)]
+
+
+def draw_blocks(rng, frag_lengths, contigs, count):
+    """
+    Draws the lengths (each at least 15 bp) of count blocks which come from the same contig, and
+    returns them with that contig and the start of the first block. The contig has room for three
+    blocks of the first block's length after the start.
+    """
+    flen = []
+    while len(flen) < count:
+        f = frag_lengths.get_fragment_length(rng)
+        if f < 15:
+            continue
+        if not flen:
+            c = contigs.sample(3*f + 1, rng)
+            if c is None:
+                continue  # no contig is long enough for this block length
+            pos = rng.py.randint(1, contigs.lengths[c] - 3*f)
+        flen.append(f)
+    return c, pos, flen
+
+
+# Each SV type has a builder which plans one read: given the read's RandomContext, the block
+# lengths, the contig table and the read's strand, it returns the read's block names and its parts
+# (FetchBlocks or literal sequences). New SV types only need a builder added to SV_TYPES.
+
+def make_duplication(rng, frag_lengths, contigs, reverse, args):
+    flen = []
+    while len(flen) < 2:
+        f = frag_lengths.get_fragment_length(rng)
+        if f < 15:
+            continue
+        if not flen:
+            c = contigs.sample(4*f, rng)
+            if c is None:
+                continue  # no contig is long enough for this block length
+            pos = rng.py.randint(f, contigs.lengths[c] - 3*f)
+        elif contigs.lengths[c] - 3*f < 0:
+            continue  # too long for the contig chosen by the first block
+        flen.append(f)
+
+    overlap = rng.py.uniform(args.fix_overlap, 1)
+    start2 = pos + flen[0] - int(overlap * min(flen))
+    return ([f"{c}:{pos}-{pos + flen[0]}", f"{c}:{start2}-{start2 + flen[1]}"],
+            [misc.FetchBlock(c, pos, pos + flen[0], reverse),
+             misc.FetchBlock(c, start2, start2 + flen[1], reverse)])
+
+
+def make_deletion(rng, frag_lengths, contigs, reverse, args):
+    c, pos, flen = draw_blocks(rng, frag_lengths, contigs, 3)
+    start3 = pos + flen[0] + flen[1]
+    return ([f"{c}:{pos}-{pos + flen[0]}", f"{c}:{start3}-{start3 + flen[2]}"],
+            [misc.FetchBlock(c, pos, pos + flen[0], reverse),
+             misc.FetchBlock(c, start3, start3 + flen[2], reverse)])
+
+
+def make_random_insertion(rng, frag_lengths, contigs, reverse, args):
+    c, pos, flen = draw_blocks(rng, frag_lengths, contigs, 3)
+    end1 = pos + flen[0]
+    return ([f"{c}:{pos}-{end1}", "randomchr:0-0", f"{c}:{end1 + 1}-{end1 + flen[2]}"],
+            [misc.FetchBlock(c, pos, end1, reverse),
+             misc.get_random_sequence(flen[1], rng),
+             misc.FetchBlock(c, end1 + 1, end1 + flen[2], reverse)])
+
+
+def make_n_insertion(rng, frag_lengths, contigs, reverse, args):
+    c, pos, flen = draw_blocks(rng, frag_lengths, contigs, 3)
+    end1 = pos + flen[0]
+    return ([f"{c}:{pos}-{end1}", "N:0-0", f"{c}:{end1 + 1}-{end1 + flen[2]}"],
+            [misc.FetchBlock(c, pos, end1, reverse),
+             flen[1] * 'N',
+             misc.FetchBlock(c, end1 + 1, end1 + flen[2], reverse)])
+
+
+def make_insertion(rng, frag_lengths, contigs, reverse, args):
+    # The inserted block comes from a second position on the same contig.
+    flen, pos = [], []
+    while len(flen) < 3:
+        f = frag_lengths.get_fragment_length(rng)
+        if f < 15:
+            continue
+        if len(flen) == 0:
+            c = contigs.sample(3*f + 1, rng)
+            if c is None:
+                continue  # no contig is long enough for this block length
+            p = rng.py.randint(1, contigs.lengths[c] - 3*f)
+        if len(flen) == 1:
+            if contigs.lengths[c] - 3*f < 1:
+                continue  # too long for the contig chosen by the first block
+            p = rng.py.randint(1, contigs.lengths[c] - 3*f)
+        flen.append(f)
+        pos.append(p)
+
+    end1 = pos[0] + flen[0]
+    return ([f"{c}:{pos[0]}-{end1}", f"{c}:{pos[1]}-{pos[1] + flen[1]}",
+             f"{c}:{end1 + 1}-{end1 + flen[2]}"],
+            [misc.FetchBlock(c, pos[0], end1, reverse),
+             misc.FetchBlock(c, pos[1], pos[1] + flen[0], reverse),
+             misc.FetchBlock(c, end1, end1 + flen[2], reverse)])
+
+
+def make_inversion2(rng, frag_lengths, contigs, reverse, args):
+    c, pos, flen = draw_blocks(rng, frag_lengths, contigs, 2)
+    end1 = pos + flen[0]
+    return ([f"{c}:{pos}-{end1}", f"{c}:{end1}-{end1 + flen[1]}"],
+            [misc.FetchBlock(c, pos, end1, reverse),
+             misc.FetchBlock(c, end1, end1 + flen[1], not reverse)])
+
+
+def make_inversion3(rng, frag_lengths, contigs, reverse, args):
+    c, pos, flen = draw_blocks(rng, frag_lengths, contigs, 3)
+    end1 = pos + flen[0]
+    end2 = end1 + flen[1]
+    return ([f"{c}:{pos}-{end1}", f"{c}:{end1}-{end2}", f"{c}:{end2}-{end2 + flen[2]}"],
+            [misc.FetchBlock(c, pos, end1, reverse),
+             misc.FetchBlock(c, end1, end2, not reverse),
+             misc.FetchBlock(c, end2, end2 + flen[2], reverse)])
+
+
+def make_translocation(rng, frag_lengths, contigs, reverse, args):
+    # Two unrelated blocks, which can be on different contigs and strands. The first block uses
+    # the read's strand and the second gets its own.
+    names, parts = [], []
+    while len(parts) < 2:
+        flen = frag_lengths.get_fragment_length(rng)
+        if flen < 15:
+            continue
+        c = contigs.sample(flen + 1, rng)
+        if c is None:
+            continue  # no contig is long enough for this block length
+        pos = rng.py.randint(1, contigs.lengths[c] - flen)
+        if parts:
+            reverse = rng.py.choice(STRANDS) == 'reverse'
+        names.append(f"{c}:{pos}-{pos + flen}")
+        parts.append(misc.FetchBlock(c, pos, pos + flen, reverse))
+    return names, parts
+
+
+STRANDS = ['forward', 'reverse']
+
+SV_TYPES = {'duplication': make_duplication,
+            'deletion': make_deletion,
+            'randominsertion': make_random_insertion,
+            'ninsertion': make_n_insertion,
+            'insertion': make_insertion,
+            'inversion2': make_inversion2,
+            'inversion3': make_inversion3,
+            'translocation': make_translocation}
+
+
+def parse_sv_mix(mix):
+    """
+    Parses an SV mix like 'deletion=0.4,inversion3=0.1' and returns a dictionary of SV type to
+    proportion (the weights don't need to sum to one). Types which aren't given aren't made.
+    """
+    weights = {}
+    for part in mix.split(','):
+        sv_type, sep, weight = part.partition('=')
+        sv_type = sv_type.strip().lower()
+        if sv_type not in SV_TYPES:
+            sys.exit(f'Error: unknown SV type "{sv_type}" in --sv-mix (choose from '
+                     f'{", ".join(SV_TYPES)})')
+        if sv_type in weights:
+            sys.exit(f'Error: SV type "{sv_type}" is given more than once in --sv-mix')
+        try:
+            weight = float(weight) if sep else 1.0
+        except ValueError:
+            sys.exit(f'Error: could not parse the weight of "{sv_type}" in --sv-mix')
+        if not weight >= 0.0 or weight == float('inf'):
+            sys.exit(f'Error: the weight of "{sv_type}" in --sv-mix must be a non-negative number')
+        weights[sv_type] = weight
+    total = sum(weights.values())
+    if total <= 0.0:
+        sys.exit('Error: the weights in --sv-mix must not all be zero')
+    return {sv_type: weight / total for sv_type, weight in weights.items()}
+
+
+def get_read_types(number, mix, entropy, batch_size=None):
+    """
+    Yields (read index, SV type) for every read. Without a mix, each SV type gets its own block of
+    number reads, in SV_TYPES order. With a mix, there are number reads in total and their types
+    are drawn by weight, a batch at a time.
+    """
+    if mix is None:
+        for i, sv_type in enumerate(SV_TYPES):
+            for n in range(i * number, (i+1) * number):
+                yield n, sv_type
+        return
+    if batch_size is None:
+        batch_size = settings.FETCH_BATCH_SIZE
+    sv_types = list(mix)
+    cumulative_weights = np.cumsum([mix[t] for t in sv_types])
+    cumulative_weights /= cumulative_weights[-1]
+    generator = misc.get_assignment_rng(entropy)
+    for batch_start in range(0, number, batch_size):
+        count = min(batch_size, number - batch_start)
+        choices = np.searchsorted(cumulative_weights, generator.random(count), side='right')
+        for n, choice in enumerate(choices.tolist(), start=batch_start):
+            yield n, sv_types[min(choice, len(sv_types) - 1)]
+
+
+def plan_svs(read_types, frag_lengths, contigs, entropy, args):
+    """
+    Plans the template for each (read index, SV type) and yields (read index, name, parts), ready
+    for misc.fetch_templates. Every read gets its own random streams, so a read doesn't depend on
+    the reads before it.
+    """
+    for n, sv_type in read_types:
+        rng = misc.get_read_rng(entropy, n)
+        reverse = rng.py.choice(STRANDS) == 'reverse'
+        block_names, parts = SV_TYPES[sv_type](rng, frag_lengths, contigs, reverse, args)
+        yield n, '_'.join([f"{sv_type}_"] + block_names), parts
 
 
 def generate_svs(args):
     ref = pysam.FastaFile(args.reference)
 
-    print(f"Generating {args.number} SVs", file=sys.stderr)
-
-    frag_lengths = fragment_lengths.FragmentLengths(args.mean_block_len, args.std_block_len)
-
-    sample = [frag_lengths.get_fragment_length() for _ in range(10000)]
-    max_len = max(sample)
-    chroms = list(ref.references)
-    valid_chroms = []
-    for c in chroms:
-        if 3 * max_len < ref.get_reference_length(c):
-            valid_chroms.append(c)
-
-    generate_duplication(args, ref, args.number, frag_lengths, valid_chroms, args.fix_overlap)
-    generate_deletion(args, ref, args.number, frag_lengths, valid_chroms)
-    generate_random_insertion(args, ref, args.number, frag_lengths, valid_chroms)
-    generate_N_insertion(args, ref, args.number, frag_lengths, valid_chroms)
-    generate_insertion(args, ref, args.number, frag_lengths, valid_chroms)
-    generate_inversion2(args, ref, args.number, frag_lengths, valid_chroms)
-    generate_inversion3(args, ref, args.number, frag_lengths, valid_chroms)
-    generate_translocation(args, ref, args.number, frag_lengths)
-
-    print(f"Done", file=sys.stderr)
\ No newline at end of file
+    mix = None if args.sv_mix is None else parse_sv_mix(args.sv_mix)
+    if mix is None:
+        print(f"Generating {args.number} SVs of each type", file=sys.stderr)
+    else:
+        print(f"Generating {args.number} SVs: " +
+              ", ".join(f"{t} {w:.1%}" for t, w in mix.items() if w > 0.0), file=sys.stderr)
+
+    entropy = misc.get_seed_entropy(args.seed)
+    frag_lengths = fragment_lengths.FragmentLengths(args.mean_block_len, args.std_block_len,
+                                                    rng=misc.get_setup_rng(entropy))
+    contigs = ContigTable(ref.references, ref.lengths)
+    if contigs.max_block_length < 15:
+        sys.exit('Error: no reference contig is long enough for three 15 bp blocks')
+
+    read_types = get_read_types(args.number, mix, entropy)
+    plans = plan_svs(read_types, frag_lengths, contigs, entropy, args)
+    with truth.TruthTable(args.truth) as truth_table:
+        templates = misc.fetch_templates(ref, truth_table.record(plans))
+        simulate.write_templates(templates, args, entropy)
+
+    print(f"Done", file=sys.stderr)
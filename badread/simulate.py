@@ -15,102 +15,356 @@ If not, see <http://www.gnu.org/licenses/>.
 """
 
 import edlib
+import gzip
+import json
 import numpy as np
-import random
+import os
 import sys
+import time
 import uuid
 from .misc import load_fasta, get_random_sequence, reverse_complement, random_chance, \
-    float_to_str, str_is_int, identity_from_edlib_cigar
+    float_to_str, str_is_int, identity_from_edlib_cigar, ContigSampler, DEFAULT_RNG, \
+    get_seed_entropy, get_setup_rng, get_read_rng, get_sequencing_rng
 from .error_model import ErrorModel
 from .qscore_model import QScoreModel, get_qscores
 from .fragment_lengths import FragmentLengths
 from .identities import Identities
 from .version import __version__
-from . import settings
+from . import mem_report, settings
 
 
 def simulate(args, output=sys.stderr):
     print_intro(output)
-    if args.seed is not None:
-        random.seed(args.seed)
-        np.random.seed(args.seed)
-    ref_seqs, ref_depths, ref_circular = load_reference(args.reference, output)
-    rev_comp_ref_seqs = {name: reverse_complement(seq) for name, seq in ref_seqs.items()}
-    frag_lengths = FragmentLengths(args.mean_frag_length, args.frag_length_stdev, output)
-    adjust_depths(ref_seqs, ref_depths, ref_circular, frag_lengths, args)
-    identities = Identities(args.mean_identity, args.identity_stdev, args.max_identity, output)
-    error_model = ErrorModel(args.error_model, output)
-    qscore_model = QScoreModel(args.qscore_model, output)
-    ref_contigs, ref_contig_weights = get_ref_contig_weights(ref_seqs, ref_depths)
+
+    # Everything made before the reads comes from the setup RandomContext, and each read has its
+    # own RandomContext derived from the seed and the read's index. This makes each read a pure
+    # function of (seed, read index).
+    checkpoint_params = get_checkpoint_params(args)
+    checkpoint = load_checkpoint(args.checkpoint, checkpoint_params) if args.resume else None
+    if checkpoint is not None:
+        entropy = checkpoint['entropy']
+    else:
+        entropy = get_seed_entropy(args.seed)
+    read_maker, ref_size = get_read_maker(args, entropy, output)
+    if args.read_range is not None:
+        with mem_report.stage('simulate reads'):
+            simulate_read_range(read_maker, args.read_range, args.output, output)
+        return
+
+    target_size = get_target_size(ref_size, args.quantity)
+    print('', file=output)
+    print(f'Target read set size: {target_size:,} bp', file=output)
+
+    print('', file=output)
+    if checkpoint is not None:
+        count, total_size = checkpoint['count'], checkpoint['total_size']
+        print(f'Resuming from checkpoint: {count:,} reads, {total_size:,} bp', file=output)
+        read_output = ReadOutput(args.output, resume_offset=checkpoint['offset'])
+    else:
+        count, total_size = 0, 0
+        read_output = ReadOutput(args.output)
+        if args.checkpoint:
+            save_checkpoint(args.checkpoint, checkpoint_params, entropy, count, total_size, 0)
+    last_checkpoint = time.time()
+    print_progress(count, total_size, target_size, output)
+    with mem_report.stage('simulate reads'):
+        while total_size < target_size:
+            read_name, info, seq, quals = read_maker.make_read(count)
+            read_output.write(read_name, info, seq, quals)
+            total_size += len(seq)
+            count += 1
+            print_progress(count, total_size, target_size, output)
+            if args.checkpoint and \
+                    time.time() - last_checkpoint >= settings.CHECKPOINT_INTERVAL:
+                save_checkpoint(args.checkpoint, checkpoint_params, entropy, count, total_size,
+                                read_output.flush())
+                last_checkpoint = time.time()
+
+    offset = read_output.close()
+    if args.checkpoint:
+        save_checkpoint(args.checkpoint, checkpoint_params, entropy, count, total_size, offset)
+    print('\n', file=output)
+
+
+def get_read_maker(args, entropy, output=sys.stderr):
+    """
+    Loads the reference and models and returns a ReadMaker for them, with the reference's total
+    size.
+    """
+    setup_rng = get_setup_rng(entropy)
+
+    with mem_report.stage('load reference'):
+        ref_seqs, ref_depths, ref_circular = load_reference(args.reference, output)
+    with mem_report.stage('reverse complement reference'):
+        rev_comp_ref_seqs = {name: reverse_complement(seq) for name, seq in ref_seqs.items()}
+    with mem_report.stage('load models'):
+        frag_lengths = FragmentLengths(args.mean_frag_length, args.frag_length_stdev, output,
+                                       rng=setup_rng)
+        adjust_depths(ref_seqs, ref_depths, ref_circular, frag_lengths, args)
+        identities = Identities(args.mean_identity, args.identity_stdev, args.max_identity,
+                                output, rng=setup_rng)
+        error_model = ErrorModel(args.error_model, output)
+        qscore_model = QScoreModel(args.qscore_model, output)
+    contig_sampler = ContigSampler(*get_ref_contig_weights(ref_seqs, ref_depths), rng=setup_rng)
     print_glitch_summary(args.glitch_rate, args.glitch_size, args.glitch_skip, output)
 
     start_adapt_rate, start_adapt_amount = adapter_parameters(args.start_adapter)
     end_adapt_rate, end_adapt_amount = adapter_parameters(args.end_adapter)
-    random_start, random_end = build_random_adapters(args)
+    random_start, random_end = build_random_adapters(args, setup_rng)
     print_adapter_summary(start_adapt_rate, start_adapt_amount, args.start_adapter_seq,
                           end_adapt_rate, end_adapt_amount, args.end_adapter_seq,
                           random_start, random_end, output)
 
     print_other_problem_summary(args, output)
-    ref_size = sum(len(x) for x in ref_seqs.values())
-    target_size = get_target_size(ref_size, args.quantity)
+    read_maker = ReadMaker(entropy, frag_lengths, identities, error_model, qscore_model,
+                           ref_seqs, rev_comp_ref_seqs, contig_sampler, ref_circular, args,
+                           start_adapt_rate, start_adapt_amount, end_adapt_rate, end_adapt_amount)
+    return read_maker, sum(len(x) for x in ref_seqs.values())
+
+
+def simulate_read_range(read_maker, read_range, output_filename, output):
+    """
+    Regenerates only the reads whose indices are in the given range. Since each read depends only
+    on the seed and its index, these are the same reads that a full run would make.
+    """
     print('', file=output)
-    print(f'Target read set size: {target_size:,} bp', file=output)
+    print(f'Regenerating reads {read_range.start:,} to {read_range.stop - 1:,}', file=output)
+    print('', file=output)
+    read_output = ReadOutput(output_filename)
+    count, total_size = 0, 0
+    for read_index in read_range:
+        read_name, info, seq, quals = read_maker.make_read(read_index)
+        read_output.write(read_name, info, seq, quals)
+        total_size += len(seq)
+        count += 1
+        print_range_progress(count, len(read_range), total_size, output)
+    read_output.close()
+    print('\n', file=output)
+
+
+def write_templates(templates, args, entropy, output=sys.stderr):
+    """
+    Writes read templates (from generate_split_reads, same_chr or simple_sv) to stdout: as FASTA,
+    or with --fastq, sequenced straight into FASTQ reads.
+    """
+    if args.fastq:
+        simulate_templates(templates, args, entropy, output)
+    else:
+        for _, name, seq in templates:
+            print(f'>{name}')
+            print(seq)
 
+
+def simulate_templates(templates, args, entropy, output=sys.stderr):
+    """
+    Sequences each template once, without the intermediate FASTA. Each template is used whole and
+    in order, on a random strand (like simulate's fragments), so there is no need to load the
+    templates or adjust their depths. Adapters, chimeras, junk/random reads and glitches are not
+    added.
+    """
+    identities = Identities(args.mean_identity, args.identity_stdev, args.max_identity, output)
+    error_model = ErrorModel(args.error_model, output)
+    qscore_model = QScoreModel(args.qscore_model, output)
     print('', file=output)
+    read_output = ReadOutput()
     count, total_size = 0, 0
-    print_progress(count, total_size, target_size, output)
-    while total_size < target_size:
-        fragment, info = build_fragment(frag_lengths, ref_seqs, rev_comp_ref_seqs, ref_contigs,
-                                        ref_contig_weights, ref_circular, args, start_adapt_rate,
-                                        start_adapt_amount, end_adapt_rate, end_adapt_amount)
-        target_identity = identities.get_identity()
-        seq, quals, actual_identity, identity_by_qscores = \
-            sequence_fragment(fragment, target_identity, error_model, qscore_model)
-        if len(seq) == 0:
-            continue
+    for read_index, name, template in templates:
+        rng = get_sequencing_rng(entropy, read_index)
+        if random_chance(0.5, rng):
+            template = reverse_complement(template)
+        while True:
+            target_identity = identities.get_identity(rng)
+            seq, quals, actual_identity, _ = \
+                sequence_fragment(template, target_identity, error_model, qscore_model, rng)
+            if len(seq) > 0:
+                break
+        read_name = uuid.UUID(int=rng.py.getrandbits(128))
+        read_output.write(read_name, f'{name} i={actual_identity * 100.0:.2f}%', seq, quals)
+        total_size += len(seq)
+        count += 1
+        print_template_progress(count, total_size, output)
+    read_output.close()
+    print('\n', file=output)
+
+
+class ReadMaker(object):
+    """
+    Holds everything needed to simulate reads, so any read can be made from just its index.
+    """
+    def __init__(self, entropy, frag_lengths, identities, error_model, qscore_model, ref_seqs,
+                 rev_comp_ref_seqs, contig_sampler, ref_circular, args, start_adapt_rate,
+                 start_adapt_amount, end_adapt_rate, end_adapt_amount):
+        self.entropy = entropy
+        self.frag_lengths = frag_lengths
+        self.identities = identities
+        self.error_model = error_model
+        self.qscore_model = qscore_model
+        self.ref_seqs = ref_seqs
+        self.rev_comp_ref_seqs = rev_comp_ref_seqs
+        self.contig_sampler = contig_sampler
+        self.ref_circular = ref_circular
+        self.args = args
+        self.start_adapt_rate, self.start_adapt_amount = start_adapt_rate, start_adapt_amount
+        self.end_adapt_rate, self.end_adapt_amount = end_adapt_rate, end_adapt_amount
+
+    def make_read(self, read_index):
+        """
+        Returns the name, info, sequence and qualities of the read with the given index.
+        """
+        rng = get_read_rng(self.entropy, read_index)
+        while True:
+            fragment, info = build_fragment(self.frag_lengths, self.ref_seqs,
+                                            self.rev_comp_ref_seqs, self.contig_sampler,
+                                            self.ref_circular, self.args, self.start_adapt_rate,
+                                            self.start_adapt_amount, self.end_adapt_rate,
+                                            self.end_adapt_amount, rng)
+            target_identity = self.identities.get_identity(rng)
+            seq, quals, actual_identity, identity_by_qscores = \
+                sequence_fragment(fragment, target_identity, self.error_model, self.qscore_model,
+                                  rng)
+            if len(seq) > 0:
+                break
 
         # info.append(f'length={len(seq)}')
         # info.append(f'error-free_length={len(fragment)}')
         info.append(f'i={actual_identity * 100.0:.2f}%')
 
-        read_name = uuid.UUID(int=random.getrandbits(128))
-        info = ' '.join(info)
-        print(f'@{read_name} {info}')
-        print(seq)
-        print('+')
-        print(quals)
+        read_name = uuid.UUID(int=rng.py.getrandbits(128))
+        return read_name, ' '.join(info), seq, quals
 
-        total_size += len(seq)
-        count += 1
-        print_progress(count, total_size, target_size, output)
 
-    print('\n', file=output)
+class ReadOutput(object):
+    """
+    Writes FASTQ reads to stdout or to a file, which is gzipped if its name ends in '.gz'. Gzipped
+    output is written as a series of gzip members, each ended by flush, so the file can be
+    truncated at any flushed offset and still be valid.
+    """
+    def __init__(self, filename=None, resume_offset=None):
+        self.filename = filename
+        self.gzip_member = None
+        if filename is None:
+            self.file = None
+            return
+        self.compressed = filename.endswith('.gz')
+        if resume_offset is None:
+            self.file = open(filename, 'wb')
+        else:
+            # Anything past the offset was written after the checkpoint (possibly a partial read),
+            # so it is thrown away.
+            self.file = open(filename, 'r+b')
+            self.file.truncate(resume_offset)
+            self.file.seek(resume_offset)
+
+    def write(self, read_name, info, seq, quals):
+        record = f'@{read_name} {info}\n{seq}\n+\n{quals}\n'
+        if self.file is None:
+            sys.stdout.write(record)
+        elif self.compressed:
+            if self.gzip_member is None:
+                self.gzip_member = gzip.GzipFile(fileobj=self.file, mode='wb')
+            self.gzip_member.write(record.encode())
+        else:
+            self.file.write(record.encode())
+
+    def flush(self):
+        """
+        Makes sure everything written so far is on disk and returns the file's size (None when
+        writing to stdout).
+        """
+        if self.file is None:
+            sys.stdout.flush()
+            return None
+        if self.gzip_member is not None:
+            self.gzip_member.close()  # ends the member but leaves the file open
+            self.gzip_member = None
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        return self.file.tell()
+
+    def close(self):
+        offset = self.flush()
+        if self.file is not None:
+            self.file.close()
+        return offset
+
+
+def get_checkpoint_params(args):
+    """
+    Returns the arguments which affect the reads, so a resumed run can check it was given the same
+    ones as the run which made the checkpoint.
+    """
+    if not getattr(args, 'checkpoint', None):
+        return None
+    params = dict(vars(args))
+    for name in ['checkpoint', 'resume', 'read_range', 'subparser_name', 'mem_report',
+                 'mem_report_allocations']:
+        params.pop(name, None)
+    return params
+
+
+def save_checkpoint(filename, params, entropy, count, total_size, offset):
+    """
+    Saves everything needed to carry on a simulation. Since each read depends only on the seed
+    entropy and its index, the entropy and the read count are the whole random number state.
+    """
+    checkpoint = {'version': __version__, 'params': params, 'entropy': entropy, 'count': count,
+                  'total_size': total_size, 'offset': offset}
+    temp_filename = filename + '.tmp'
+    with open(temp_filename, 'wt') as f:
+        json.dump(checkpoint, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_filename, filename)  # so a crash can't leave a half-written checkpoint
 
 
-def build_fragment(frag_lengths, ref_seqs, rev_comp_ref_seqs, ref_contigs, ref_contig_weights,
-                   ref_circular, args, start_adapt_rate, start_adapt_amount, end_adapt_rate,
-                   end_adapt_amount):
-    fragment = [get_start_adapter(start_adapt_rate, start_adapt_amount, args.start_adapter_seq)]
+def load_checkpoint(filename, params):
+    try:
+        with open(filename, 'rt') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        sys.exit(f'Error: could not load checkpoint from {filename}')
+    if checkpoint['params'] != params:
+        changed = sorted(k for k in set(checkpoint['params']) | set(params)
+                         if checkpoint['params'].get(k) != params.get(k))
+        sys.exit(f'Error: cannot resume with different parameters than the checkpointed run\n'
+                 f'  changed: {", ".join(changed)}')
+    if not os.path.isfile(params['output']) or \
+            os.path.getsize(params['output']) < checkpoint['offset']:
+        sys.exit(f'Error: {params["output"]} is missing or shorter than when it was checkpointed')
+    return checkpoint
+
+
+def build_fragment(frag_lengths, ref_seqs, rev_comp_ref_seqs, contig_sampler, ref_circular, args,
+                   start_adapt_rate, start_adapt_amount, end_adapt_rate, end_adapt_amount,
+                   rng=None):
+    """
+    Builds one fragment (adapters, reference sequence, chimeras and glitches). If a RandomContext
+    is given, every random draw comes from it, so the fragment depends only on that context.
+    """
+    draw_rng = DEFAULT_RNG if rng is None else rng
+    fragment = [get_start_adapter(start_adapt_rate, start_adapt_amount, args.start_adapter_seq,
+                                  draw_rng)]
     info = []
     frag_seq, frag_info = get_fragment(frag_lengths, ref_seqs, rev_comp_ref_seqs,
-                                       ref_contigs, ref_contig_weights, ref_circular, args)
+                                       contig_sampler, ref_circular, args, rng)
     fragment.append(frag_seq)
     info.append(','.join(frag_info))
 
-    while random_chance(args.chimeras / 100):  # percentage to fraction
+    while random_chance(args.chimeras / 100, draw_rng):  # percentage to fraction
         info.append('chimera')
-        if random_chance(settings.CHIMERA_END_ADAPTER_CHANCE):
+        if random_chance(settings.CHIMERA_END_ADAPTER_CHANCE, draw_rng):
             fragment.append(args.end_adapter_seq)
-        if random_chance(settings.CHIMERA_START_ADAPTER_CHANCE):
+        if random_chance(settings.CHIMERA_START_ADAPTER_CHANCE, draw_rng):
             fragment.append(args.start_adapter_seq)
         frag_seq, frag_info = get_fragment(frag_lengths, ref_seqs, rev_comp_ref_seqs,
-                                           ref_contigs, ref_contig_weights, ref_circular, args)
+                                           contig_sampler, ref_circular, args, rng)
         fragment.append(frag_seq)
         info.append(','.join(frag_info))
-    fragment.append(get_end_adapter(end_adapt_rate, end_adapt_amount, args.end_adapter_seq))
+    fragment.append(get_end_adapter(end_adapt_rate, end_adapt_amount, args.end_adapter_seq,
+                                    draw_rng))
     fragment = ''.join(fragment)
-    fragment = add_glitches(fragment, args.glitch_rate, args.glitch_size, args.glitch_skip)
+    fragment = add_glitches(fragment, args.glitch_rate, args.glitch_size, args.glitch_skip,
+                            draw_rng)
 
     return fragment, info
 
@@ -145,33 +399,34 @@ def get_target_size(ref_size, quantity):
              '(e.g. 25x)')
 
 
-def get_fragment(frag_lengths, ref_seqs, rev_comp_ref_seqs, ref_contigs, ref_contig_weights,
-                 ref_circular, args):
-    fragment_length = frag_lengths.get_fragment_length()
-    fragment_type = get_fragment_type(args)
+def get_fragment(frag_lengths, ref_seqs, rev_comp_ref_seqs, contig_sampler, ref_circular, args,
+                 rng=None):
+    fragment_length = frag_lengths.get_fragment_length(rng)
+    draw_rng = DEFAULT_RNG if rng is None else rng
+    fragment_type = get_fragment_type(args, draw_rng)
     if fragment_type == 'junk':
-        return get_junk_fragment(fragment_length), ['junk_seq']
+        return get_junk_fragment(fragment_length, draw_rng), ['junk_seq']
     elif fragment_type == 'random':
-        return get_random_sequence(fragment_length), ['random_seq']
+        return get_random_sequence(fragment_length, draw_rng), ['random_seq']
 
     # The get_real_fragment function can return nothing (due to --small_plasmid_bias) so we try
     # repeatedly until we get a result.
     for _ in range(1000):
-        seq, info = get_real_fragment(fragment_length, ref_seqs, rev_comp_ref_seqs, ref_contigs,
-                                      ref_contig_weights, ref_circular)
+        seq, info = get_real_fragment(fragment_length, ref_seqs, rev_comp_ref_seqs, contig_sampler,
+                                      ref_circular, rng)
         if seq != '':
             return seq, info
     sys.exit('Error: failed to generate any sequence fragments - are your read lengths '
              'incompatible with your reference contig lengths?')
 
 
-def get_fragment_type(args):
+def get_fragment_type(args, rng=DEFAULT_RNG):
     """
     Returns either 'junk_seq', 'random_seq' or 'good'
     """
     junk_read_rate = args.junk_reads / 100      # percentage to fraction
     random_read_rate = args.random_reads / 100  # percentage to fraction
-    random_draw = random.random()
+    random_draw = rng.py.random()
     if random_draw < junk_read_rate:
         return 'junk'
     elif random_draw < junk_read_rate + random_read_rate:
@@ -180,15 +435,13 @@ def get_fragment_type(args):
         return 'good'
 
 
-def get_real_fragment(fragment_length, ref_seqs, rev_comp_ref_seqs, ref_contigs,
-                      ref_contig_weights, ref_circular):
-
-    if len(ref_contigs) == 1:
-        contig = ref_contigs[0]
-    else:
-        contig = random.choices(ref_contigs, weights=ref_contig_weights)[0]
+def get_real_fragment(fragment_length, ref_seqs, rev_comp_ref_seqs, contig_sampler, ref_circular,
+                      rng=None):
+    contig = contig_sampler.get(rng)
+    if rng is None:
+        rng = DEFAULT_RNG
     info = [contig]
-    if random_chance(0.5):
+    if random_chance(0.5, rng):
         seq = ref_seqs[contig]
         # info.append('+strand')
     else:
@@ -209,7 +462,7 @@ def get_real_fragment(fragment_length, ref_seqs, rev_comp_ref_seqs, ref_contigs,
     if fragment_length > len(seq) and ref_circular[contig]:
         return '', ''
 
-    start_pos = random.randint(0, len(seq)-1)
+    start_pos = rng.py.randint(0, len(seq)-1)
     end_pos = start_pos + fragment_length
 
     # info.append(f'{start_pos}-{end_pos}')
@@ -230,18 +483,18 @@ def get_real_fragment(fragment_length, ref_seqs, rev_comp_ref_seqs, ref_contigs,
         return seq[start_pos:end_pos], info
 
 
-def get_junk_fragment(fragment_length):
-    repeat_length = random.randint(1, 5)
+def get_junk_fragment(fragment_length, rng=DEFAULT_RNG):
+    repeat_length = rng.py.randint(1, 5)
     repeat_count = int(round(fragment_length / repeat_length)) + 1
-    junk_frag = get_random_sequence(repeat_length) * repeat_count
+    junk_frag = get_random_sequence(repeat_length, rng) * repeat_count
     return junk_frag[:fragment_length]
 
 
-def sequence_fragment(fragment, target_identity, error_model, qscore_model):
+def sequence_fragment(fragment, target_identity, error_model, qscore_model, rng=DEFAULT_RNG):
 
     # Buffer the fragment a bit so errors can be added to the first and last bases.
     k_size = error_model.kmer_size
-    fragment = get_random_sequence(k_size) + fragment + get_random_sequence(k_size)
+    fragment = get_random_sequence(k_size, rng) + fragment + get_random_sequence(k_size, rng)
     frag_len = len(fragment)
 
     # A list to hold the bases for the errors-added fragment. Note that these values can be ''
@@ -269,9 +522,9 @@ def sequence_fragment(fragment, target_identity, error_model, qscore_model):
         if estimated_identity <= target_identity:
             break
 
-        i = random.randint(0, max_kmer_index)
+        i = rng.py.randint(0, max_kmer_index)
         kmer = fragment[i:i+k_size]
-        new_kmer = error_model.add_errors_to_kmer(kmer)
+        new_kmer = error_model.add_errors_to_kmer(kmer, rng)
 
         # If the error model didn't make any changes (quite common with a non-random error model),
         # we just try again at a different position.
@@ -313,7 +566,7 @@ def sequence_fragment(fragment, target_identity, error_model, qscore_model):
                     # If the sequence is longer, we align a random part of the sequence and use
                     # the result to update the error estimate.
                     else:
-                        pos = random.randint(0, frag_len - settings.ALIGNMENT_SIZE)
+                        pos = rng.py.randint(0, frag_len - settings.ALIGNMENT_SIZE)
                         pos2 = pos+settings.ALIGNMENT_SIZE
                         cigar = edlib.align(fragment[pos:pos2],
                                             ''.join(new_fragment_bases[pos:pos2]),
@@ -327,7 +580,7 @@ def sequence_fragment(fragment, target_identity, error_model, qscore_model):
     end_trim = len(''.join(new_fragment_bases[-k_size:]))
 
     seq = ''.join(new_fragment_bases)
-    qual, actual_identity, identity_by_qscores = get_qscores(seq, fragment, qscore_model)
+    qual, actual_identity, identity_by_qscores = get_qscores(seq, fragment, qscore_model, rng)
     assert(len(seq) == len(qual))
 
     seq = seq[start_trim:-end_trim]
@@ -336,33 +589,33 @@ def sequence_fragment(fragment, target_identity, error_model, qscore_model):
     return seq, qual, actual_identity, identity_by_qscores
 
 
-def get_start_adapter(rate, amount, adapter):
+def get_start_adapter(rate, amount, adapter, rng=DEFAULT_RNG):
     if not adapter or rate == 0.0 or amount == 0.0:
         return ''
-    if random_chance(rate):
+    if random_chance(rate, rng):
         if amount == 1.0:
             return adapter
-        adapter_frag_length = get_adapter_frag_length(amount, adapter)
+        adapter_frag_length = get_adapter_frag_length(amount, adapter, rng)
         start_pos = len(adapter) - adapter_frag_length
         return adapter[start_pos:]
     return ''
 
 
-def get_end_adapter(rate, amount, adapter):
+def get_end_adapter(rate, amount, adapter, rng=DEFAULT_RNG):
     if not adapter or rate == 0.0 or amount == 0.0:
         return ''
-    if random_chance(rate):
+    if random_chance(rate, rng):
         if amount == 1.0:
             return adapter
-        adapter_frag_length = get_adapter_frag_length(amount, adapter)
+        adapter_frag_length = get_adapter_frag_length(amount, adapter, rng)
         return adapter[:adapter_frag_length]
     return ''
 
 
-def get_adapter_frag_length(amount, adapter):
+def get_adapter_frag_length(amount, adapter, rng=DEFAULT_RNG):
     beta_a = 2.0 * amount
     beta_b = 2.0 - beta_a
-    return round(int(len(adapter) * np.random.beta(beta_a, beta_b)))
+    return round(int(len(adapter) * rng.np.beta(beta_a, beta_b)))
 
 
 def print_glitch_summary(glitch_rate, glitch_size, glitch_skip, output):
@@ -397,15 +650,15 @@ def adapter_parameters(param_str):
     sys.exit('Error: adapter parameters must be two comma-separated values between 0 and 1')
 
 
-def build_random_adapters(args):
+def build_random_adapters(args, rng=DEFAULT_RNG):
     random_start, random_end = False, False
     if str_is_int(args.start_adapter_seq):
         start_len = int(args.start_adapter_seq)
-        args.start_adapter_seq = get_random_sequence(start_len)
+        args.start_adapter_seq = get_random_sequence(start_len, rng)
         random_start = True
     if str_is_int(args.end_adapter_seq):
         end_len = int(args.end_adapter_seq)
-        args.end_adapter_seq = get_random_sequence(end_len)
+        args.end_adapter_seq = get_random_sequence(end_len, rng)
         random_end = True
     return random_start, random_end
 
@@ -434,30 +687,70 @@ def print_adapter_summary(start_rate, start_amount, start_seq, end_rate, end_amo
         print('End adapter: none', file=output)
 
 
-def add_glitches(fragment, glitch_rate, glitch_size, glitch_skip):
+def add_glitches(fragment, glitch_rate, glitch_size, glitch_skip, rng=DEFAULT_RNG):
     if glitch_rate == 0:
         return fragment
-    i = 0
+    starts, ends, sizes = get_glitch_positions(len(fragment), glitch_rate, glitch_size,
+                                               glitch_skip, rng)
+
+    # All of the glitches' random sequence is made at once and then divided between them.
+    glitch_seq = get_random_sequence(sum(sizes), rng)
     new_fragment = []
-    while True:
-        p = 1 / glitch_rate if glitch_rate > 1 else 1
-        dist_to_glitch = np.random.geometric(p=p)
-        new_fragment.append(fragment[i:i + dist_to_glitch])
-        i += dist_to_glitch
-        if i >= len(fragment):
-            break
+    glitch_pos = 0
+    for start, end, size in zip(starts, ends, sizes):
+        new_fragment.append(fragment[start:end])
+        new_fragment.append(glitch_seq[glitch_pos:glitch_pos + size])
+        glitch_pos += size
+    new_fragment.append(fragment[starts[-1]:ends[-1]])
+    return ''.join(new_fragment)
 
-        # Add a glitch!
-        if glitch_size > 0:
-            p = 1 / glitch_size if glitch_size > 1 else 1
-            new_fragment.append(get_random_sequence(np.random.geometric(p=p)))
+
+def get_glitch_positions(frag_len, glitch_rate, glitch_size, glitch_skip, rng=DEFAULT_RNG):
+    """
+    Draws the distances between glitches, their sizes and their skips as arrays, instead of one at
+    a time. Returns the start and end of each kept piece of the fragment (one more piece than there
+    are glitches) and the size of each glitch's random sequence.
+    """
+    rate_p = geometric_p(glitch_rate)
+    mean_step = 1 / rate_p
+    if glitch_skip > 0:
+        mean_step += 1 / geometric_p(glitch_skip)
+
+    # Draw enough glitches to probably reach the end of the fragment, and draw more if not.
+    batch_size = int(frag_len / mean_step * 1.1) + 10
+    dists, skips, sizes = [], [], []
+    total = 0
+    while True:
+        dists.append(rng.np.geometric(p=rate_p, size=batch_size))
         if glitch_skip > 0:
-            p = 1 / glitch_skip if glitch_skip > 1 else 1
-            i += np.random.geometric(p=p)
-        if i >= len(fragment):
+            skips.append(rng.np.geometric(p=geometric_p(glitch_skip), size=batch_size))
+        else:
+            skips.append(np.zeros(batch_size, dtype=int))
+        if glitch_size > 0:
+            sizes.append(rng.np.geometric(p=geometric_p(glitch_size), size=batch_size))
+        else:
+            sizes.append(np.zeros(batch_size, dtype=int))
+        total += int(dists[-1].sum() + skips[-1].sum())
+        if total >= frag_len:
             break
+    dists, skips, sizes = np.concatenate(dists), np.concatenate(skips), np.concatenate(sizes)
 
-    return ''.join(new_fragment)
+    # Each kept piece starts where the previous piece's glitch skip ended. We stop after the first
+    # piece or skip which reaches the end of the fragment.
+    next_starts = np.cumsum(dists + skips)
+    ends = next_starts - skips
+    last = int(np.searchsorted(next_starts, frag_len))
+    glitch_count = last if ends[last] >= frag_len else last + 1
+    starts = np.concatenate(([0], next_starts[:last]))
+    ends = ends[:last + 1]
+    if glitch_count > last:  # the last glitch's skip ran off the end, leaving an empty piece
+        starts = np.append(starts, frag_len)
+        ends = np.append(ends, frag_len)
+    return starts.tolist(), ends.tolist(), sizes[:glitch_count].tolist()
+
+
+def geometric_p(mean):
+    return 1 / mean if mean > 1 else 1
 
 
 def print_progress(count, bp, target, output):
@@ -469,6 +762,18 @@ def print_progress(count, bp, target, output):
           file=output, flush=True, end='')
 
 
+def print_template_progress(count, bp, output):
+    plural = ' ' if count == 1 else 's'
+    print(f'\rSequencing templates: {count:,} read{plural}  {bp:,} bp',
+          file=output, flush=True, end='')
+
+
+def print_range_progress(count, range_size, bp, output):
+    plural = ' ' if count == 1 else 's'
+    print(f'\rRegenerating: {count:,} / {range_size:,} read{plural}  {bp:,} bp',
+          file=output, flush=True, end='')
+
+
 def load_reference(reference, output):
     print('', file=output)
     print(f'Loading reference from {reference}', file=output)
@@ -492,15 +797,24 @@ def print_intro(output):
 
 
 def adjust_depths(ref_seqs, ref_depths, ref_circular, frag_lengths, args):
-    sampled_lengths = [frag_lengths.get_fragment_length() for x in range(100000)]
-    total = sum(sampled_lengths)
-    for ref_name, ref_seq in ref_seqs.items():
-        ref_len = len(ref_seq)
+    # The sampled lengths are sorted once, so for any reference length a binary search gives the
+    # number of fragments which fit and a prefix sum gives their total length.
+    sampled_lengths = np.sort(frag_lengths.get_many(100000))
+    length_sums = np.concatenate(([0], np.cumsum(sampled_lengths)))
+    total = int(length_sums[-1])
+
+    ref_names = list(ref_seqs.keys())
+    ref_lens = np.array([len(ref_seqs[name]) for name in ref_names], dtype=np.int64)
+    fit_counts = np.searchsorted(sampled_lengths, ref_lens, side='right')
+    fitting_totals = length_sums[fit_counts]
+    truncated_totals = fitting_totals + (len(sampled_lengths) - fit_counts) * ref_lens
+
+    for i, ref_name in enumerate(ref_names):
         ref_circ = ref_circular[ref_name]
 
         # Circular plasmids may have to have their depth increased due compensate for misses.
         if not args.small_plasmid_bias and ref_circ:
-            passing_total = sum(length for length in sampled_lengths if length <= ref_len)
+            passing_total = int(fitting_totals[i])
             if passing_total == 0:
                 sys.exit('Error: fragment length distribution incompatible with reference lengths '
                          '- try running with --small_plasmid_bias to avoid this error')
@@ -509,6 +823,6 @@ def adjust_depths(ref_seqs, ref_depths, ref_circular, frag_lengths, args):
 
         # Linear plasmids may have to have their depth increased due compensate for truncations.
         if not ref_circ:
-            passing_total = sum(min(ref_len, length) for length in sampled_lengths)
+            passing_total = int(truncated_totals[i])
             adjustment = total / passing_total
             ref_depths[ref_name] *= adjustment
@@ -0,0 +1,117 @@
+"""
+The truth table for split-read templates: where each template's blocks really came from, written
+as a TSV alongside the reads so the templates (and the reads made from them) can have short names.
+The benchmark modules load it instead of parsing block coordinates out of read names.
+"""
+
+import gzip
+import sys
+import pysam
+from badread import misc
+
+
+TRUTH_COLUMNS = ['read', 'type', 'block', 'chrom', 'start', 'end', 'strand']
+
+
+def get_template_id(read_index):
+    """
+    The short name given to a template when its truth is in a truth table.
+    """
+    return f'r{read_index}'
+
+
+class TruthTable(object):
+    """
+    Writes one row per template block: the reference contig and 0-based, end-excluded coordinates
+    (as in the long template names), or '.' with start 0 for sequence which isn't from the
+    reference (e.g. random insertions). The file is gzipped if its name ends in '.gz'. With no
+    filename, nothing is written and templates keep their long names.
+    """
+    def __init__(self, filename=None):
+        self.file = None
+        if filename is not None:
+            if filename.endswith('.gz'):
+                self.file = gzip.open(filename, 'wt')
+            else:
+                self.file = open(filename, 'wt')
+            self.file.write('\t'.join(TRUTH_COLUMNS) + '\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def record(self, plans):
+        """
+        Takes planned templates, (read index, name, parts) as given to misc.fetch_templates,
+        writes their truth and yields them with their short names. A template's type is the part
+        of its long name before '__' (e.g. 'deletion' or 'alignments_3').
+        """
+        if self.file is None:
+            yield from plans
+            return
+        for read_index, name, parts in plans:
+            read_id = get_template_id(read_index)
+            sv_type = name.partition('__')[0]
+            rows = []
+            for i, part in enumerate(parts):
+                if isinstance(part, misc.FetchBlock):
+                    strand = '-' if part.reverse else '+'
+                    rows.append(f'{read_id}\t{sv_type}\t{i}\t{part.contig}\t{part.start}\t'
+                                f'{part.end}\t{strand}\n')
+                else:
+                    rows.append(f'{read_id}\t{sv_type}\t{i}\t.\t0\t{len(part)}\t.\n')
+            self.file.write(''.join(rows))
+            yield read_index, read_id, parts
+
+
+def load_truth(filename):
+    """
+    Loads a truth table and returns a dictionary of template id to (type, blocks), where blocks is
+    a list of (chrom, start, end) for the template's reference blocks, in order.
+    """
+    truth = {}
+    with misc.get_open_func(filename)(filename, 'rt') as truth_file:
+        header = truth_file.readline().rstrip('\n').split('\t')
+        if header != TRUTH_COLUMNS:
+            sys.exit(f'Error: {filename} is not a truth table')
+        for line in truth_file:
+            read_id, sv_type, _, chrom, start, end, _ = line.rstrip('\n').split('\t')
+            if read_id not in truth:
+                truth[read_id] = (sv_type, [])
+            if chrom != '.':
+                truth[read_id][1].append((chrom, int(start), int(end)))
+    return truth
+
+
+def load_read_templates(filename):
+    """
+    Returns a dictionary of read name to template id for simulated reads (FASTQ), using the first
+    word of each read's description: the template's name, when the reads were made by simulate
+    with the templates as its reference or by a split-read generator with --fastq.
+    """
+    templates = {}
+    with pysam.FastxFile(filename) as reads:
+        for read in reads:
+            if read.comment:
+                templates[read.name] = read.comment.split(None, 1)[0]
+    return templates
+
+
+def load_read_truth(truth_filename, reads_filename):
+    """
+    Returns a dictionary of read name to (type, blocks) for the simulated reads which came from a
+    template in the truth table (junk and random reads don't).
+    """
+    truth = load_truth(truth_filename)
+    read_truth = {}
+    for read_name, template in load_read_templates(reads_filename).items():
+        if template in truth:
+            read_truth[read_name] = truth[template]
+    return read_truth
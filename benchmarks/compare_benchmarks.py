@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+This script compares performance benchmark results (from run_benchmarks.py) to a baseline and
+exits with an error if any benchmark's main throughput has dropped by more than the tolerance:
+    python3 benchmarks/compare_benchmarks.py baseline.json results.json
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import json
+import sys
+
+
+def load_results(filename):
+    try:
+        with open(filename, 'rt') as f:
+            results = json.load(f)
+    except (OSError, ValueError) as e:
+        sys.exit(f'Error: could not load benchmark results from {filename}: {e}')
+    if 'benchmarks' not in results:
+        sys.exit(f'Error: {filename} does not contain benchmark results')
+    return results
+
+
+def compare(baseline, current, tolerance):
+    """
+    Returns a row (name, rate name, baseline rate, current rate, change, status) for each
+    benchmark in either set of results. A benchmark regresses when its main rate falls by more
+    than tolerance (a fraction of the baseline).
+    """
+    rows = []
+    names = list(current['benchmarks']) + \
+        [n for n in baseline['benchmarks'] if n not in current['benchmarks']]
+    for name in names:
+        old = baseline['benchmarks'].get(name)
+        new = current['benchmarks'].get(name)
+        if old is None or new is None:
+            rate_name = (old or new)['main_rate']
+            rows.append((name, rate_name, old and old['rates'][rate_name],
+                         new and new['rates'][rate_name], None,
+                         'new' if old is None else 'missing'))
+            continue
+        rate_name = new['main_rate']
+        old_rate, new_rate = old['rates'][rate_name], new['rates'][rate_name]
+        change = new_rate / old_rate - 1.0
+        if change < -tolerance:
+            status = 'REGRESSION'
+        elif change > tolerance:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, rate_name, old_rate, new_rate, change, status))
+    return rows
+
+
+def format_rate(rate):
+    return '-' if rate is None else f'{rate:,.0f}'
+
+
+def print_rows(rows, output=sys.stdout):
+    header = ('benchmark', 'rate', 'baseline', 'current', 'change', 'status')
+    table = [header] + [(name, rate_name.replace('_per_sec', '/s'), format_rate(old),
+                         format_rate(new), '-' if change is None else f'{change:+.1%}', status)
+                        for name, rate_name, old, new, change, status in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    for row in table:
+        print('  '.join(value.ljust(width) if i in (0, 1, 5) else value.rjust(width)
+                        for i, (value, width) in enumerate(zip(row, widths))).rstrip(),
+              file=output)
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Compare benchmark results to a baseline')
+    parser.add_argument('baseline', type=str, help='Baseline results (JSON)')
+    parser.add_argument('current', type=str, help='Current results (JSON)')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Largest allowed drop in a benchmark\'s throughput, as a fraction of '
+                             'the baseline (default: %(default)s)')
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    baseline, current = load_results(args.baseline), load_results(args.current)
+    for setting in ['version', 'scale']:
+        if baseline.get(setting) != current.get(setting):
+            print(f'Warning: the results have different {setting}s ({baseline.get(setting)} vs '
+                  f'{current.get(setting)}), so they may not be comparable', file=sys.stderr)
+    rows = compare(baseline, current, args.tolerance)
+    print_rows(rows)
+    regressions = [row[0] for row in rows if row[5] == 'REGRESSION']
+    if regressions:
+        sys.exit(f'\n{len(regressions)} benchmark(s) slower than the baseline by more than '
+                 f'{args.tolerance:.0%}: {", ".join(regressions)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+This script runs SplitReadSimulator's performance benchmarks and writes their timings and
+throughputs to a JSON file, which compare_benchmarks.py can check against a baseline. Run it from
+the root directory:
+    python3 benchmarks/run_benchmarks.py --out results.json
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import argparse
+import collections
+import contextlib
+import datetime
+import fnmatch
+import json
+import os
+import pathlib
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pysam
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import badread.__main__  # noqa: E402
+from badread import benchmark_bam, benchmark_mappings, collect_mapping_info, misc  # noqa: E402
+from badread.error_model import ErrorModel  # noqa: E402
+from badread.qscore_model import QScoreModel, get_qscores  # noqa: E402
+from badread.simulate import get_read_maker, get_target_size, sequence_fragment  # noqa: E402
+
+
+# Bump this when benchmarks change in a way that makes old results incomparable.
+RESULTS_VERSION = 3
+
+BENCHMARKS = collections.OrderedDict()
+
+
+def benchmark(name, units):
+    """
+    Registers a benchmark. The decorated function takes a Workspace and the size scale, does any
+    setup and returns a function to time, which returns the count of each unit it processed. The
+    first unit is the benchmark's main throughput.
+    """
+    def register(function):
+        BENCHMARKS[name] = (function, units)
+        return function
+    return register
+
+
+class Workspace(object):
+    """
+    A temporary directory with inputs shared by the benchmarks, each made the first time it's
+    needed.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._reference = None
+        self._template_references = {}
+        self._mapping_files = None
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    @property
+    def reference(self):
+        # Two random 250 kbp contigs.
+        if self._reference is None:
+            generator = np.random.default_rng(0)
+            self._reference = self.path('reference.fasta')
+            with open(self._reference, 'wt') as f:
+                for name in ['chr1', 'chr2']:
+                    f.write(f'>{name}\n{misc.random_sequence_from_numpy(250000, generator)}\n')
+            pysam.faidx(self._reference)
+        return self._reference
+
+    def template_reference(self, mean_length, stdev):
+        """
+        About 500 kbp of random contigs with template-sized lengths. simulate reads each template
+        from a whole contig (it doesn't cut contigs down to --length), so a read length regime
+        needs its own reference.
+        """
+        key = (mean_length, stdev)
+        if key not in self._template_references:
+            generator = np.random.default_rng(2)
+            filename = self.path(f'templates_{mean_length}.fasta')
+            with open(filename, 'wt') as f:
+                for i in range(500000 // mean_length):
+                    length = max(100, int(generator.normal(mean_length, stdev)))
+                    f.write(f'>contig{i}\n'
+                            f'{misc.random_sequence_from_numpy(length, generator)}\n')
+            pysam.faidx(filename)
+            self._template_references[key] = filename
+        return self._template_references[key]
+
+    def mapping_files(self, read_count):
+        """
+        A name-grouped BAM of split-read mappings (a few alignments per read, most of them correct)
+        and the matching FASTQ of simulated reads, for the mapping benchmarks.
+        """
+        if self._mapping_files is not None:
+            return self._mapping_files
+        generator = np.random.default_rng(1)
+        bam_filename, reads_filename = self.path('mappings.bam'), self.path('reads.fastq')
+        header = {'HD': {'VN': '1.6', 'SO': 'unsorted'},
+                  'SQ': [{'SN': 'chr1', 'LN': 250000}, {'SN': 'chr2', 'LN': 250000}]}
+        with pysam.AlignmentFile(bam_filename, 'wb', header=header) as bam, \
+                open(reads_filename, 'wt') as reads:
+            for i in range(read_count):
+                name = f'read{i}'
+                block_count = int(generator.integers(2, 6))
+                sizes = generator.integers(50, 400, block_count)
+                starts = generator.integers(0, 249000, block_count)
+                chroms = generator.integers(0, 2, block_count)
+                blocks = [(f'chr{c + 1}', int(s), int(s + z))
+                          for c, s, z in zip(chroms, starts, sizes)]
+                read_length = int(sizes.sum())
+                reads.write(f'@{name} alignments_{block_count}__' +
+                            '_'.join(f'{c}:{s}-{e}' for c, s, e in blocks) +
+                            f' i=95.00%\n{"A" * read_length}\n+\n{"!" * read_length}\n')
+                query_start = 0
+                for j, (chrom, start, end) in enumerate(blocks):
+                    size = end - start
+                    if generator.random() < 0.2:  # a wrong alignment
+                        start += 1000
+                    a = pysam.AlignedSegment()
+                    a.query_name = name
+                    a.flag = 0 if j == 0 else 2048
+                    a.reference_id = 0 if chrom == 'chr1' else 1
+                    a.reference_start = start
+                    a.mapping_quality = int(generator.integers(0, 61))
+                    clip_end = read_length - query_start - size
+                    a.cigartuples = [c for c in [(4, query_start), (0, size), (4, clip_end)]
+                                     if c[1] > 0]
+                    a.query_sequence = 'A' * read_length
+                    bam.write(a)
+                    query_start += size
+        self._mapping_files = bam_filename, reads_filename
+        return self._mapping_files
+
+
+@contextlib.contextmanager
+def quiet():
+    """
+    Captures stdout and stderr, including output to the stderr that some functions take as a
+    default argument (which captured_output alone can't reach).
+    """
+    sys.stderr.flush()
+    saved_stderr, devnull = os.dup(2), os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 2)
+    try:
+        with misc.captured_output() as (out, err):
+            yield out, err
+    finally:
+        sys.__stderr__.flush()
+        os.dup2(saved_stderr, 2)
+        os.close(saved_stderr)
+        os.close(devnull)
+
+
+def run_command(arguments):
+    """
+    Runs a SplitReadSimulator command in this process and returns its stdout.
+    """
+    old_argv = sys.argv
+    sys.argv = ['splitreadsimulator'] + [str(a) for a in arguments]
+    try:
+        with quiet() as (out, err):
+            badread.__main__.main(output=err)
+    finally:
+        sys.argv = old_argv
+    return out.getvalue()
+
+
+def count_fasta(text):
+    """
+    Returns (number of sequences, total bases) for FASTA or FASTQ text.
+    """
+    lines = text.splitlines()
+    if text.startswith('@'):
+        return len(lines) // 4, sum(len(line) for line in lines[1::4])
+    return len(lines) // 2, sum(len(line) for line in lines[1::2])
+
+
+def simulate_benchmark(name, identity, mean_length, stdev):
+    @benchmark(name, ['bases', 'reads'])
+    def simulate_regime(workspace, scale):
+        reference = workspace.template_reference(mean_length, stdev)
+        args = badread.__main__.parse_args(
+            [str(a) for a in ['simulate', '--reference', reference, '--seed', 0,
+                              '--quantity', int(300000 * scale), '--identity', identity]])
+        badread.__main__.check_simulate_args(args)
+        with quiet() as (out, err):
+            read_maker, ref_size = get_read_maker(args, misc.get_seed_entropy(args.seed), err)
+        target_size = get_target_size(ref_size, args.quantity)
+
+        # Only making the reads is timed: loading the reference and models (several seconds)
+        # is done once, above.
+        def run():
+            reads, bases = 0, 0
+            while bases < target_size:
+                _, _, seq, _ = read_maker.make_read(reads)
+                bases += len(seq)
+                reads += 1
+            return {'bases': bases, 'reads': reads}
+        return run
+
+
+simulate_benchmark('simulate_high_identity_long', '95,99,2.5', 15000, 13000)
+simulate_benchmark('simulate_high_identity_short', '95,99,2.5', 1000, 500)
+simulate_benchmark('simulate_low_identity_long', '80,90,5', 15000, 13000)
+simulate_benchmark('simulate_low_identity_short', '80,90,5', 1000, 500)
+
+
+def sequencing_models():
+    with quiet():
+        return ErrorModel('nanopore2023'), QScoreModel('nanopore2023')
+
+
+@benchmark('sequence_fragment', ['bases', 'fragments'])
+def sequence_fragment_benchmark(workspace, scale):
+    error_model, qscore_model = sequencing_models()
+    fragments = [misc.random_sequence_from_numpy(5000, np.random.default_rng(i))
+                 for i in range(max(1, int(20 * scale)))]
+
+    def run():
+        rng = misc.get_read_rng(misc.get_seed_entropy(0), 0)
+        for fragment in fragments:
+            sequence_fragment(fragment, 0.9, error_model, qscore_model, rng)
+        return {'bases': sum(len(f) for f in fragments), 'fragments': len(fragments)}
+    return run
+
+
+@benchmark('get_qscores', ['bases', 'reads'])
+def get_qscores_benchmark(workspace, scale):
+    error_model, qscore_model = sequencing_models()
+    rng = misc.get_read_rng(misc.get_seed_entropy(0), 0)
+    pairs = []
+    for i in range(max(1, int(20 * scale))):
+        fragment = misc.random_sequence_from_numpy(5000, np.random.default_rng(i))
+        seq, _, _, _ = sequence_fragment(fragment, 0.9, error_model, qscore_model, rng)
+        pairs.append((seq, fragment))
+
+    def run():
+        for seq, fragment in pairs:
+            get_qscores(seq, fragment, qscore_model, rng)
+        return {'bases': sum(len(s) for s, _ in pairs), 'reads': len(pairs)}
+    return run
+
+
+def generator_benchmark(name, arguments, number):
+    @benchmark(name, ['reads', 'bases'])
+    def generator(workspace, scale):
+        full_arguments = arguments + ['--reference', workspace.reference, '--seed', 0,
+                                      '--number', max(1, int(number * scale))]
+
+        def run():
+            reads, bases = count_fasta(run_command(full_arguments))
+            return {'reads': reads, 'bases': bases}
+        return run
+
+
+generator_benchmark('generate_split_reads', ['generate_split_reads', '--mean', 4], 20000)
+generator_benchmark('same_chr', ['same_chr', '--mean', 4], 20000)
+generator_benchmark('simple_sv', ['simple_sv', '--sv-mix',
+                                  'deletion=1,insertion=1,inversion3=1,duplication=1,'
+                                  'translocation=1,ninsertion=1'], 20000)
+
+
+@benchmark('collect_mapping_info', ['rows', 'reads'])
+def collect_mapping_info_benchmark(workspace, scale):
+    bam_filename, _ = workspace.mapping_files(max(1, int(10000 * scale)))
+
+    def run():
+        table = collect_mapping_info.mapping_table(bam_filename)
+        return {'rows': len(table), 'reads': table['qname'].nunique()}
+    return run
+
+
+@benchmark('benchmark_mappings', ['rows', 'reads'])
+def benchmark_mappings_benchmark(workspace, scale):
+    bam_filename, reads_filename = workspace.mapping_files(max(1, int(10000 * scale)))
+    table = collect_mapping_info.mapping_table(bam_filename).reset_index(drop=True)
+    with quiet():
+        ins_events, n = benchmark_mappings.load_frag_info(reads_filename)
+    prefix = workspace.path('benchmark.')
+
+    def run():
+        with quiet():
+            benchmark_mappings.analyse_ins_numbers(table.copy(), ins_events, prefix, n, False)
+        return {'rows': len(table), 'reads': table['qname'].nunique()}
+    return run
+
+
+@benchmark('benchmark_bam', ['rows', 'reads'])
+def benchmark_bam_benchmark(workspace, scale):
+    bam_filename, reads_filename = workspace.mapping_files(max(1, int(10000 * scale)))
+    with quiet():
+        ins_events, _ = benchmark_mappings.load_frag_info(reads_filename)
+
+    def run():
+        streaming = benchmark_bam.StreamingBenchmark(ins_events)
+        rows = 0
+        with pysam.AlignmentFile(bam_filename, 'r') as bam:
+            for qname, alignments in benchmark_bam.iterate_reads(bam):
+                streaming.add_read(qname, alignments)
+                rows += len(alignments)
+        return {'rows': rows, 'reads': streaming.reads}
+    return run
+
+
+def time_benchmark(name, workspace, scale, repeats):
+    """
+    Sets up a benchmark and times it, keeping the fastest of the repeats.
+    """
+    function, units = BENCHMARKS[name]
+    run = function(workspace, scale)
+    times, counts = [], None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        counts = run()
+        times.append(time.perf_counter() - start)
+    seconds = min(times)
+    rates = {f'{unit}_per_sec': counts[unit] / seconds for unit in units}
+    return {'seconds': seconds, 'all_seconds': times, 'counts': counts, 'rates': rates,
+            'main_rate': f'{units[0]}_per_sec'}
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=pathlib.Path(__file__).resolve().parent,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return None
+
+
+def get_arguments():
+    parser = argparse.ArgumentParser(description='Run SplitReadSimulator performance benchmarks')
+    parser.add_argument('--out', type=str, default='benchmark_results.json',
+                        help='JSON file for the results (default: %(default)s)')
+    parser.add_argument('--only', type=str, nargs='+',
+                        help='Only run benchmarks matching these names (wildcards allowed)')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Times to run each benchmark, keeping the fastest '
+                             '(default: %(default)s)')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='Multiplier for the amount of work in each benchmark '
+                             '(default: %(default)s)')
+    parser.add_argument('--list', action='store_true', help='List the benchmarks and quit')
+    return parser.parse_args()
+
+
+def main():
+    args = get_arguments()
+    names = list(BENCHMARKS)
+    if args.list:
+        print('\n'.join(names))
+        return
+    if args.only:
+        names = [n for n in names if any(fnmatch.fnmatch(n, p) for p in args.only)]
+        if not names:
+            sys.exit('Error: no benchmarks match ' + ' '.join(args.only))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        workspace = Workspace(directory)
+        for name in names:
+            print(f'{name} ...', end='', flush=True, file=sys.stderr)
+            results[name] = time_benchmark(name, workspace, args.scale, args.repeats)
+            main_rate = results[name]['main_rate']
+            print(f' {results[name]["rates"][main_rate]:,.0f} {main_rate.replace("_", " ")}',
+                  file=sys.stderr)
+
+    output = {'version': RESULTS_VERSION,
+              'date': datetime.datetime.now().isoformat(timespec='seconds'),
+              'commit': get_commit(),
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'scale': args.scale, 'repeats': args.repeats,
+              'benchmarks': results}
+    with open(args.out, 'wt') as f:
+        json.dump(output, f, indent=2)
+    print(f'Results written to {args.out}', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -89,8 +89,8 @@ setup(name='SplitReadSimulator',
       author_email='miklosv@cardiff.ac.uk, clealk@cardiff.ac.uk',
       license='GPLv3',
       packages=['badread'],
-      install_requires=['edlib', 'numpy', 'scipy'],
-      extras_require={'plot': ['matplotlib']},
+      install_requires=['edlib', 'numpy>=1.17', 'scipy'],
+      extras_require={'plot': ['matplotlib'], 'mappy': ['mappy']},
       entry_points={"console_scripts": ['splitreadsimulator = badread.__main__:main']},
       include_package_data=True,
       zip_safe=False,
@@ -15,6 +15,8 @@ If not, see <http://www.gnu.org/licenses/>.
 """
 
 import os
+import random
+import re
 import unittest
 
 import badread.alignment
@@ -65,6 +67,12 @@ class TestAlignments(unittest.TestCase):
                                         '1438\t60\tNM:i:2\tms:i:2862\tAS:i:2862\tnn:i:0\ttp:A:P\t'
                                         'cm:i:254\ts1:i:1410\ts2:i:0\tdv:f:0.0016')
 
+    def test_bad_paf_4(self):
+        # Malformed CIGAR
+        with self.assertRaises(SystemExit):
+            badread.alignment.Alignment('read_1\t1438\t0\t1438\t+\tref\t10000\t754\t2191\t1436\t'
+                                        '1438\t60\tAS:i:2862\tcg:Z:798M1I639')
+
 
 class TestLoadAlignments(unittest.TestCase):
 
@@ -113,3 +121,70 @@ class TestAlignSequences(unittest.TestCase):
         self.assertEqual(aligned_read_qual, '125317 253763')
         self.assertEqual(aligned_ref_seq, 'ACTACGCACTACG')
         self.assertEqual(errors_per_read_pos, [0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0])
+
+    def test_read_error_profile(self):
+        alignment = badread.alignment.Alignment('read_1\t12\t0\t12\t+\tref\t13\t0\t13\t11\t13\t255'
+                                                '\tAS:i:2862\tcg:Z:6M1D6M')
+        errors_per_read_pos = badread.alignment.read_error_profile('ACTACGACAACG',
+                                                                   'ACTACGCACTACG', alignment)
+        self.assertEqual(errors_per_read_pos.tolist(), [0, 0, 0, 0, 0, 0, 1, 0, 1, 0, 0, 0])
+
+    def test_same_as_base_by_base(self):
+        rng = random.Random(0)
+        for _ in range(100):
+            read, ref, cigar = random_alignment(rng)
+            qual = ''.join(rng.choice('!+5?I') for _ in read)
+            alignment = badread.alignment.Alignment(
+                f'read_1\t{len(read)}\t0\t{len(read)}\t+\tref\t{len(ref)}\t0\t{len(ref)}\t1\t1\t'
+                f'255\tAS:i:1\tcg:Z:{cigar}')
+            self.assertEqual(badread.alignment.align_sequences(read, qual, ref, alignment),
+                             align_sequences_base_by_base(read, qual, ref, cigar))
+            self.assertEqual(badread.alignment.read_error_profile(read, ref, alignment).tolist(),
+                             align_sequences_base_by_base(read, qual, ref, cigar)[3])
+
+
+def random_alignment(rng):
+    read, ref, cigar = [], [], []
+    for _ in range(rng.randint(1, 20)):
+        op, size = rng.choice('MMMID'), rng.randint(1, 10)
+        if op != 'D':
+            read.append(''.join(rng.choice('ACGT') for _ in range(size)))
+        if op != 'I':
+            ref.append(''.join(rng.choice('ACGT') for _ in range(size)))
+        cigar.append(f'{size}{op}')
+    cigar.append('5M')  # so no deletion is at the end
+    read.append('ACGTA')
+    ref.append('ACGTA')
+    return ''.join(read), ''.join(ref), ''.join(cigar)
+
+
+def align_sequences_base_by_base(read_seq, read_qual, ref_seq, cigar):
+    read, qual, ref = [], [], []
+    read_pos, ref_pos = 0, 0
+    errors_per_read_pos = [0] * len(read_seq)
+    for c in re.findall(r'\d+\w', cigar):
+        cigar_type = c[-1]
+        cigar_size = int(c[:-1])
+        if cigar_type == 'M':
+            read.append(read_seq[read_pos:read_pos+cigar_size])
+            qual.append(read_qual[read_pos:read_pos+cigar_size])
+            ref.append(ref_seq[ref_pos:ref_pos+cigar_size])
+            for i in range(cigar_size):
+                if read_seq[read_pos+i] != ref_seq[ref_pos+i]:
+                    errors_per_read_pos[read_pos+i] += 1
+            read_pos += cigar_size
+            ref_pos += cigar_size
+        if cigar_type == 'I':
+            read.append(read_seq[read_pos:read_pos+cigar_size])
+            qual.append(read_qual[read_pos:read_pos+cigar_size])
+            ref.append('-' * cigar_size)
+            for i in range(cigar_size):
+                errors_per_read_pos[read_pos+i] += 1
+            read_pos += cigar_size
+        if cigar_type == 'D':
+            read.append('-' * cigar_size)
+            qual.append('-' * cigar_size)
+            ref.append(ref_seq[ref_pos:ref_pos+cigar_size])
+            errors_per_read_pos[read_pos] += cigar_size
+            ref_pos += cigar_size
+    return ''.join(read), ''.join(qual), ''.join(ref), errors_per_read_pos
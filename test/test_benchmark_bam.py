@@ -0,0 +1,174 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import collections
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import pysam
+
+import badread.benchmark_bam
+import badread.benchmark_mappings
+import badread.collect_mapping_info
+import badread.misc
+import badread.truth
+
+
+FetchBlock = badread.misc.FetchBlock
+
+MappingsArgs = collections.namedtuple('MappingsArgs', ['query', 'target', 'truth', 'aligner',
+                                                       'out', 'prefix', 'include_figures'])
+
+PLANS = [(0, 'deletion__A:1000-1200_A:1500-1800', [FetchBlock('A', 1000, 1200),
+                                                    FetchBlock('A', 1500, 1800)]),
+         (1, 'translocation__A:100-400_B:200-300', [FetchBlock('A', 100, 400),
+                                                     FetchBlock('B', 200, 300)]),
+         (2, 'deletion__B:1000-1300_B:2000-2400', [FetchBlock('B', 1000, 1300),
+                                                    FetchBlock('B', 2000, 2400)])]
+
+READS = '@read-a r0 i=95.00%\nACGT\n+\n!!!!\n' \
+        '@read-b r1 i=90.00%\nACGT\n+\n!!!!\n' \
+        '@read-c junk_seq i=80.00%\nACGT\n+\n!!!!\n' \
+        '@read-d r2 i=90.00%\nACGT\n+\n!!!!\n'
+
+# (read, chrom, 0-based start, aligned length, mapq, flag)
+ALIGNMENTS = [('read-a', 0, 1000, 200, 60, 0),      # tp
+              ('read-a', 0, 1490, 310, 60, 2048),   # tp
+              ('read-a', 1, 5000, 300, 0, 256),     # secondary, left out
+              ('read-b', 0, 99, 301, 30, 0),        # tp
+              ('read-b', 1, 900, 100, 5, 2048),     # fp (B:200-300 is a fn)
+              ('read-c', 1, 0, 50, 60, 0)]          # no truth
+
+# As above, plus a repeated record and a read with no mappings.
+MORE_ALIGNMENTS = ALIGNMENTS[:5] + [('read-b', 1, 900, 100, 5, 2048),   # repeated, left out
+                                    ALIGNMENTS[5],
+                                    ('read-d', -1, -1, 0, 0, 4)]      # unmapped
+
+
+def write_bam(filename, sort_order='unsorted', alignments=ALIGNMENTS):
+    header = {'HD': {'VN': '1.6', 'SO': sort_order},
+              'SQ': [{'SN': 'A', 'LN': 10000}, {'SN': 'B', 'LN': 10000}]}
+    with pysam.AlignmentFile(filename, 'wb', header=header) as bam:
+        for name, ref, start, length, mapq, flag in alignments:
+            a = pysam.AlignedSegment()
+            a.query_name = name
+            a.flag = flag
+            a.reference_id = ref
+            a.reference_start = start
+            a.mapping_quality = mapq
+            if flag & 4:
+                a.query_sequence = 'ACGT'
+            else:
+                a.cigartuples = [(0, length)]
+                a.query_sequence = 'A' * length
+            bam.write(a)
+
+
+class TestBenchmarkBam(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        self.truth_filename = os.path.join(self.dir, 'truth.tsv')
+        self.reads_filename = os.path.join(self.dir, 'reads.fastq')
+        self.bam_filename = os.path.join(self.dir, 'mappings.bam')
+        with open(self.reads_filename, 'wt') as f:
+            f.write(READS)
+        with badread.truth.TruthTable(self.truth_filename) as truth_table:
+            list(truth_table.record(PLANS))
+        self.args = collections.namedtuple('Args', ['bam', 'target', 'truth', 'out', 'prefix'])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_benchmark(self):
+        badread.benchmark_bam.benchmark_bam(self.args(self.bam_filename, self.reads_filename,
+                                                      self.truth_filename, self.dir, 'test'))
+
+    def read_table(self, name):
+        return pd.read_csv(os.path.join(self.dir, 'test.' + name), sep='\t')
+
+    def test_stats(self):
+        write_bam(self.bam_filename)
+        self.run_benchmark()
+        stats = self.read_table('stats.txt')
+        self.assertEqual(stats['precision'][0], 0.75)
+        self.assertEqual(stats['recall'][0], 0.75)
+        self.assertEqual(stats['query_n'][0], 4)
+        self.assertEqual(stats['target_n'][0], 6)
+
+    def test_tables(self):
+        write_bam(self.bam_filename)
+        self.run_benchmark()
+        size = self.read_table('size_metrics.csv').set_index('bins')
+        self.assertEqual(list(size.index), [100, 200, 300])
+        self.assertEqual(list(size['tp']), [0, 1, 2])
+        self.assertEqual(list(size['fp']), [1, 0, 0])
+        self.assertEqual(list(size['fn']), [1, 0, 0])
+        mapq = self.read_table('mapq_metrics.csv').set_index('mapq')
+        self.assertEqual(list(mapq.index), [5, 30, 60])
+        self.assertEqual(list(mapq['fp']), [1, 0, 0])
+        expected = self.read_table('expected_alns_metrics.csv')
+        self.assertEqual(list(expected['n_target']), [2])
+        self.assertEqual(list(expected['n']), [2])
+
+    def test_iterate_reads(self):
+        write_bam(self.bam_filename)
+        with pysam.AlignmentFile(self.bam_filename, 'r') as bam:
+            reads = list(badread.benchmark_bam.iterate_reads(bam))
+        self.assertEqual([name for name, _ in reads], ['read-a', 'read-b', 'read-c'])
+        self.assertEqual(reads[0][1], [('A', 1001, 1200, 60, 200), ('A', 1491, 1800, 60, 310)])
+
+        benchmark = badread.benchmark_bam.StreamingBenchmark({})
+        benchmark.add_read(*reads[2])
+        self.assertEqual(benchmark.unlabelled_reads, 1)
+
+    def test_coordinate_sorted(self):
+        write_bam(self.bam_filename, sort_order='coordinate')
+        with self.assertRaises(SystemExit):
+            self.run_benchmark()
+
+    def test_unmapped_read(self):
+        write_bam(self.bam_filename, alignments=MORE_ALIGNMENTS)
+        with pysam.AlignmentFile(self.bam_filename, 'r') as bam:
+            reads = dict(badread.benchmark_bam.iterate_reads(bam))
+        self.assertEqual(len(reads['read-b']), 2)
+        self.assertEqual(reads['read-d'], [])
+
+        ins_events, _ = badread.benchmark_mappings.load_truth_info(self.truth_filename,
+                                                                   self.reads_filename)
+        benchmark = badread.benchmark_bam.StreamingBenchmark(ins_events)
+        for qname, alignments in reads.items():
+            benchmark.add_read(qname, alignments)
+        self.assertEqual(benchmark.unseen, {'read-d'})
+        self.assertEqual((benchmark.tp, benchmark.fp, benchmark.fn), (3, 1, 1))
+
+    def test_same_as_benchmark_mappings(self):
+        write_bam(self.bam_filename, alignments=MORE_ALIGNMENTS)
+        self.run_benchmark()
+        bam_stats = self.read_table('stats.txt')
+
+        query = os.path.join(self.dir, 'mappings')
+        with badread.misc.captured_output():
+            badread.collect_mapping_info.mapping_info(self.bam_filename, query)
+            badread.benchmark_mappings.benchmark_mappings(
+                MappingsArgs(query + '.bed', self.reads_filename, self.truth_filename, None,
+                             self.dir, 'mappings', False))
+        mappings_stats = pd.read_csv(os.path.join(self.dir, 'mappings.stats.txt'), sep='\t')
+        pd.testing.assert_frame_equal(bam_stats, mappings_stats)
@@ -0,0 +1,101 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import badread.benchmark_mappy
+import badread.misc
+import badread.truth
+
+
+FetchBlock = badread.misc.FetchBlock
+
+PLANS = [(0, 'deletion__A:1000-1200_A:1500-1800', [FetchBlock('A', 1000, 1200),
+                                                    FetchBlock('A', 1500, 1800)])]
+
+HAS_MAPPY = importlib.util.find_spec('mappy') is not None
+
+
+class FakeAligner(object):
+    """
+    Gives set alignments for each sequence, standing in for MappyAligner.
+    """
+    def __init__(self, alignments):
+        self.alignments = alignments
+
+    def align_all(self, seqs):
+        for seq in seqs:
+            yield self.alignments[seq]
+
+
+class TestBenchmarkMappy(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.truth_filename = os.path.join(self.temp_dir.name, 'truth.tsv')
+        self.reads_filename = os.path.join(self.temp_dir.name, 'reads.fastq')
+        with badread.truth.TruthTable(self.truth_filename) as truth_table:
+            list(truth_table.record(PLANS))
+        with open(self.reads_filename, 'wt') as f:
+            f.write('@read-a r0 i=95.00%\nACGT\n+\n!!!!\n'
+                    '@read-b junk_seq i=80.00%\nTTTT\n+\n!!!!\n')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_load_reads_with_truth(self):
+        reads = badread.benchmark_mappy.load_reads(self.reads_filename, self.truth_filename)
+        self.assertEqual([(name, seq) for name, seq, _ in reads],
+                         [('read-a', 'ACGT'), ('read-b', 'TTTT')])
+        self.assertEqual(reads[0][2].get_ins_blocks(), [('A', 1000, 1200), ('A', 1500, 1800)])
+        self.assertIsNone(reads[1][2])
+
+    def test_load_reads_from_names(self):
+        with open(self.reads_filename, 'wt') as f:
+            f.write('@read-a deletion__A:1000-1200_A:1500-1800 i=95.00%\nACGT\n+\n!!!!\n')
+        reads = badread.benchmark_mappy.load_reads(self.reads_filename)
+        self.assertEqual(reads[0][2].get_type(), 'deletion')
+        self.assertEqual(reads[0][2].get_ins_blocks(), [('A', 1000, 1200), ('A', 1500, 1800)])
+
+    def test_benchmark_reads(self):
+        reads = badread.benchmark_mappy.load_reads(self.reads_filename, self.truth_filename)
+        aligner = FakeAligner({'ACGT': [('A', 1001, 1200, 60, 200), ('B', 1, 300, 3, 300)],
+                               'TTTT': [('A', 1, 50, 60, 50)]})
+        benchmark, n = badread.benchmark_mappy.benchmark_reads(reads, aligner)
+        self.assertEqual(n, 2)
+        self.assertEqual((benchmark.tp, benchmark.fp, benchmark.fn), (1, 1, 1))
+        self.assertEqual(benchmark.unlabelled_reads, 1)
+
+    @unittest.skipIf(HAS_MAPPY, 'mappy is installed')
+    def test_no_mappy(self):
+        with self.assertRaises(SystemExit):
+            badread.benchmark_mappy.get_mappy()
+
+    @unittest.skipUnless(HAS_MAPPY, 'needs mappy')
+    def test_mappy(self):
+        ref_filename = os.path.join(os.path.dirname(__file__), 'test_ref_2.fasta')
+        refs, _, _ = badread.misc.load_fasta(ref_filename)
+        name, seq = next(iter(refs.items()))
+        read = seq[1000:3000]
+        reads = [('read-a', read, badread.benchmark_mappy.InsEvent.from_truth(
+            'read-a', 'alignments_1', [(name, 1000, 3000)]))]
+        aligner = badread.benchmark_mappy.MappyAligner(ref_filename, 'map-ont', 2)
+        benchmark, _ = badread.benchmark_mappy.benchmark_reads(reads, aligner)
+        self.assertEqual(benchmark.tp, 1)
@@ -0,0 +1,85 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import unittest
+
+import badread.cigar
+
+
+def parse(cigar):
+    ops, lengths = badread.cigar.parse_cigar(cigar)
+    return ops.tobytes().decode(), lengths.tolist()
+
+
+class TestParseCigar(unittest.TestCase):
+
+    def test_parse(self):
+        self.assertEqual(parse('5=1X12I3D'), ('=XID', [5, 1, 12, 3]))
+        self.assertEqual(parse('798M1I639M'), ('MIM', [798, 1, 639]))
+
+    def test_empty(self):
+        self.assertEqual(parse(''), ('', []))
+
+    def test_invalid(self):
+        for cigar in ['5=1', '=', '5Q', '5= 3X']:
+            with self.assertRaises(ValueError):
+                badread.cigar.parse_cigar(cigar)
+
+    def test_tuples(self):
+        self.assertEqual(badread.cigar.cigar_tuples('5=1X12I3D'),
+                         [('=', 5), ('X', 1), ('I', 12), ('D', 3)])
+
+
+class TestCigarFunctions(unittest.TestCase):
+
+    def test_identity(self):
+        self.assertEqual(badread.cigar.cigar_identity(*badread.cigar.parse_cigar('6=2X1I1D')),
+                         0.6)
+        self.assertEqual(badread.cigar.cigar_identity(*badread.cigar.parse_cigar('')), 0.0)
+
+    def test_max_indel(self):
+        self.assertEqual(badread.cigar.max_indel(*badread.cigar.parse_cigar('5M2I3M4D1M')), 4)
+        self.assertEqual(badread.cigar.max_indel(*badread.cigar.parse_cigar('5M')), 0)
+
+    def test_expand(self):
+        ops, lengths = badread.cigar.parse_cigar('3=1I2=2D1X')
+        self.assertEqual(badread.cigar.expand_cigar(ops, lengths), '===I==DDX')
+        self.assertEqual(badread.cigar.column_count(ops, lengths), 9)
+
+    def test_expand_hard_clipping(self):
+        ops, lengths = badread.cigar.parse_cigar('5H2S3M')
+        self.assertEqual(badread.cigar.expand_cigar(ops, lengths), 'SSMMM')
+
+    def test_columns(self):
+        ops, lengths = badread.cigar.parse_cigar('2M1I1M2D1M')
+        self.assertEqual(badread.cigar.query_columns(ops, lengths).tolist(), [0, 1, 2, 3, 6])
+        self.assertEqual(badread.cigar.target_columns(ops, lengths).tolist(), [0, 1, 3, 4, 5, 6])
+
+    def test_gapped_sequence(self):
+        ops, lengths = badread.cigar.parse_cigar('2M1I1M2D1M')
+        count = badread.cigar.column_count(ops, lengths)
+        self.assertEqual(badread.cigar.gapped_sequence(
+            'ACGTA', badread.cigar.query_columns(ops, lengths), count), 'ACGT--A')
+        self.assertEqual(badread.cigar.gapped_sequence(
+            'ACTCCA', badread.cigar.target_columns(ops, lengths), count, gap_char=' '),
+            'AC TCCA')
+
+    def test_gapped_sequence_too_long(self):
+        ops, lengths = badread.cigar.parse_cigar('2M1D')
+        count = badread.cigar.column_count(ops, lengths)
+        self.assertEqual(badread.cigar.gapped_sequence(
+            'ACGT', badread.cigar.query_columns(ops, lengths), count), 'AC-')
@@ -14,13 +14,17 @@ details. You should have received a copy of the GNU General Public License along
 If not, see <http://www.gnu.org/licenses/>.
 """
 
+import gzip
 import os
+import tempfile
 import unittest
 import unittest.mock
 import sys
 
 import badread.__main__
 import badread.misc
+import badread.settings
+import badread.simulate
 
 
 class TestWholeCommands(unittest.TestCase):
@@ -43,6 +47,115 @@ class TestWholeCommands(unittest.TestCase):
         out, err = out.getvalue(), err.getvalue()
         self.assertTrue(out.startswith('@'))
 
+    def test_simulate_read_range(self):
+        # Regenerating a range of reads should give exactly those reads from the full run.
+        test_args = ['badread', 'simulate', '--reference', self.ref_filename, '--quantity', '5x',
+                     '--error_model', 'random', '--qscore_model', 'random', '--seed', '5']
+        with unittest.mock.patch.object(sys, 'argv', test_args):
+            with badread.misc.captured_output() as (out, err):
+                badread.__main__.main(output=self.null)
+        full_lines = out.getvalue().splitlines()
+        self.assertGreaterEqual(len(full_lines), 16)
+        with unittest.mock.patch.object(sys, 'argv', test_args + ['--read-range', '2:4']):
+            with badread.misc.captured_output() as (out, err):
+                badread.__main__.main(output=self.null)
+        self.assertEqual(out.getvalue().splitlines(), full_lines[8:16])
+
+    def test_simulate_read_range_without_seed(self):
+        test_args = ['badread', 'simulate', '--reference', self.ref_filename, '--quantity', '1x',
+                     '--read-range', '2:4']
+        with unittest.mock.patch.object(sys, 'argv', test_args):
+            with self.assertRaises(SystemExit) as cm:
+                badread.__main__.main(output=self.null)
+        self.assertTrue('requires --seed' in str(cm.exception))
+
+    def test_simulate_resume(self):
+        self.check_resume('reads.fastq', open)
+
+    def test_simulate_resume_gzipped(self):
+        self.check_resume('reads.fastq.gz', gzip.open)
+
+    def test_simulate_resume_changed_mem_report(self):
+        # The memory report options don't affect the reads, so they can change on resuming.
+        with tempfile.TemporaryDirectory() as temp_dir:
+            first_report = os.path.join(temp_dir, 'mem_1.json')
+            resumed_report = os.path.join(temp_dir, 'mem_2.json')
+            self.check_resume('reads.fastq', open, ['--mem-report', first_report],
+                              ['--mem-report', resumed_report, '--mem-report-allocations'])
+            self.check_resume('reads.fastq', open, ['--mem-report', first_report], [])
+            self.assertTrue(os.path.isfile(resumed_report))
+
+    def check_resume(self, output_name, open_func, first_options=(), resume_options=()):
+        # A run which dies part way through (leaving a partial read in its output) should be able
+        # to resume and give the same reads as a run which didn't die. The options are global
+        # ones given to the first run and the resumed run.
+        with tempfile.TemporaryDirectory() as temp_dir:
+            full_filename = os.path.join(temp_dir, 'full_' + output_name)
+            output_filename = os.path.join(temp_dir, output_name)
+            checkpoint_filename = os.path.join(temp_dir, 'checkpoint.json')
+            base_args = ['badread', 'simulate', '--reference', self.ref_filename,
+                         '--quantity', '5x', '--error_model', 'random', '--qscore_model',
+                         'random', '--seed', '5']
+            with unittest.mock.patch.object(sys, 'argv', base_args + ['--output', full_filename]):
+                badread.__main__.main(output=self.null)
+
+            test_args = base_args + ['--output', output_filename,
+                                     '--checkpoint', checkpoint_filename]
+            make_read = badread.simulate.ReadMaker.make_read
+
+            def dying_make_read(read_maker, read_index):
+                if read_index == 3:
+                    raise KeyboardInterrupt
+                return make_read(read_maker, read_index)
+
+            first_args = test_args[:1] + list(first_options) + test_args[1:]
+            with unittest.mock.patch.object(sys, 'argv', first_args), \
+                    unittest.mock.patch.object(badread.settings, 'CHECKPOINT_INTERVAL', 0.0), \
+                    unittest.mock.patch.object(badread.simulate.ReadMaker, 'make_read',
+                                               dying_make_read):
+                with self.assertRaises(KeyboardInterrupt):
+                    badread.__main__.main(output=self.null)
+            with open(output_filename, 'ab') as f:
+                f.write(b'@partial_read\nACGT')
+
+            resume_args = test_args[:1] + list(resume_options) + test_args[1:] + ['--resume']
+            with unittest.mock.patch.object(sys, 'argv', resume_args):
+                badread.__main__.main(output=self.null)
+            with open_func(full_filename, 'rt') as f:
+                full_reads = f.read()
+            with open_func(output_filename, 'rt') as f:
+                resumed_reads = f.read()
+            self.assertEqual(full_reads.count('\n'), 20)
+            self.assertEqual(resumed_reads, full_reads)
+
+    def test_simulate_resume_changed_parameters(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_filename = os.path.join(temp_dir, 'reads.fastq')
+            checkpoint_filename = os.path.join(temp_dir, 'checkpoint.json')
+            test_args = ['badread', 'simulate', '--reference', self.ref_filename,
+                         '--quantity', '1x', '--error_model', 'random', '--qscore_model',
+                         'random', '--output', output_filename, '--checkpoint',
+                         checkpoint_filename]
+            with unittest.mock.patch.object(sys, 'argv', test_args):
+                badread.__main__.main(output=self.null)
+            test_args[5] = '2x'
+            with unittest.mock.patch.object(sys, 'argv', test_args + ['--resume']):
+                with self.assertRaises(SystemExit) as cm:
+                    badread.__main__.main(output=self.null)
+            self.assertTrue('quantity' in str(cm.exception))
+
+    def test_simulate_missing_qscore_model(self):
+        # The qscore model is checked on its own, even when the error model is a real file.
+        for error_model in ['random', self.ref_filename]:
+            test_args = ['badread', 'simulate', '--reference', self.ref_filename,
+                         '--quantity', '1x', '--error_model', error_model,
+                         '--qscore_model', 'not_a_model']
+            with unittest.mock.patch.object(sys, 'argv', test_args):
+                with self.assertRaises(SystemExit) as cm:
+                    badread.__main__.main(output=self.null)
+            self.assertTrue('not_a_model is not a file' in str(cm.exception))
+            self.assertTrue('--qscore_model' in str(cm.exception))
+
     def test_error_model(self):
         test_args = ['badread', 'error_model', '--reference', self.ref_filename,
                      '--reads', self.reads_filename, '--alignment', self.paf_filename]
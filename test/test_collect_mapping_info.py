@@ -0,0 +1,143 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import collections
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import pysam
+
+import badread.benchmark_mappings
+import badread.collect_mapping_info
+import badread.mem_report
+import badread.misc
+
+
+Args = collections.namedtuple('Args', ['bam', 'out', 'aligner_name', 'combined', 'threads'])
+
+
+def write_bam(filename, alignments):
+    """
+    Writes (read, 0-based start, aligned length, flag) alignments to chromosome A, each read being
+    400 bp with the rest soft-clipped.
+    """
+    header = {'HD': {'VN': '1.6', 'SO': 'unsorted'}, 'SQ': [{'SN': 'A', 'LN': 10000}]}
+    with pysam.AlignmentFile(filename, 'wb', header=header) as bam:
+        for name, start, length, flag in alignments:
+            a = pysam.AlignedSegment()
+            a.query_name = name
+            a.flag = flag
+            a.reference_id = 0
+            a.reference_start = start
+            a.mapping_quality = 60
+            a.cigartuples = [(0, length), (4, 400 - length)]
+            a.query_sequence = 'A' * 400
+            bam.write(a)
+
+
+class TestCollectMappingInfo(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.dir = self.temp_dir.name
+        self.bams = [os.path.join(self.dir, 'minimap2.bam'),
+                     os.path.join(self.dir, 'bwa.sorted.bam')]
+        write_bam(self.bams[0], [('read1', 100, 200, 0), ('read1', 900, 150, 2048),
+                                 ('read2', 3000, 300, 0)])
+        write_bam(self.bams[1], [('read1', 100, 250, 0), ('read2', 3000, 300, 0),
+                                 ('read3', 5000, 100, 0)])
+        self.out = os.path.join(self.dir, 'mappings')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read_table(self, filename):
+        return pd.read_csv(filename, sep='\t')
+
+    def test_one_bam(self):
+        badread.collect_mapping_info.collect_mapping_info(
+            Args(self.bams[:1], self.out, None, False, 4))
+        table = self.read_table(self.out + '.bed')
+        self.assertEqual(len(table), 3)
+        self.assertNotIn('aligner', table)
+
+    def test_one_output_per_bam(self):
+        badread.collect_mapping_info.collect_mapping_info(Args(self.bams, self.out, None, False, 2))
+        self.assertEqual(len(self.read_table(self.out + '.minimap2.bed')), 3)
+        self.assertEqual(len(self.read_table(self.out + '.bwa.bed')), 3)
+
+    def test_parallel_same_as_serial(self):
+        badread.collect_mapping_info.collect_mapping_info(Args(self.bams, self.out, None, True, 2))
+        parallel = self.read_table(self.out + '.bed')
+        badread.collect_mapping_info.collect_mapping_info(Args(self.bams, self.out, None, True, 1))
+        serial = self.read_table(self.out + '.bed')
+        pd.testing.assert_frame_equal(parallel, serial)
+
+    def test_combined(self):
+        badread.collect_mapping_info.collect_mapping_info(
+            Args(self.bams, self.out, ['mm2', 'bwa'], True, 2))
+        table = self.read_table(self.out + '.bed')
+        self.assertEqual(list(table.columns[:2]), ['aligner', 'chrom'])
+        self.assertEqual(list(table['aligner']), ['mm2'] * 3 + ['bwa'] * 3)
+
+        bwa = badread.benchmark_mappings.select_aligner(table, 'bwa')
+        self.assertEqual(sorted(bwa['qname']), ['read1', 'read2', 'read3'])
+        self.assertNotIn('aligner', bwa)
+        with self.assertRaises(SystemExit):
+            badread.benchmark_mappings.select_aligner(table, None)
+        with self.assertRaises(SystemExit):
+            badread.benchmark_mappings.select_aligner(table, 'ngmlr')
+
+    def test_bad_names(self):
+        with self.assertRaises(SystemExit):
+            badread.collect_mapping_info.get_aligner_names(self.bams, ['mm2'])
+        with self.assertRaises(SystemExit):
+            badread.collect_mapping_info.get_aligner_names(self.bams, ['mm2', 'mm2'])
+
+    def run_with_mem_report(self, threads):
+        report_filename = os.path.join(self.dir, 'mem.json')
+        badread.mem_report.start(report_filename, 'collect_mapping_info')
+        try:
+            with badread.misc.captured_output():
+                badread.collect_mapping_info.collect_mapping_info(
+                    Args(self.bams, self.out, None, False, threads))
+        finally:
+            badread.mem_report.finish()
+        with open(report_filename, 'rt') as f:
+            return json.load(f)
+
+    def test_mem_report_parallel(self):
+        report = self.run_with_mem_report(2)
+        stages = report['stages']
+        self.assertEqual(sorted(s['stage'] for s in stages),
+                         ['build table (bwa)', 'build table (minimap2)', 'read BAM (bwa)',
+                          'read BAM (minimap2)', 'write table (bwa)', 'write table (minimap2)'])
+        self.assertTrue(all('worker_pid' in s for s in stages))
+        self.assertNotIn(os.getpid(), [s['worker_pid'] for s in stages])
+        self.assertIn('children_rss_peak_mb', report)
+
+    def test_mem_report_serial(self):
+        report = self.run_with_mem_report(1)
+        self.assertEqual([s['stage'] for s in report['stages']],
+                         ['read BAM (minimap2)', 'build table (minimap2)',
+                          'write table (minimap2)', 'read BAM (bwa)', 'build table (bwa)',
+                          'write table (bwa)'])
+        self.assertFalse(any('worker_pid' in s for s in report['stages']))
+        self.assertNotIn('children_rss_peak_mb', report)
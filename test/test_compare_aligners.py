@@ -0,0 +1,178 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import collections
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+import scipy.stats
+
+import badread.compare_aligners
+
+
+def make_tables(seed):
+    """
+    Makes small benchmark_mappings-like tables: mapped alignments with tp/fp labels, and the same
+    alignments plus false negative rows (which have no MapQ).
+    """
+    generator = np.random.default_rng(seed)
+    count = 400
+    tp = generator.integers(0, 2, count)
+    mappings = pd.DataFrame({'qname': [f'read{i // 3}' for i in range(count)],
+                             'aln_size': generator.integers(15, 900, count),
+                             'mapq': generator.integers(0, 61, count),
+                             'tp': tp.astype(float), 'fp': (1 - tp).astype(float),
+                             'n_alignments': 3})
+    fn_rows = pd.DataFrame({'qname': [f'read{i}' for i in range(0, 130, 2)],
+                            'aln_size': generator.integers(15, 900, 65), 'fn': 1.0})
+    benchmark_res = pd.concat([fn_rows, mappings], ignore_index=True)
+    benchmark_res['n_target'] = benchmark_res['qname'].map(
+        lambda q: 2 + int(q[4:]) % 3)
+    stats = pd.DataFrame({'type': ['all'], 'target_n': [500]})
+    return mappings, benchmark_res, stats
+
+
+class TestSummarise(unittest.TestCase):
+
+    def setUp(self):
+        self.mappings, self.benchmark_res, self.stats = make_tables(0)
+        self.summary = badread.compare_aligners.summarise(self.mappings, self.benchmark_res,
+                                                          self.stats)
+
+    def test_totals(self):
+        self.assertEqual(self.summary['total'], 500)
+        self.assertEqual(self.summary['mapped'], 400)
+
+    def test_size_bins(self):
+        # Same as the per-figure loops: round(aln_size / 25) * 25 for each alignment.
+        bins = [25 * round(s / 25) for s in self.mappings['aln_size']]
+        d = self.mappings.assign(bins=bins)
+        size = self.summary['size']
+        for bid, b in d.groupby('bins'):
+            self.assertEqual(size.loc[bid, 'n'], len(b))
+            self.assertEqual(size.loc[bid, 'tp'], b['tp'].sum())
+            self.assertEqual(size.loc[bid, 'mapq'], b['mapq'].sum())
+        self.assertEqual(len(size), d['bins'].nunique())
+
+    def test_bwa_curve(self):
+        expected_x, expected_y = [], []
+        tp, fp = 0, 0
+        for _, b in sorted(self.benchmark_res.groupby('mapq'), key=lambda x: x[0], reverse=True):
+            tp += b['tp'].sum()
+            fp += b['fp'].sum()
+            if tp + fp == 0:
+                continue
+            expected_y.append((fp + tp) / 500)
+            expected_x.append(fp / (tp + fp))
+        b = self.summary['bwa_mapq'].sort_index(ascending=False).cumsum()
+        b = b[(b['tp'] + b['fp']) != 0]
+        np.testing.assert_allclose(b['fp'] / (b['tp'] + b['fp']), expected_x)
+        np.testing.assert_allclose((b['tp'] + b['fp']) / 500, expected_y)
+
+    def test_aln_diff(self):
+        counts = collections.Counter()
+        for _, b in self.benchmark_res.groupby('qname'):
+            diff = b['n_alignments'].max() - b['n_target'].max()
+            if not np.isnan(diff):
+                counts[diff] += 1
+        aln_diff = self.summary['aln_diff']
+        self.assertEqual(dict(zip(aln_diff.index, aln_diff['n'])), dict(counts))
+
+    def test_recall_bins_include_false_negatives(self):
+        self.assertEqual(self.summary['recall_size']['n'].sum(), len(self.benchmark_res))
+        self.assertEqual(self.summary['recall_size']['fn'].sum(), 65)
+
+    def test_kde_matches_scipy(self):
+        values = self.mappings['aln_size'].to_numpy()
+        density = self.summary['aln_size_density']
+        expected = scipy.stats.gaussian_kde(values)(density['x'])
+        np.testing.assert_allclose(density['density'], expected, rtol=1e-6)
+
+    def test_kde_too_few_values(self):
+        self.assertEqual(len(badread.compare_aligners.kde_curve([5.0])), 0)
+        self.assertEqual(len(badread.compare_aligners.kde_curve([5.0, 5.0, 5.0])), 0)
+
+
+class TestCompareAligners(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.temp_dir.name, 'ont')
+        self.output_path = os.path.join(self.temp_dir.name, 'out')
+        os.makedirs(self.input_path)
+        self.datasets = {}
+        for i, aligner in enumerate(['minimap2', 'new_aligner']):
+            mappings, benchmark_res, stats = make_tables(i)
+            files = badread.compare_aligners.get_input_files(self.input_path, aligner)
+            mappings.to_csv(files[0], sep='\t', index=False)
+            benchmark_res.to_csv(files[1], sep='\t', index=False)
+            stats.to_csv(files[2], sep='\t', index=False)
+            self.datasets[aligner + '_ont'] = files
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_parallel_same_as_serial(self):
+        serial = badread.compare_aligners.load_summaries(self.datasets, None, 1)
+        parallel = badread.compare_aligners.load_summaries(self.datasets, None, 2)
+        self.assertEqual(list(serial), list(parallel))
+        for name in serial:
+            pd.testing.assert_frame_equal(serial[name]['size'], parallel[name]['size'])
+
+    def test_cache(self):
+        cache_dir = self.temp_dir.name
+        first = badread.compare_aligners.load_summaries(self.datasets, cache_dir, 1)
+        cache_filename = os.path.join(cache_dir, 'minimap2_ont.summary.pkl')
+        self.assertTrue(os.path.isfile(cache_filename))
+
+        # An unchanged aligner is loaded from the cache (so a tampered cache shows through)...
+        cached = badread.compare_aligners.load_cached_summary(self.datasets['minimap2_ont'],
+                                                              cache_filename)
+        cached['mapped'] = -1
+        key = badread.compare_aligners.get_cache_key(self.datasets['minimap2_ont'])
+        with open(cache_filename, 'wb') as f:
+            badread.compare_aligners.pickle.dump({'key': key, 'summary': cached}, f)
+        second = badread.compare_aligners.load_summaries(self.datasets, cache_dir, 1)
+        self.assertEqual(second['minimap2_ont']['mapped'], -1)
+        self.assertEqual(second['new_aligner_ont']['mapped'], first['new_aligner_ont']['mapped'])
+
+        # ... but is summarised again when its results change.
+        stat = os.stat(self.datasets['minimap2_ont'][0])
+        os.utime(self.datasets['minimap2_ont'][0], ns=(stat.st_atime_ns,
+                                                       stat.st_mtime_ns + 1000000000))
+        third = badread.compare_aligners.load_summaries(self.datasets, cache_dir, 1)
+        self.assertEqual(third['minimap2_ont']['mapped'], 400)
+
+    def test_figures(self):
+        args = collections.namedtuple('Args', ['aligner_name', 'output_path', 'input_path_ont',
+                                               'input_path_pacbio', 'threads', 'cache_dir'])
+        badread.compare_aligners.compare_aligners(
+            args(['minimap2', 'new_aligner'], self.output_path, self.input_path, None, 1, None))
+        for figure in ['size_vs_precision_log', 'bwamempaper_mapq', 'expected_alns_f_score',
+                       'fragment_len_dist', 'legend']:
+            self.assertTrue(os.path.isfile(os.path.join(self.output_path, figure + '.png')))
+        self.assertTrue(os.path.isfile(os.path.join(self.output_path, 'summaries',
+                                                    'new_aligner_ont.summary.pkl')))
+
+    def test_missing_input(self):
+        args = collections.namedtuple('Args', ['aligner_name', 'output_path', 'input_path_ont',
+                                               'input_path_pacbio', 'threads', 'cache_dir'])
+        with self.assertRaises(SystemExit):
+            badread.compare_aligners.compare_aligners(
+                args(['bwa'], self.output_path, self.input_path, None, 1, None))
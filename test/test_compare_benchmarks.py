@@ -0,0 +1,105 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+
+def load_compare_benchmarks():
+    # The benchmark scripts aren't part of the package, so this loads the script by its path.
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        'benchmarks', 'compare_benchmarks.py')
+    spec = importlib.util.spec_from_file_location('compare_benchmarks', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+compare_benchmarks = load_compare_benchmarks()
+
+
+def results(rates):
+    return {'version': 2, 'scale': 1.0,
+            'benchmarks': {name: {'main_rate': 'bases_per_sec', 'rates': {'bases_per_sec': rate}}
+                           for name, rate in rates.items()}}
+
+
+class TestCompare(unittest.TestCase):
+
+    def test_statuses(self):
+        baseline = results({'a': 1000, 'b': 1000, 'c': 1000, 'd': 1000, 'gone': 1000})
+        current = results({'a': 1100, 'b': 800, 'c': 1500, 'd': 860, 'new': 1000})
+        rows = {row[0]: row for row in compare_benchmarks.compare(baseline, current, 0.15)}
+        self.assertEqual(rows['a'][5], 'ok')
+        self.assertAlmostEqual(rows['a'][4], 0.1)
+        self.assertEqual(rows['b'][5], 'REGRESSION')
+        self.assertAlmostEqual(rows['b'][4], -0.2)
+        self.assertEqual(rows['c'][5], 'faster')
+        self.assertEqual(rows['d'][5], 'ok')  # a 14% drop is within the tolerance
+        self.assertEqual(rows['new'][5], 'new')
+        self.assertEqual(rows['gone'][5], 'missing')
+        self.assertIsNone(rows['gone'][3])
+
+    def test_tolerance(self):
+        baseline, current = results({'a': 1000}), results({'a': 900})
+        self.assertEqual(compare_benchmarks.compare(baseline, current, 0.15)[0][5], 'ok')
+        self.assertEqual(compare_benchmarks.compare(baseline, current, 0.05)[0][5], 'REGRESSION')
+
+
+class TestMain(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.baseline = os.path.join(self.temp_dir.name, 'baseline.json')
+        self.current = os.path.join(self.temp_dir.name, 'current.json')
+        with open(self.baseline, 'wt') as f:
+            json.dump(results({'a': 1000, 'b': 1000}), f)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_main(self, current_rates, *options):
+        with open(self.current, 'wt') as f:
+            json.dump(results(current_rates), f)
+        argv = ['compare_benchmarks.py', self.baseline, self.current] + list(options)
+        with unittest.mock.patch.object(sys, 'argv', argv):
+            compare_benchmarks.main()
+
+    def test_no_regression(self):
+        self.run_main({'a': 950, 'b': 1200})
+
+    def test_regression(self):
+        with self.assertRaises(SystemExit) as context:
+            self.run_main({'a': 950, 'b': 500})
+        self.assertIn('1 benchmark(s) slower', str(context.exception.code))
+        self.assertIn(': b', str(context.exception.code))
+
+    def test_regression_within_tolerance(self):
+        self.run_main({'a': 950, 'b': 500}, '--tolerance', '0.6')
+
+    def test_bad_results(self):
+        with open(self.current, 'wt') as f:
+            f.write('not json')
+        with unittest.mock.patch.object(sys, 'argv', ['compare_benchmarks.py', self.baseline,
+                                                      self.current]):
+            with self.assertRaises(SystemExit):
+                compare_benchmarks.main()
@@ -18,6 +18,7 @@ import os
 import statistics
 import unittest
 import badread.fragment_lengths
+import badread.misc
 
 
 class TestConstantFragmentLength(unittest.TestCase):
@@ -70,3 +71,49 @@ class TestGammaFragmentLength(unittest.TestCase):
         all_lengths = [lengths.get_fragment_length() for _ in range(self.trials)]
         self.assertAlmostEqual(statistics.mean(all_lengths), 20000, delta=1000)
         self.assertAlmostEqual(statistics.stdev(all_lengths), 30000, delta=1000)
+
+
+class TestGetMany(unittest.TestCase):
+
+    def setUp(self):
+        self.null = open(os.devnull, 'w')
+
+    def tearDown(self):
+        self.null.close()
+
+    def test_constant(self):
+        lengths = badread.fragment_lengths.FragmentLengths(1000, 0, output=self.null)
+        self.assertEqual(lengths.get_many(100).tolist(), [1000] * 100)
+
+    def test_gamma(self):
+        lengths = badread.fragment_lengths.FragmentLengths(5000, 1000, output=self.null)
+        all_lengths = lengths.get_many(100000)
+        self.assertEqual(len(all_lengths), 100000)
+        self.assertAlmostEqual(all_lengths.mean(), 5000, delta=100)
+        self.assertAlmostEqual(all_lengths.std(), 1000, delta=100)
+
+    def test_minimum_length(self):
+        lengths = badread.fragment_lengths.FragmentLengths(2, 100, output=self.null)
+        self.assertGreaterEqual(lengths.get_many(10000).min(), 1)
+
+    def test_seeded(self):
+        rng_1, rng_2 = badread.misc.RandomContext(), badread.misc.RandomContext()
+        rng_1.seed(3)
+        rng_2.seed(3)
+        lengths_1 = badread.fragment_lengths.FragmentLengths(5000, 1000, output=self.null,
+                                                             rng=rng_1)
+        lengths_2 = badread.fragment_lengths.FragmentLengths(5000, 1000, output=self.null,
+                                                             rng=rng_2)
+        self.assertEqual([lengths_1.get_fragment_length() for _ in range(100)],
+                         [lengths_2.get_fragment_length() for _ in range(100)])
+
+    def test_given_rng(self):
+        # A length drawn with a given RandomContext depends only on that context.
+        lengths = badread.fragment_lengths.FragmentLengths(5000, 1000, output=self.null)
+        rng = badread.misc.RandomContext()
+        rng.seed(5)
+        length_1 = lengths.get_fragment_length(rng)
+        lengths.get_fragment_length()
+        rng.seed(5)
+        length_2 = lengths.get_fragment_length(rng)
+        self.assertEqual(length_1, length_2)
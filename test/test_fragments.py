@@ -35,8 +35,8 @@ class TestLinearFragments(unittest.TestCase):
         self.ref_circular = {'r': False}
         self.rev_comp_ref_seqs = {name: badread.misc.reverse_complement(seq)
                                   for name, seq in self.ref_seqs.items()}
-        self.ref_contigs, self.ref_contig_weights = \
-            badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths)
+        self.contig_sampler = badread.misc.ContigSampler(
+            *badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths))
         self.trials = 100
 
     def tearDown(self):
@@ -58,7 +58,7 @@ class TestLinearFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -103,7 +103,7 @@ class TestLinearFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -130,7 +130,7 @@ class TestLinearFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -148,8 +148,8 @@ class TestCircularFragments(unittest.TestCase):
         self.ref_circular = {'r': True}
         self.rev_comp_ref_seqs = {name: badread.misc.reverse_complement(seq)
                                   for name, seq in self.ref_seqs.items()}
-        self.ref_contigs, self.ref_contig_weights = \
-            badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths)
+        self.contig_sampler = badread.misc.ContigSampler(
+            *badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths))
         self.trials = 100
 
     def tearDown(self):
@@ -171,7 +171,7 @@ class TestCircularFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -200,7 +200,7 @@ class TestCircularFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -223,7 +223,7 @@ class TestCircularFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -245,7 +245,7 @@ class TestCircularFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -266,7 +266,7 @@ class TestCircularFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -288,7 +288,7 @@ class TestCircularFragments(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -315,8 +315,8 @@ class TestSmallPlasmidBias(unittest.TestCase):
         self.ref_circular = {'r': True}
         self.rev_comp_ref_seqs = {name: badread.misc.reverse_complement(seq)
                                   for name, seq in self.ref_seqs.items()}
-        self.ref_contigs, self.ref_contig_weights = \
-            badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths)
+        self.contig_sampler = badread.misc.ContigSampler(
+            *badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths))
         self.trials = 100
 
     def tearDown(self):
@@ -337,7 +337,7 @@ class TestSmallPlasmidBias(unittest.TestCase):
         with self.assertRaises(SystemExit):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
@@ -355,8 +355,8 @@ class TestWholeRef(unittest.TestCase):
         self.ref_circular = {'r': False}
         self.rev_comp_ref_seqs = {name: badread.misc.reverse_complement(seq)
                                   for name, seq in self.ref_seqs.items()}
-        self.ref_contigs, self.ref_contig_weights = \
-            badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths)
+        self.contig_sampler = badread.misc.ContigSampler(
+            *badread.simulate.get_ref_contig_weights(self.ref_seqs, self.ref_depths))
         self.trials = 100
 
     def tearDown(self):
@@ -376,7 +376,7 @@ class TestWholeRef(unittest.TestCase):
         for _ in range(self.trials):
             fragment, info = \
                 badread.simulate.build_fragment(self.lengths, self.ref_seqs, self.rev_comp_ref_seqs,
-                                                self.ref_contigs, self.ref_contig_weights,
+                                                self.contig_sampler,
                                                 self.ref_circular, args, start_adapt_rate,
                                                 start_adapt_amount, end_adapt_rate,
                                                 end_adapt_amount)
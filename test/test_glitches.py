@@ -106,3 +106,26 @@ class TestGlitches(unittest.TestCase):
         for i in range(self.trials):
             frag = badread.misc.get_random_sequence(self.frag_length)
             _ = badread.simulate.add_glitches(frag, 1000, 10, 0.5)
+
+    def test_empty_fragment(self):
+        for i in range(self.trials):
+            self.assertEqual(badread.simulate.add_glitches('', 100, 10, 10), '')
+
+    def test_mean_length(self):
+        # With no skip, each glitch adds glitch-size bases on average and there is about one
+        # glitch per glitch-rate bases.
+        new_lengths = []
+        for i in range(self.trials):
+            frag = badread.misc.get_random_sequence(self.frag_length)
+            glitched_frag = badread.simulate.add_glitches(frag, 100, 10, 0)
+            new_lengths.append(len(glitched_frag))
+        self.assertAlmostEqual(statistics.mean(new_lengths), 1100, delta=20)
+
+    def test_kept_sequence_in_order(self):
+        # With no size, the glitched fragment is the original with some pieces skipped, so it
+        # should always be a subsequence of the original.
+        for i in range(self.trials):
+            frag = badread.misc.get_random_sequence(self.frag_length)
+            glitched_frag = badread.simulate.add_glitches(frag, 50, 0, 5)
+            remaining = iter(frag)
+            self.assertTrue(all(b in remaining for b in glitched_frag))
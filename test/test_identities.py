@@ -18,6 +18,7 @@ import os
 import unittest
 import badread.error_model
 import badread.identities
+import badread.misc
 
 
 class TestConstantIdentity(unittest.TestCase):
@@ -89,3 +90,31 @@ class TestBetaIdentity(unittest.TestCase):
             identities = badread.identities.Identities(81.9, 5.5, 82.1, output=self.null)
             identities.get_identity()
         self.assertTrue('invalid beta parameters' in str(cm.exception))
+
+
+class TestGetMany(unittest.TestCase):
+
+    def setUp(self):
+        self.null = open(os.devnull, 'w')
+
+    def tearDown(self):
+        self.null.close()
+
+    def test_constant(self):
+        identities = badread.identities.Identities(90, 0, 100, output=self.null)
+        self.assertEqual(identities.get_many(10).tolist(), [0.9] * 10)
+
+    def test_beta(self):
+        identities = badread.identities.Identities(90, 4, 95, output=self.null)
+        all_identities = identities.get_many(100000)
+        self.assertAlmostEqual(all_identities.mean(), 0.9, delta=0.01)
+        self.assertLessEqual(all_identities.max(), 0.95)
+
+    def test_seeded(self):
+        rng_1, rng_2 = badread.misc.RandomContext(), badread.misc.RandomContext()
+        rng_1.seed(7)
+        rng_2.seed(7)
+        identities_1 = badread.identities.Identities(90, 4, 100, output=self.null, rng=rng_1)
+        identities_2 = badread.identities.Identities(90, 4, 100, output=self.null, rng=rng_2)
+        self.assertEqual([identities_1.get_identity() for _ in range(100)],
+                         [identities_2.get_identity() for _ in range(100)])
@@ -0,0 +1,101 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+import badread.__main__
+import badread.mem_report
+import badread.misc
+
+
+class TestMemReport(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.report_filename = os.path.join(self.temp_dir.name, 'mem.json')
+
+    def tearDown(self):
+        badread.mem_report.finish()
+        self.temp_dir.cleanup()
+
+    def load_report(self):
+        with open(self.report_filename, 'rt') as f:
+            return json.load(f)
+
+    def test_no_report(self):
+        badread.mem_report.start(None, 'simulate')
+        with badread.mem_report.stage('load reference'):
+            pass
+        badread.mem_report.finish()
+        self.assertFalse(os.path.exists(self.report_filename))
+
+    def test_stages(self):
+        badread.mem_report.start(self.report_filename, 'simulate')
+        with badread.mem_report.stage('first'):
+            pass
+        with badread.mem_report.stage('second'):
+            pass
+        badread.mem_report.finish()
+        report = self.load_report()
+        self.assertEqual(report['command'], 'simulate')
+        self.assertEqual([s['stage'] for s in report['stages']], ['first', 'second'])
+        self.assertNotIn('traced_peak_mb', report)
+        self.assertNotIn('top_allocations', report['stages'][0])
+        if report['rss_peak_mb'] is not None:
+            self.assertGreater(report['rss_peak_mb'], 0.0)
+
+    def test_allocations(self):
+        badread.mem_report.start(self.report_filename, 'simulate', trace_allocations=True)
+        with badread.mem_report.stage('allocate'):
+            big = [bytearray(1000) for _ in range(20000)]  # about 20 MB
+        with badread.mem_report.stage('free'):
+            del big
+        badread.mem_report.finish()
+        report = self.load_report()
+        allocate, free = report['stages']
+        self.assertGreater(allocate['traced_peak_mb'], 19.0)
+        self.assertGreater(allocate['top_allocations'][0]['size_mb'], 19.0)
+        self.assertTrue(allocate['top_allocations'][0]['location'].startswith(
+            os.path.join('test', 'test_mem_report.py')))
+        self.assertLess(free['traced_end_mb'], allocate['traced_end_mb'] - 19.0)
+        self.assertGreaterEqual(report['traced_peak_mb'], allocate['traced_peak_mb'])
+
+    def test_command(self):
+        ref_filename = os.path.join(os.path.dirname(__file__), 'test_alignment_ref.fasta')
+        test_args = ['badread', '--mem-report', self.report_filename, 'simulate',
+                     '--reference', ref_filename, '--quantity', '1x',
+                     '--error_model', 'random', '--qscore_model', 'random']
+        with unittest.mock.patch.object(sys, 'argv', test_args):
+            with badread.misc.captured_output() as (out, err):
+                with open(os.devnull, 'w') as null:
+                    badread.__main__.main(output=null)
+        self.assertTrue(out.getvalue().startswith('@'))
+        stages = [s['stage'] for s in self.load_report()['stages']]
+        self.assertEqual(stages, ['load reference', 'reverse complement reference',
+                                  'load models', 'simulate reads'])
+
+    def test_allocations_without_report(self):
+        test_args = ['badread', '--mem-report-allocations', 'simulate', '--reference', 'x.fasta',
+                     '--quantity', '1x']
+        with unittest.mock.patch.object(sys, 'argv', test_args):
+            with self.assertRaises(SystemExit):
+                badread.__main__.main()
@@ -0,0 +1,85 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import badread.metrics
+
+
+class TestSizeBins(unittest.TestCase):
+
+    def test_nearest_multiple(self):
+        sizes = np.arange(0, 2000)
+        expected = [25 * round(s / 25) for s in sizes]
+        self.assertEqual(badread.metrics.size_bins(sizes).tolist(), expected)
+
+    def test_other_base(self):
+        self.assertEqual(badread.metrics.size_bins([0, 4, 6, 14, 16], base=10).tolist(),
+                         [0, 0, 10, 10, 20])
+
+    def test_missing(self):
+        bins = badread.metrics.size_bins([10.0, np.nan, 40.0])
+        self.assertEqual(bins[0], 0)
+        self.assertTrue(np.isnan(bins[1]))
+        self.assertEqual(bins[2], 50)
+        self.assertTrue(np.isnan(badread.metrics.size_bins([np.nan, np.nan])).all())
+
+
+class TestGroupMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.df = pd.DataFrame({'mapq': [0, 0, 60, 60, 60, 30, np.nan],
+                                'tp': [0, 0, 1, 1, 0, 0, np.nan],
+                                'fp': [1, 1, 0, 0, 1, 0, np.nan],
+                                'fn': [np.nan, np.nan, np.nan, np.nan, np.nan, np.nan, 1]})
+
+    def test_group(self):
+        table = badread.metrics.group_metrics(self.df, 'mapq')
+        self.assertEqual(table.index.tolist(), [0, 30, 60])
+        self.assertEqual(table['n'].tolist(), [2, 1, 3])
+        self.assertEqual(table['tp'].tolist(), [0, 0, 2])
+        self.assertEqual(table['fp'].tolist(), [2, 0, 1])
+        self.assertAlmostEqual(table.loc[60, 'precision'], 2 / 3)
+        self.assertTrue(np.isnan(table.loc[30, 'precision']))
+        self.assertTrue(np.isnan(table.loc[30, 'recall']))
+        self.assertEqual(table.loc[0, 'f_score'], 0.0)
+
+    def test_extra_sums(self):
+        df = self.df.assign(bins=[0, 0, 25, 25, 25, 25, 50])
+        table = badread.metrics.group_metrics(df, 'bins', sums=['mapq'])
+        self.assertEqual(table['mapq'].tolist(), [0, 210, 0])
+        self.assertEqual(table['fn'].tolist(), [0, 0, 1])
+        self.assertEqual(table.loc[50, 'recall'], 0.0)
+
+    def test_only_tp(self):
+        table = badread.metrics.group_metrics(pd.DataFrame({'a': [1, 1], 'tp': [1, 0]}), 'a')
+        self.assertEqual(table.columns.tolist(), ['n', 'tp', 'f_score'])
+
+    def test_cumulative(self):
+        table = badread.metrics.group_metrics(self.df, 'mapq')
+        forward = badread.metrics.cumulative_metrics(table)
+        self.assertEqual(forward['fp'].tolist(), [2, 2, 3])
+        self.assertAlmostEqual(forward.loc[60, 'precision'], 2 / 5)
+
+        # From the highest MapQ down, as in the BWA-MEM paper's curves.
+        reverse = badread.metrics.cumulative_metrics(table, reverse=True)
+        self.assertEqual(reverse.index.tolist(), [0, 30, 60])
+        self.assertEqual(reverse['tp'].tolist(), [2, 2, 2])
+        self.assertEqual(reverse['fp'].tolist(), [3, 1, 1])
+        self.assertEqual(reverse['n'].tolist(), [6, 4, 3])
@@ -16,6 +16,8 @@ If not, see <http://www.gnu.org/licenses/>.
 
 import gzip
 import os
+import numpy
+import random
 import unittest
 
 import badread.misc
@@ -117,6 +119,22 @@ class TestReverseComplement(unittest.TestCase):
     def test_rev_comp_2(self):
         self.assertEqual(badread.misc.reverse_complement('gAgA'), 'TcTc')
 
+    def test_rev_comp_3(self):
+        # Unknown characters become N, same as complement_base.
+        self.assertEqual(badread.misc.reverse_complement('A%Cé'), 'NGNT')
+
+    def test_rev_comp_empty(self):
+        self.assertEqual(badread.misc.reverse_complement(''), '')
+
+    def test_rev_comp_matches_per_base(self):
+        # The translation table must agree with complement_base on a large input that uses every
+        # IUPAC code plus some unknown characters.
+        alphabet = list(badread.misc.REV_COMP_DICT) + ['%', 'X', 'Z', '*']
+        rng = random.Random(0)
+        seq = ''.join(rng.choice(alphabet) for _ in range(100000))
+        expected = ''.join([badread.misc.complement_base(x) for x in seq][::-1])
+        self.assertEqual(badread.misc.reverse_complement(seq), expected)
+
 
 class TestLoadSequences(unittest.TestCase):
 
@@ -195,6 +213,151 @@ class TestRandomSeqs(unittest.TestCase):
             random_seq = badread.misc.get_random_sequence(seq_len)
             self.assertEqual(len(random_seq), seq_len)
 
+    def test_random_seq_long(self):
+        # Long sequences bypass the pool but should still be evenly spread across the four bases.
+        random_seq = badread.misc.get_random_sequence(100000)
+        self.assertEqual(len(random_seq), 100000)
+        self.assertEqual(set(random_seq), {'A', 'C', 'G', 'T'})
+        for b in 'ACGT':
+            self.assertAlmostEqual(random_seq.count(b) / 100000, 0.25, delta=0.01)
+
+    def test_random_seq_negative_length(self):
+        self.assertEqual(badread.misc.get_random_sequence(-1), '')
+
+    def test_pool_refill(self):
+        pool = badread.misc.RandomSequencePool(10, numpy.random.default_rng(0))
+        seqs = [pool.get(3) for _ in range(10)]
+        self.assertTrue(all(len(s) == 3 for s in seqs))
+        self.assertEqual(len(pool.get(25)), 25)
+
+    def test_same_seed_same_sequence(self):
+        rng_1 = badread.misc.RandomContext(numpy.random.SeedSequence(0))
+        rng_2 = badread.misc.RandomContext(numpy.random.SeedSequence(0))
+        self.assertEqual(badread.misc.get_random_sequence(10, rng_1),
+                         badread.misc.get_random_sequence(10, rng_2))
+        self.assertEqual(badread.misc.get_random_sequence(5000, rng_1),
+                         badread.misc.get_random_sequence(5000, rng_2))
+
+
+class TestRandomContext(unittest.TestCase):
+
+    def test_seed(self):
+        rng_1, rng_2 = badread.misc.RandomContext(), badread.misc.RandomContext()
+        rng_1.seed(123)
+        rng_2.seed(123)
+        self.assertEqual(rng_1.py.random(), rng_2.py.random())
+        self.assertEqual(rng_1.np.random(), rng_2.np.random())
+
+    def test_read_rngs_independent_of_order(self):
+        entropy = badread.misc.get_seed_entropy(42)
+        in_order = [badread.misc.get_read_rng(entropy, i).py.random() for i in range(5)]
+        reversed_order = [badread.misc.get_read_rng(entropy, i).py.random()
+                          for i in reversed(range(5))]
+        self.assertEqual(in_order, list(reversed(reversed_order)))
+        self.assertEqual(len(set(in_order)), 5)
+
+    def test_setup_rng_differs_from_read_rngs(self):
+        entropy = badread.misc.get_seed_entropy(42)
+        setup = badread.misc.get_setup_rng(entropy).np.random()
+        self.assertNotEqual(setup, badread.misc.get_read_rng(entropy, 0).np.random())
+
+    def test_unseeded_entropy(self):
+        self.assertNotEqual(badread.misc.get_seed_entropy(None),
+                            badread.misc.get_seed_entropy(None))
+
+
+class TestParseReadRange(unittest.TestCase):
+
+    def test_good(self):
+        self.assertEqual(badread.misc.parse_read_range('0:10'), range(0, 10))
+        self.assertEqual(badread.misc.parse_read_range('7340112:7340113'),
+                         range(7340112, 7340113))
+
+    def test_bad(self):
+        for range_str in ['', '5', '1:2:3', 'a:b', '5:5', '6:5', '-1:3']:
+            with self.assertRaises(SystemExit):
+                badread.misc.parse_read_range(range_str)
+
+
+class FastaFileStandIn(object):
+    """
+    Has the same fetch method as pysam.FastaFile, but also records each fetch.
+    """
+    def __init__(self, seqs):
+        self.seqs = seqs
+        self.fetches = []
+
+    def fetch(self, contig, start, end):
+        self.fetches.append((contig, start, end))
+        return self.seqs[contig][start:end]
+
+
+class TestFetchTemplates(unittest.TestCase):
+
+    def setUp(self):
+        rng = badread.misc.RandomContext()
+        rng.seed(0)
+        self.seqs = {'a': badread.misc.get_random_sequence(10000, rng).lower(),
+                     'b': badread.misc.get_random_sequence(10000, rng).lower()}
+        self.ref = FastaFileStandIn(self.seqs)
+        Block = badread.misc.FetchBlock
+        self.plans = [(0, 'r0', [Block('b', 5000, 5100), 'NNNN', Block('a', 10, 60)]),
+                      (1, 'r1', [Block('a', 40, 80).reverse_complement()]),
+                      (2, 'r2', [Block('b', 9990, 10050), Block('a', 8000, 8010)]),
+                      (3, 'r3', [Block('a', 10, 60)])]
+
+    def expected(self, read_index):
+        parts = {0: [self.seqs['b'][5000:5100], 'NNNN', self.seqs['a'][10:60]],
+                 1: [badread.misc.reverse_complement(self.seqs['a'][40:80])],
+                 2: [self.seqs['b'][9990:], self.seqs['a'][8000:8010]],
+                 3: [self.seqs['a'][10:60]]}[read_index]
+        return ''.join(parts).upper()
+
+    def test_same_as_individual_fetches(self):
+        for batch_size in [1, 2, 3, 10]:
+            templates = list(badread.misc.fetch_templates(self.ref, self.plans, batch_size))
+            self.assertEqual([t[0] for t in templates], [0, 1, 2, 3])
+            self.assertEqual([t[1] for t in templates], ['r0', 'r1', 'r2', 'r3'])
+            for read_index, _, seq in templates:
+                self.assertEqual(seq, self.expected(read_index))
+
+    def test_sorted_and_merged(self):
+        list(badread.misc.fetch_templates(self.ref, self.plans, 10))
+        self.assertEqual(self.ref.fetches, [('a', 10, 80), ('a', 8000, 8010), ('b', 5000, 5100),
+                                            ('b', 9990, 10050)])
+
+    def test_reverse_complement_twice(self):
+        block = badread.misc.FetchBlock('a', 0, 10)
+        self.assertTrue(block.reverse_complement().reverse)
+        self.assertEqual(block.reverse_complement().reverse_complement(), block)
+
+
+class TestContigSampler(unittest.TestCase):
+
+    def test_single_contig(self):
+        sampler = badread.misc.ContigSampler(['a'], [5.0])
+        self.assertEqual(len(sampler), 1)
+        self.assertEqual([sampler.get() for _ in range(10)], ['a'] * 10)
+
+    def test_weights(self):
+        sampler = badread.misc.ContigSampler(['a', 'b', 'c'], [1.0, 0.0, 3.0])
+        draws = [sampler.get() for _ in range(20000)]
+        self.assertEqual(draws.count('b'), 0)
+        self.assertAlmostEqual(draws.count('c') / draws.count('a'), 3.0, delta=0.2)
+
+    def test_get_many(self):
+        sampler = badread.misc.ContigSampler(['a', 'b'], [1.0, 1.0])
+        draws = sampler.get_many(10000)
+        self.assertEqual(len(draws), 10000)
+        self.assertAlmostEqual(draws.count('a') / 10000, 0.5, delta=0.03)
+
+    def test_many_contigs(self):
+        contigs = [str(i) for i in range(100000)]
+        weights = [0.0] * 100000
+        weights[12345] = 1.0
+        sampler = badread.misc.ContigSampler(contigs, weights)
+        self.assertEqual(set(sampler.get_many(1000)), {'12345'})
+
 
 class TestNumFormatting(unittest.TestCase):
 
@@ -0,0 +1,140 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import unittest
+import unittest.mock
+
+import badread.__main__
+import badread.alignment
+import badread.misc
+import badread.plot_window_identity
+
+
+def running_window_means(values, window_size, read_start, convert_to_identity):
+    # The window means as plot used to compute them, with a running sum.
+    positions, means = [], []
+    window_sum = sum(values[:window_size])
+    for i in range(len(values) - window_size):
+        if convert_to_identity:
+            means.append(100.0 * (1.0 - window_sum / window_size))
+        else:
+            means.append(window_sum / window_size)
+        positions.append(read_start + i + (window_size // 2))
+        window_sum -= values[i]
+        window_sum += values[i + window_size]
+    return positions, means
+
+
+class TestWindowMeans(unittest.TestCase):
+
+    def test_same_as_running_sum(self):
+        rng = random.Random(0)
+        for _ in range(50):
+            length, window_size = rng.randint(0, 500), rng.randint(1, 120)
+            values = [rng.choice([0, 0, 0, 1, 2]) for _ in range(length)]
+            read_start = rng.randint(0, 1000)
+            for convert in [True, False]:
+                expected = running_window_means(values, window_size, read_start, convert)
+                positions, means = badread.plot_window_identity.get_window_means(
+                    values, window_size, read_start, convert_to_identity=convert)
+                self.assertEqual(list(positions), expected[0])
+                self.assertEqual(list(means), expected[1])
+
+    def test_too_short(self):
+        positions, means = badread.plot_window_identity.get_window_means([0] * 10, 100, 0)
+        self.assertEqual(len(positions), 0)
+        self.assertEqual(len(means), 0)
+
+
+class TestBatchMode(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.table_filename = os.path.join(self.temp_dir.name, 'windows.tsv')
+        self.image_dir = os.path.join(self.temp_dir.name, 'images')
+        test_dir = os.path.dirname(__file__)
+        self.args = ['badread', 'plot',
+                     '--reference', os.path.join(test_dir, 'test_alignment_ref.fasta'),
+                     '--reads', os.path.join(test_dir, 'test_alignment_reads.fastq'),
+                     '--alignment', os.path.join(test_dir, 'test_alignment.paf')]
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def run_plot(self, extra_args):
+        with unittest.mock.patch.object(sys, 'argv', self.args + extra_args):
+            with badread.misc.captured_output() as (out, err):
+                badread.__main__.main()
+        return out.getvalue()
+
+    def load_table(self):
+        with open(self.table_filename, 'rt') as f:
+            lines = [line.rstrip('\n').split('\t') for line in f]
+        return [dict(zip(lines[0], line)) for line in lines[1:]]
+
+    def test_table(self):
+        out = self.run_plot(['--table', self.table_filename, '--threads', '1'])
+        self.assertNotIn('read_1:', out)  # no per-alignment output in batch mode
+        rows = self.load_table()
+        self.assertEqual(sorted(r['read_name'] for r in rows), ['read_1', 'read_2'])
+        for r in rows:
+            self.assertEqual(int(r['windows']), int(r['read_end']) - int(r['read_start']) - 100)
+            self.assertLessEqual(float(r['min_window_identity']),
+                                 float(r['mean_window_identity']))
+            self.assertEqual(r['mean_window_qscore'], '')
+
+    def test_parallel_same_as_serial(self):
+        self.run_plot(['--table', self.table_filename, '--threads', '1', '--qual'])
+        serial = self.load_table()
+        self.run_plot(['--table', self.table_filename, '--threads', '2', '--qual'])
+        self.assertEqual(self.load_table(), serial)
+        self.assertNotEqual(serial[0]['mean_window_qscore'], '')
+
+    def test_images(self):
+        self.run_plot(['--images', self.image_dir, '--threads', '2'])
+        self.assertEqual(sorted(os.listdir(self.image_dir)),
+                         ['read_1_0-1438_ref_754.png', 'read_2_0-1128_ref_3357.png'])
+        self.assertFalse(os.path.exists(self.table_filename))
+
+    def test_images_for_split_read(self):
+        # Two alignments of one read get an image each, in the same order as the table's rows.
+        test_dir = os.path.dirname(__file__)
+        with open(os.devnull, 'w') as null:
+            reads = badread.misc.load_fastq(os.path.join(test_dir, 'test_alignment_reads.fastq'),
+                                            output=null)
+        refs, _, _ = badread.misc.load_fasta(os.path.join(test_dir, 'test_alignment_ref.fasta'))
+        alignments = [badread.alignment.Alignment(
+                          'read_1\t1438\t0\t798\t+\tref\t10000\t754\t1552\t798\t798\t60\t'
+                          'AS:i:1596\tcg:Z:798M'),
+                      badread.alignment.Alignment(
+                          'read_1\t1438\t798\t1438\t+\tref\t10000\t1552\t2191\t639\t640\t60\t'
+                          'AS:i:1276\tcg:Z:1I639M')]
+        args = argparse.Namespace(window=100, qual=False, table=self.table_filename,
+                                  images=self.image_dir, threads=2)
+        with badread.misc.captured_output():
+            badread.plot_window_identity.write_window_statistics(alignments, reads, refs, args,
+                                                                 sys.stdout)
+        self.assertEqual(sorted(os.listdir(self.image_dir)),
+                         ['read_1_0-798_ref_754.png', 'read_1_798-1438_ref_1552.png'])
+        rows = self.load_table()
+        self.assertEqual([(r['read_start'], r['read_end']) for r in rows],
+                         [('0', '798'), ('798', '1438')])
@@ -315,6 +315,52 @@ class TestLoadedQScoreModelDistributions(unittest.TestCase):
         self.assertAlmostEqual(stdev, 3.76, delta=0.5)
 
 
+class TestResolvedContexts(unittest.TestCase):
+    """
+    Checks that cigars missing from the model resolve to the same distribution the trimming
+    fallback would give, and that get_qscore is seeded the same way as before.
+    """
+    def setUp(self):
+        null = open(os.devnull, 'w')
+        model_filename = os.path.join(os.path.dirname(__file__), 'simple_qscore_model')
+        self.model = badread.qscore_model.QScoreModel(model_filename, output=null)
+        null.close()
+
+    def resolved_scores(self, cigar):
+        qscores, _ = self.model.resolve_cigar(cigar)
+        return [badread.qscore_model.qscore_char_to_val(q) for q in qscores]
+
+    def test_cigar_in_model(self):
+        self.assertEqual(self.resolved_scores('=X='), self.model.scores['=X='])
+
+    def test_trimmed_cigar(self):
+        self.assertEqual(self.resolved_scores('XIX'), self.model.scores['I'])
+        self.assertEqual(self.resolved_scores('X=X=X'), self.model.scores['=X='])
+
+    def test_trimmed_deletions(self):
+        self.assertEqual(self.resolved_scores('XD=DX'), self.model.scores['='])
+
+    def test_all_deletion_free_cigars_precomputed(self):
+        for cigar in ['=', 'X', 'I', '===', 'IXI', 'XXX']:
+            self.assertTrue(cigar in self.model.resolved)
+
+    def test_deletion_cigar_remembered(self):
+        self.assertFalse('XD=DX' in self.model.resolved)
+        self.model.get_qscore('XD=DX')
+        self.assertTrue('XD=DX' in self.model.resolved)
+
+    def test_same_as_weighted_choice(self):
+        rng = badread.misc.RandomContext()
+        rng.py.seed(0)
+        qscores = [self.model.get_qscore('=X=', rng) for _ in range(100)]
+        random.seed(0)
+        expected = [random.choices(self.model.scores['=X='],
+                                   weights=self.model.probabilities['=X='])[0]
+                    for _ in range(100)]
+        expected = [badread.qscore_model.qscore_val_to_char(q) for q in expected]
+        self.assertEqual(qscores, expected)
+
+
 class TestGetQScoresRandom(unittest.TestCase):
     """
     For the random qscore model, it shouldn't matter what the sequence is, the best and worst
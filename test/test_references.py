@@ -14,9 +14,11 @@ details. You should have received a copy of the GNU General Public License along
 If not, see <http://www.gnu.org/licenses/>.
 """
 
+import collections
 import os
 import unittest
 
+import badread.fragment_lengths
 import badread.simulate
 
 
@@ -63,3 +65,39 @@ class TestLinearFragments(unittest.TestCase):
         self.assertEqual(self.ref_depths['I'], 1.0)
         self.assertEqual(self.ref_depths['J'], 5.4321)
         self.assertEqual(self.ref_depths['K'], 1.23456)
+
+
+class TestAdjustDepths(unittest.TestCase):
+
+    def setUp(self):
+        self.null = open(os.devnull, 'w')
+        self.lengths = badread.fragment_lengths.FragmentLengths(1000, 0, output=self.null)
+        self.args = collections.namedtuple('Args', ['small_plasmid_bias'])(False)
+
+    def tearDown(self):
+        self.null.close()
+
+    def test_long_contigs_unchanged(self):
+        ref_seqs = {'a': 'A' * 5000, 'b': 'A' * 5000}
+        ref_depths = {'a': 1.0, 'b': 2.0}
+        ref_circular = {'a': False, 'b': True}
+        badread.simulate.adjust_depths(ref_seqs, ref_depths, ref_circular, self.lengths, self.args)
+        self.assertAlmostEqual(ref_depths['a'], 1.0)
+        self.assertAlmostEqual(ref_depths['b'], 2.0)
+
+    def test_short_linear_contig(self):
+        # Every 1000 bp fragment is truncated to 250 bp, so depth is raised 4x.
+        ref_seqs = {'a': 'A' * 250}
+        ref_depths = {'a': 1.0}
+        ref_circular = {'a': False}
+        badread.simulate.adjust_depths(ref_seqs, ref_depths, ref_circular, self.lengths, self.args)
+        self.assertAlmostEqual(ref_depths['a'], 4.0)
+
+    def test_short_circular_contig(self):
+        # No fragments fit in a 250 bp circular contig.
+        ref_seqs = {'a': 'A' * 250}
+        ref_depths = {'a': 1.0}
+        ref_circular = {'a': True}
+        with self.assertRaises(SystemExit):
+            badread.simulate.adjust_depths(ref_seqs, ref_depths, ref_circular, self.lengths,
+                                           self.args)
@@ -0,0 +1,160 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import collections
+import os
+import re
+import tempfile
+import unittest
+
+import pysam
+
+import badread.fragment_lengths
+import badread.misc
+import badread.simple_sv
+
+
+class TestContigTable(unittest.TestCase):
+
+    def setUp(self):
+        self.table = badread.simple_sv.ContigTable(['a', 'b', 'c', 'd'], [100, 1000, 10, 500])
+        self.rng = badread.misc.RandomContext()
+        self.rng.seed(0)
+
+    def test_lengths(self):
+        self.assertEqual(len(self.table), 4)
+        self.assertEqual(self.table.lengths, {'a': 100, 'b': 1000, 'c': 10, 'd': 500})
+        self.assertEqual(self.table.names, ['b', 'd', 'a', 'c'])
+        self.assertEqual(self.table.max_block_length, 333)
+
+    def test_min_length(self):
+        for min_length, allowed in [(1, {'a', 'b', 'c', 'd'}), (11, {'a', 'b', 'd'}),
+                                    (101, {'b', 'd'}), (500, {'b', 'd'}), (501, {'b'}),
+                                    (1000, {'b'})]:
+            contigs = {self.table.sample(min_length, self.rng) for _ in range(200)}
+            self.assertEqual(contigs, allowed)
+
+    def test_too_long(self):
+        self.assertIsNone(self.table.sample(1001, self.rng))
+
+    def test_uniform(self):
+        counts = collections.Counter(self.table.sample(1, self.rng) for _ in range(40000))
+        for name in 'abcd':
+            self.assertAlmostEqual(counts[name] / 40000, 0.25, delta=0.02)
+
+    def test_weights(self):
+        table = badread.simple_sv.ContigTable(['a', 'b'], [100, 200], weights=[1, 3])
+        counts = collections.Counter(table.sample(1, self.rng) for _ in range(40000))
+        self.assertAlmostEqual(counts['a'] / 40000, 0.25, delta=0.02)
+        self.assertEqual({table.sample(101, self.rng) for _ in range(100)}, {'b'})
+
+
+class TestGenerators(unittest.TestCase):
+    """
+    Makes SVs on a fragmented reference, where most contigs are too short for most blocks.
+    """
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        ref_filename = os.path.join(self.temp_dir.name, 'ref.fasta')
+        rng = badread.misc.RandomContext()
+        rng.seed(1)
+        with open(ref_filename, 'wt') as f:
+            for i in range(50):
+                f.write(f'>short_{i}\n{badread.misc.get_random_sequence(40, rng)}\n')
+            f.write(f'>long\n{badread.misc.get_random_sequence(5000, rng)}\n')
+        self.ref = pysam.FastaFile(ref_filename)
+        self.contigs = badread.simple_sv.ContigTable(self.ref.references, self.ref.lengths)
+        self.entropy = badread.misc.get_seed_entropy(2)
+        with open(os.devnull, 'w') as null:
+            self.frag_lengths = badread.fragment_lengths.FragmentLengths(100, 50, output=null)
+
+    def tearDown(self):
+        self.ref.close()
+        self.temp_dir.cleanup()
+
+    def get_templates(self, sv_type):
+        read_types = ((n, sv_type) for n in range(100))
+        plans = badread.simple_sv.plan_svs(read_types, self.frag_lengths, self.contigs,
+                                           self.entropy, None)
+        return list(badread.misc.fetch_templates(self.ref, plans))
+
+    def test_deletion(self):
+        templates = self.get_templates('deletion')
+        self.assertEqual(len(templates), 100)
+        for _, name, seq in templates:
+            self.assertTrue(name.startswith('deletion__long:'))
+
+    def test_translocation(self):
+        templates = self.get_templates('translocation')
+        self.assertEqual(len(templates), 100)
+        for _, name, seq in templates:
+            blocks = re.findall(r'(?:^|_)([a-z]+(?:_\d+)?):(\d+)-(\d+)', name.split('__')[1])
+            self.assertEqual(len(blocks), 2)
+            for contig, start, end in blocks:
+                self.assertLessEqual(int(end), self.contigs.lengths[contig])
+            self.assertEqual(len(seq), sum(int(end) - int(start) for _, start, end in blocks))
+
+    def test_inversion3(self):
+        for _, name, seq in self.get_templates('inversion3'):
+            blocks = re.findall(r'long:(\d+)-(\d+)', name)
+            self.assertEqual(len(blocks), 3)
+            self.assertEqual(len(seq), sum(int(end) - int(start) for start, end in blocks))
+
+    def test_same_seed_same_templates(self):
+        templates_1 = self.get_templates('inversion3')
+        templates_2 = self.get_templates('inversion3')
+        self.assertEqual(templates_1, templates_2)
+
+
+class TestSvMix(unittest.TestCase):
+
+    def test_parse(self):
+        mix = badread.simple_sv.parse_sv_mix('deletion=0.4, Inversion3=0.1')
+        self.assertEqual(list(mix), ['deletion', 'inversion3'])
+        self.assertAlmostEqual(mix['deletion'], 0.8)
+        self.assertAlmostEqual(mix['inversion3'], 0.2)
+
+    def test_parse_default_weight(self):
+        mix = badread.simple_sv.parse_sv_mix('deletion,translocation')
+        self.assertEqual(mix, {'deletion': 0.5, 'translocation': 0.5})
+
+    def test_parse_errors(self):
+        for mix in ['deletion=0.5,foo=0.5', 'deletion=x', 'deletion=-1', 'deletion=0',
+                    'deletion=1,deletion=2', '']:
+            with self.assertRaises(SystemExit):
+                badread.simple_sv.parse_sv_mix(mix)
+
+    def test_no_mix(self):
+        read_types = list(badread.simple_sv.get_read_types(3, None, 0))
+        self.assertEqual(len(read_types), 3 * len(badread.simple_sv.SV_TYPES))
+        self.assertEqual([n for n, _ in read_types], list(range(len(read_types))))
+        self.assertEqual(read_types[:4], [(0, 'duplication'), (1, 'duplication'),
+                                          (2, 'duplication'), (3, 'deletion')])
+
+    def test_mix_proportions(self):
+        mix = badread.simple_sv.parse_sv_mix('deletion=3,inversion3=1,insertion=0')
+        entropy = badread.misc.get_seed_entropy(0)
+        counts = collections.Counter(t for _, t in
+                                     badread.simple_sv.get_read_types(20000, mix, entropy))
+        self.assertEqual(set(counts), {'deletion', 'inversion3'})
+        self.assertAlmostEqual(counts['deletion'] / 20000, 0.75, delta=0.02)
+
+    def test_mix_independent_of_number_and_batch(self):
+        mix = badread.simple_sv.parse_sv_mix('deletion,inversion2,translocation')
+        entropy = badread.misc.get_seed_entropy(0)
+        read_types_1 = list(badread.simple_sv.get_read_types(100, mix, entropy, batch_size=7))
+        read_types_2 = list(badread.simple_sv.get_read_types(250, mix, entropy))
+        self.assertEqual(read_types_1, read_types_2[:100])
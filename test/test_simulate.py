@@ -14,6 +14,7 @@ details. You should have received a copy of the GNU General Public License along
 If not, see <http://www.gnu.org/licenses/>.
 """
 
+import argparse
 import edlib
 import os
 import pathlib
@@ -149,3 +150,71 @@ class TestSequenceFragment(unittest.TestCase):
         for identity in self.identities_to_test:
             for read_length in self.read_lengths_to_test:
                 self.identity_test(identity, read_length, error_model, qscore_model)
+
+
+class TestSimulateTemplates(unittest.TestCase):
+    """
+    Tests sequencing split-read templates directly (the --fastq option of generate_split_reads,
+    same_chr and simple_sv).
+    """
+    def setUp(self):
+        self.null = open(os.devnull, 'w')
+        self.templates = [(0, 'alignments_2__A:10-60_B:20-70',
+                           'GACCCAGTTTTTTTACTGATTCAGCGTAGGTGCTCTGATCTTCACGCATCTTTGACCGCC'),
+                          (1, 'alignments_1__A:100-150',
+                           'TTGACGGCATCATGGACTCCACGTATCATCGGACTAGCTAGCTACCTCAGGCATCGAC')]
+        self.entropy = badread.misc.get_seed_entropy(0)
+
+    def tearDown(self):
+        self.null.close()
+
+    def get_args(self, fastq):
+        return argparse.Namespace(fastq=fastq, mean_identity=90, max_identity=95,
+                                  identity_stdev=3, error_model='random', qscore_model='random')
+
+    def test_fasta(self):
+        with badread.misc.captured_output() as (out, err):
+            badread.simulate.write_templates(self.templates, self.get_args(False), self.entropy,
+                                             output=self.null)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines, ['>' + self.templates[0][1], self.templates[0][2],
+                                 '>' + self.templates[1][1], self.templates[1][2]])
+
+    def test_fastq(self):
+        with badread.misc.captured_output() as (out, err):
+            badread.simulate.write_templates(self.templates, self.get_args(True), self.entropy,
+                                             output=self.null)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 8)
+        for i, (_, name, _) in enumerate(self.templates):
+            header = lines[i * 4].split(' ')
+            self.assertEqual(header[1], name)
+            self.assertTrue(header[2].startswith('i='))
+            self.assertEqual(len(lines[i * 4 + 1]), len(lines[i * 4 + 3]))
+
+    def test_fastq_depends_on_read_index(self):
+        # Each template's read depends only on the seed and its index, not on the other templates.
+        with badread.misc.captured_output() as (out_1, err):
+            badread.simulate.write_templates(self.templates, self.get_args(True), self.entropy,
+                                             output=self.null)
+        with badread.misc.captured_output() as (out_2, err):
+            badread.simulate.write_templates(self.templates[1:], self.get_args(True),
+                                             self.entropy, output=self.null)
+        self.assertEqual(out_1.getvalue().splitlines()[4:], out_2.getvalue().splitlines())
+
+    def test_fastq_both_strands(self):
+        # Like simulate's fragments, each template is sequenced on a random strand.
+        rng = badread.misc.RandomContext()
+        rng.seed(0)
+        templates = [(i, f'template_{i}', badread.misc.get_random_sequence(500, rng))
+                     for i in range(20)]
+        with badread.misc.captured_output() as (out, err):
+            badread.simulate.write_templates(templates, self.get_args(True), self.entropy,
+                                             output=self.null)
+        reads = out.getvalue().splitlines()[1::4]
+        strands = set()
+        for (_, _, template), read in zip(templates, reads):
+            forward = edlib.align(read, template)['editDistance']
+            reverse = edlib.align(read, badread.misc.reverse_complement(template))['editDistance']
+            strands.add('+' if forward < reverse else '-')
+        self.assertEqual(strands, {'+', '-'})
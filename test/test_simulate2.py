@@ -37,7 +37,8 @@ def sequence(reference_filename, read_count=5000, mean_frag_length=100, small_pl
                                            'start_adapter_seq', 'end_adapter_seq',
                                            'junk_reads', 'random_reads', 'chimeras',
                                            'glitch_rate', 'glitch_size', 'glitch_skip',
-                                           'small_plasmid_bias'])
+                                           'small_plasmid_bias', 'read_range', 'output',
+                                           'checkpoint', 'resume'])
     args = Args(reference=reference_filename, quantity=quantity,
                 mean_frag_length=mean_frag_length, frag_length_stdev=10,
                 mean_identity=mean_identity, max_identity=95, identity_stdev=5,
@@ -46,7 +47,8 @@ def sequence(reference_filename, read_count=5000, mean_frag_length=100, small_pl
                 start_adapter_seq='', end_adapter_seq='',
                 junk_reads=0, random_reads=0, chimeras=0,
                 glitch_rate=0, glitch_size=0, glitch_skip=0,
-                small_plasmid_bias=small_plasmid_bias)
+                small_plasmid_bias=small_plasmid_bias, read_range=None, output=None,
+                checkpoint=None, resume=False)
 
     with open(os.devnull, 'w') as null:
         badread.simulate.simulate(args, output=null)
@@ -176,6 +178,19 @@ class TestSimulate(unittest.TestCase):
         self.assertEqual(out3, out4)
         self.assertNotEqual(out1, out3)
 
+    def test_seeded_reads_independent_of_quantity(self):
+        # Each read depends only on the seed and its index, so a seeded run's reads should be the
+        # start of a larger seeded run's reads.
+        ref_filename = os.path.join(os.path.dirname(__file__), 'test_ref_1.fasta')
+        with badread.misc.captured_output() as (out1, err1):
+            sequence(ref_filename, read_count=10, mean_frag_length=20, seed=3)
+        out1 = out1.getvalue().strip().splitlines()
+        with badread.misc.captured_output() as (out2, err2):
+            sequence(ref_filename, read_count=30, mean_frag_length=20, seed=3)
+        out2 = out2.getvalue().strip().splitlines()
+        self.assertGreater(len(out2), len(out1))
+        self.assertEqual(out1, out2[:len(out1)])
+
     def test_very_low_id(self):
         # If we ask for reads with extremely low id, Badread should do the best it can (not get
         # caught in an infinite loop).
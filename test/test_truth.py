@@ -0,0 +1,113 @@
+"""
+This module contains some tests for Badread. To run them, execute `python3 -m unittest` from the
+root Badread directory.
+
+Copyright 2018 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Badread
+
+This file is part of Badread. Badread is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Badread is distributed
+in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Badread.
+If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import gzip
+import os
+import tempfile
+import unittest
+
+import badread.benchmark_mappings
+import badread.benchmark_simple
+import badread.misc
+import badread.truth
+
+
+FetchBlock = badread.misc.FetchBlock
+
+PLANS = [(0, 'deletion__A:10-20_A:30-45', [FetchBlock('A', 10, 20), FetchBlock('A', 30, 45)]),
+         (1, 'ninsertion__B:5-25_N:0-0_B:26-40', [FetchBlock('B', 5, 25, True), 'NNNNN',
+                                                   FetchBlock('B', 26, 40, True)]),
+         (2, 'alignments_1__A:0-50', [FetchBlock('A', 0, 50)])]
+
+READS = '@read-a r1 i=95.00%\nACGT\n+\n!!!!\n' \
+        '@read-b r0 i=90.00%\nACGT\n+\n!!!!\n' \
+        '@read-c junk_seq i=80.00%\nACGT\n+\n!!!!\n' \
+        '@read-d r2 chimera r0 i=99.00%\nACGT\n+\n!!!!\n'
+
+
+class TestTruthTable(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.truth_filename = os.path.join(self.temp_dir.name, 'truth.tsv')
+        self.reads_filename = os.path.join(self.temp_dir.name, 'reads.fastq')
+        with open(self.reads_filename, 'wt') as f:
+            f.write(READS)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write_truth(self, filename):
+        with badread.truth.TruthTable(filename) as truth_table:
+            return list(truth_table.record(PLANS))
+
+    def test_short_names(self):
+        plans = self.write_truth(self.truth_filename)
+        self.assertEqual([name for _, name, _ in plans], ['r0', 'r1', 'r2'])
+        self.assertEqual([parts for _, _, parts in plans], [parts for _, _, parts in PLANS])
+
+    def test_no_table(self):
+        self.assertEqual(self.write_truth(None), PLANS)
+
+    def test_rows(self):
+        self.write_truth(self.truth_filename)
+        with open(self.truth_filename, 'rt') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[0], 'read\ttype\tblock\tchrom\tstart\tend\tstrand')
+        self.assertEqual(lines[3], 'r1\tninsertion\t0\tB\t5\t25\t-')
+        self.assertEqual(lines[4], 'r1\tninsertion\t1\t.\t0\t5\t.')
+        self.assertEqual(len(lines), 7)
+
+    def test_load(self):
+        self.write_truth(self.truth_filename)
+        truth = badread.truth.load_truth(self.truth_filename)
+        self.assertEqual(truth, {'r0': ('deletion', [('A', 10, 20), ('A', 30, 45)]),
+                                 'r1': ('ninsertion', [('B', 5, 25), ('B', 26, 40)]),
+                                 'r2': ('alignments_1', [('A', 0, 50)])})
+
+    def test_load_gzipped(self):
+        filename = self.truth_filename + '.gz'
+        self.write_truth(filename)
+        with gzip.open(filename, 'rt') as f:
+            self.assertTrue(f.readline().startswith('read\t'))
+        self.assertEqual(len(badread.truth.load_truth(filename)), 3)
+
+    def test_not_a_truth_table(self):
+        with self.assertRaises(SystemExit):
+            badread.truth.load_truth(self.reads_filename)
+
+    def test_read_truth(self):
+        self.write_truth(self.truth_filename)
+        read_truth = badread.truth.load_read_truth(self.truth_filename, self.reads_filename)
+        self.assertEqual(sorted(read_truth), ['read-a', 'read-b', 'read-d'])
+        self.assertEqual(read_truth['read-b'][0], 'deletion')
+        self.assertEqual(read_truth['read-d'][1], [('A', 0, 50)])
+
+    def test_benchmark_mappings(self):
+        self.write_truth(self.truth_filename)
+        ins_events, n = badread.benchmark_mappings.load_truth_info(self.truth_filename,
+                                                                   self.reads_filename)
+        self.assertEqual(n, 5)
+        self.assertEqual(ins_events['read-a'].get_type(), 'ninsertion')
+        self.assertEqual(len(ins_events['read-a']), 2)
+
+    def test_benchmark_simple(self):
+        self.write_truth(self.truth_filename)
+        read_truth = badread.truth.load_read_truth(self.truth_filename, self.reads_filename)
+        ins_events, n = badread.benchmark_simple.load_truth_info(read_truth, 'deletion')
+        self.assertEqual(list(ins_events), ['read-b'])
+        self.assertEqual(ins_events['read-b'].get_ins_blocks(), [('A', 10, 20), ('A', 30, 45)])
+        self.assertEqual(n, 2)